@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+tribus.common.cache
+===================
+
+This module contains a two-level cache backend for Django. A small
+in-process cache (L1) is kept in front of a shared cache (L2), which is
+another backend of the ``CACHES`` setting. L2 must be a cache shared by
+every worker and host of the web tier, such as memcached: sessions and
+generation counters are read from it, and a per-host cache such as the
+file-based one would give each host its own sessions and counters. The
+file-based cache also scans its directory on writes once it is full, so
+it does not scale to a large number of entries.
+
+Reads are served from L1 when possible and fill it from L2. Writes and
+deletions go to both levels, so a worker always sees its own changes;
+changes made by other workers are seen once the L1 copy expires, after
+``L1_TIMEOUT`` seconds. Keys that must never be stale, such as sessions
+and generation counters, can be listed in ``BYPASS_PREFIXES`` to be read
+from L2 only.
+
+Each process counts its L1 hits, L2 hits and misses, and adds them to
+counters kept in L2 every ``STATS_INTERVAL`` reads, so that `cache_stats`
+reports the hit rates of the whole web tier.
+
+Example configuration::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'tribus.common.cache.TwoLevelCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {'L1_TIMEOUT': 2, 'L1_MAX_ENTRIES': 1000},
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': ['127.0.0.1:11211'],
+        },
+    }
+
+"""
+
+import threading
+from django.core.cache import get_cache
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+STATS = ('l1_hits', 'l2_hits', 'misses')
+STATS_KEY = 'cache:stats:%s:%s'
+
+_stats = {}
+_lock = threading.Lock()
+_missing = object()
+
+
+def hit_rates(counts):
+    """
+
+    :param counts: a dictionary with a value for each name of `STATS`.
+    :return: a dictionary with the ``reads``, and the ``l1``, ``l2`` and
+             ``total`` hit rates, as fractions of the reads.
+
+    .. versionadded:: 0.2
+
+    """
+    reads = sum(counts.get(name, 0) for name in STATS)
+    rates = {'reads': reads}
+    for name, hits in (('l1', counts.get('l1_hits', 0)),
+                       ('l2', counts.get('l2_hits', 0)),
+                       ('total', counts.get('l1_hits', 0) +
+                        counts.get('l2_hits', 0))):
+        rates[name] = float(hits) / reads if reads else 0.0
+    return rates
+
+
+class TwoLevelCache(BaseCache):
+    """
+
+    A cache backend with an in-process L1 in front of a shared L2.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, location, params):
+        super(TwoLevelCache, self).__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.l1_timeout = options.get('L1_TIMEOUT', 2)
+        self.bypass_prefixes = tuple(options.get('BYPASS_PREFIXES', ()))
+        self.stats_interval = options.get('STATS_INTERVAL', 1000)
+        self.l2 = get_cache(location)
+        self.l1 = LocMemCache('tribus-l1-%s' % location, {
+            'TIMEOUT': self.l1_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('L1_MAX_ENTRIES', 1000)}})
+        with _lock:
+            self._stats = _stats.setdefault(location, dict.fromkeys(STATS, 0))
+
+    def _local(self, key):
+        return not key.startswith(self.bypass_prefixes)
+
+    def _count(self, name, n=1):
+        with _lock:
+            self._stats[name] += n
+            reads = sum(self._stats.values())
+        if reads >= self.stats_interval:
+            self.publish_stats()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version)
+        if added and self._local(key):
+            self.l1.set(key, value, version=version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        if self._local(key):
+            value = self.l1.get(key, _missing, version)
+            if value is not _missing:
+                self._count('l1_hits')
+                return value
+        value = self.l2.get(key, _missing, version)
+        if value is _missing:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        if self._local(key):
+            self.l1.set(key, value, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version)
+        if self._local(key):
+            self.l1.set(key, value, version=version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(key, version)
+        self.l2.delete(key, version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        local = [key for key in keys if self._local(key)]
+        if local:
+            found.update(self.l1.get_many(local, version))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.l2.get_many(missing, version)
+            for key, value in shared.items():
+                if self._local(key):
+                    self.l1.set(key, value, version=version)
+            found.update(shared)
+        hits = len(keys) - len(missing)
+        if hits:
+            self._count('l1_hits', hits)
+        if missing:
+            self._count('l2_hits', len(found) - hits)
+            self._count('misses', len(keys) - len(found))
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set_many(data, timeout, version)
+        for key, value in data.items():
+            if self._local(key):
+                self.l1.set(key, value, version=version)
+
+    def delete_many(self, keys, version=None):
+        self.l1.delete_many(keys, version)
+        self.l2.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _missing, version) is not _missing
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(key, version)
+        return self.l2.incr(key, delta, version)
+
+    def decr(self, key, delta=1, version=None):
+        self.l1.delete(key, version)
+        return self.l2.decr(key, delta, version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
+
+    def stats(self):
+        """
+
+        :return: the counts of this process not yet published, with their
+                 hit rates (see `hit_rates`).
+
+        .. versionadded:: 0.2
+
+        """
+        with _lock:
+            counts = dict(self._stats)
+        counts.update(hit_rates(counts))
+        return counts
+
+    def publish_stats(self):
+        """
+
+        Adds the counts of this process to the counters kept in L2, and
+        resets them.
+
+        .. versionadded:: 0.2
+
+        """
+        with _lock:
+            counts = dict(self._stats)
+            self._stats.update(dict.fromkeys(STATS, 0))
+        for name, count in counts.items():
+            if not count:
+                continue
+            key = STATS_KEY % (self.shared_alias, name)
+            try:
+                self.l2.incr(key, count)
+            except ValueError:
+                self.l2.add(key, 0, None)
+                self.l2.incr(key, count)
+
+    def shared_stats(self):
+        """
+
+        :return: the counts published by every process, with their hit
+                 rates (see `hit_rates`).
+
+        .. versionadded:: 0.2
+
+        """
+        keys = dict((STATS_KEY % (self.shared_alias, name), name)
+                    for name in STATS)
+        counts = dict.fromkeys(STATS, 0)
+        for key, value in self.l2.get_many(keys.keys()).items():
+            counts[keys[key]] = value
+        counts.update(hit_rates(counts))
+        return counts
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.common.controlfile
+=========================
+
+This module contains a streaming reader for control files (``Packages``
+files) that only keeps the fields used by the recorder.
+
+Compared with ``deb822.Packages.iter_paragraphs``, paragraphs are split
+from large blocks of the decompressed stream, the fields that are not
+recorded (e.g. ``Source`` or ``SHA256``) are dropped while reading and the
+relation fields are kept as plain strings until `ControlRecord.relations`
+is accessed for the first time.
+
+As in ``deb822``, values are returned as unicode strings, and lines with
+CRLF endings are accepted. Paragraphs are separated by lines that are
+empty or only hold spaces and tabs, as apt does.
+
+"""
+
+import re
+import gzip
+from debian import deb822
+from tribus.config.pkgrecorder import (PACKAGE_FIELDS, DETAIL_FIELDS,
+                                       relation_types)
+
+BLOCK_SIZE = 1048576
+
+PARAGRAPH_SEPARATOR = re.compile(r'\n[ \t\r]*\n')
+
+RECORDED_FIELDS = frozenset(
+    [field.lower() for field in PACKAGE_FIELDS.keys() +
+     DETAIL_FIELDS.keys()] + ['maintainer', 'tag'] + relation_types)
+
+
+class ControlRecord(object):
+    """
+
+    A paragraph of a control file holding only the recorded fields.
+
+    It can be used wherever a ``deb822.Packages`` paragraph is expected by
+    the recorder: fields are looked up without regard to case and
+    `relations` has the same format as ``deb822.Packages.relations``.
+
+    .. versionadded:: 0.2
+
+    """
+
+    __slots__ = ('fields', '_relations')
+
+    def __init__(self, fields):
+        self.fields = fields
+        self._relations = None
+
+    def __getitem__(self, key):
+        return self.fields[key.lower()]
+
+    def __contains__(self, key):
+        return key.lower() in self.fields
+
+    def get(self, key, default=None):
+        return self.fields.get(key.lower(), default)
+
+    def keys(self):
+        return self.fields.keys()
+
+    def items(self):
+        return self.fields.items()
+
+    @property
+    def relations(self):
+        """
+
+        Parses the relation fields the first time they are needed.
+
+        :return: a dictionary mapping each relation type to a list of
+                 alternatives, as ``deb822.Packages.relations`` does.
+
+        .. versionadded:: 0.2
+
+        """
+        if self._relations is None:
+            self._relations = dict(
+                (relation_type,
+                 deb822.PkgRelation.parse_relations(self.fields[relation_type])
+                 if relation_type in self.fields else [])
+                for relation_type in relation_types)
+        return self._relations
+
+
+def decode_value(value):
+    """
+
+    :param value: a byte string read from a control file.
+    :return: the value as a unicode string. It is decoded as UTF-8 or, if
+             that fails, as Latin-1.
+
+    .. versionadded:: 0.2
+
+    """
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        return value.decode('latin-1')
+
+
+def parse_paragraph(text, fields=RECORDED_FIELDS):
+    """
+
+    Parses the text of a single paragraph.
+
+    Multi-line values are kept as ``deb822`` does: the continuation lines
+    are appended after a newline, with their leading whitespace.
+
+    :param text: the paragraph, without the separating blank lines.
+    :param fields: the set of field names (in lowercase) to keep.
+    :return: a `ControlRecord` object, whose values are unicode strings.
+
+    .. versionadded:: 0.2
+
+    """
+    values = {}
+    current = None
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if line[0] in ' \t':
+            if current is not None:
+                values[current] += '\n' + line.rstrip()
+            continue
+        name, _, value = line.partition(':')
+        current = name.lower()
+        if current in fields:
+            values[current] = value.strip()
+        else:
+            current = None
+    return ControlRecord(dict((name, decode_value(value))
+                              for name, value in values.items()))
+
+
+def iter_paragraphs(stream, fields=RECORDED_FIELDS, block_size=BLOCK_SIZE):
+    """
+
+    Reads the paragraphs of a control file from a file-like object.
+
+    :param stream: a file-like object with the decompressed control file.
+    :param fields: the set of field names (in lowercase) to keep.
+    :param block_size: number of bytes read at once.
+    :return: a generator of `ControlRecord` objects.
+
+    .. versionadded:: 0.2
+
+    """
+    pending = ''
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        pending += block
+        paragraphs = PARAGRAPH_SEPARATOR.split(pending)
+        pending = paragraphs.pop()
+        for text in paragraphs:
+            if text.strip():
+                yield parse_paragraph(text, fields)
+    if pending.strip():
+        yield parse_paragraph(pending, fields)
+
+
+def iter_control_file(path, fields=RECORDED_FIELDS, block_size=BLOCK_SIZE):
+    """
+
+    Reads the paragraphs of a control file stored on disk.
+
+    :param path: path to the control file. It is decompressed on the fly if
+                 its name ends with ``.gz``.
+    :param fields: the set of field names (in lowercase) to keep.
+    :param block_size: number of bytes read at once.
+    :return: a generator of `ControlRecord` objects.
+
+    .. versionadded:: 0.2
+
+    """
+    if path.endswith('.gz'):
+        stream = gzip.open(path, 'rb')
+    else:
+        stream = open(path, 'rb')
+    with stream:
+        for record in iter_paragraphs(stream, fields, block_size):
+            yield record
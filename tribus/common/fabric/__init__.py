@@ -85,7 +85,7 @@ env.tribus_start_container_script = get_path([BASEDIR, 'tribus',
 
 waffle_switches = SWITCHES_CONFIGURATION.keys()
 mounts = ['%(basedir)s:%(basedir)s:rw' % env, '/tmp:/tmp:rw']
-start_services = ['ssh', 'postgresql', 'slapd']
+start_services = ['ssh', 'postgresql', 'slapd', 'memcached']
 change_passwd = ['root:tribus', 'postgres:tribus', 'openldap:tribus']
 
 env.mounts = ' '.join('--volume %s' % i for i in mounts)
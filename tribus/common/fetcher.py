@@ -0,0 +1,446 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.common.fetcher
+=====================
+
+This module contains functions to download files from a repository
+concurrently, reusing HTTP connections and verifying their MD5sum while
+they are written to disk.
+
+"""
+
+import os
+import json
+import httplib
+import urllib2
+import hashlib
+import tempfile
+import threading
+import urlparse
+from multiprocessing.pool import ThreadPool
+from tribus.common.logger import get_logger
+from tribus.common.utils import md5Checksum
+from tribus.config.pkgrecorder import FETCH_WORKERS, FETCH_TIMEOUT
+
+logger = get_logger()
+
+BLOCK_SIZE = 65536
+MAX_REDIRECTS = 5
+
+
+class ConnectionPool(object):
+    """
+
+    Keeps one persistent HTTP connection per host and per thread, so that
+    consecutive requests to the same repository do not open a new TCP
+    connection each time.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, timeout=FETCH_TIMEOUT):
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def get(self, scheme, netloc):
+        """
+
+        Returns the connection of the current thread for a host,
+        creating it if needed.
+
+        :param scheme: either ``http`` or ``https``.
+        :param netloc: the host (and optionally the port) to connect to.
+        :return: an ``HTTPConnection`` object.
+
+        .. versionadded:: 0.2
+
+        """
+        connections = self.local.__dict__.setdefault('connections', {})
+        if (scheme, netloc) not in connections:
+            if scheme == 'https':
+                connection = httplib.HTTPSConnection(netloc,
+                                                     timeout=self.timeout)
+            else:
+                connection = httplib.HTTPConnection(netloc,
+                                                    timeout=self.timeout)
+            connections[(scheme, netloc)] = connection
+        return connections[(scheme, netloc)]
+
+    def discard(self, scheme, netloc):
+        """
+
+        Closes and forgets the connection of the current thread for a host.
+
+        :param scheme: either ``http`` or ``https``.
+        :param netloc: the host (and optionally the port).
+
+        .. versionadded:: 0.2
+
+        """
+        connections = self.local.__dict__.get('connections', {})
+        connection = connections.pop((scheme, netloc), None)
+        if connection:
+            connection.close()
+
+
+class CacheMetadata(object):
+    """
+
+    Small persistent store with what is known about the files of a cache
+    directory and the remote files they come from.
+
+    For each local file it keeps its MD5sum together with the size and
+    modification time it had when the sum was computed, so the file does
+    not need to be hashed again while they do not change. For each remote
+    index file (e.g. a Release file) it keeps the ``ETag`` and
+    ``Last-Modified`` headers, the MD5sum of its contents and the local
+    files that were synchronized from it.
+
+    The data is stored in JSON format in `path`.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {'files': {}, 'indexes': {}}
+        if os.path.isfile(path):
+            try:
+                with open(path) as f:
+                    self.data.update(json.load(f))
+            except ValueError:
+                logger.warning('Ignoring corrupt cache metadata in %s' % path)
+
+    def save(self):
+        """
+
+        Writes the metadata to disk, replacing the previous file atomically.
+
+        .. versionadded:: 0.2
+
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        with os.fdopen(fd, 'w') as f:
+            with self.lock:
+                json.dump(self.data, f)
+        os.rename(tmp_path, self.path)
+
+    def is_fresh(self, path):
+        """
+
+        Checks if a local file still has the size and modification time
+        recorded with its MD5sum.
+
+        :param path: path to the local file.
+        :return: True if the recorded MD5sum can be trusted.
+
+        .. versionadded:: 0.2
+
+        """
+        entry = self.data['files'].get(path)
+        if not entry or not os.path.isfile(path):
+            return False
+        st = os.stat(path)
+        return entry['size'] == st.st_size and entry['mtime'] == st.st_mtime
+
+    def md5(self, path):
+        """
+
+        Returns the MD5sum of a local file, hashing it only if it changed
+        since the last time it was recorded.
+
+        :param path: path to the local file.
+        :return: the MD5sum, or None if the file does not exist.
+
+        .. versionadded:: 0.2
+
+        """
+        if self.is_fresh(path):
+            return self.data['files'][path]['md5']
+        md5sum = md5Checksum(path)
+        if md5sum:
+            self.set_file(path, md5sum)
+        return md5sum
+
+    def set_file(self, path, md5sum):
+        """
+
+        Records the MD5sum of a local file along with its current size and
+        modification time.
+
+        :param path: path to the local file.
+        :param md5sum: the MD5sum of the file.
+
+        .. versionadded:: 0.2
+
+        """
+        st = os.stat(path)
+        with self.lock:
+            self.data['files'][path] = {'md5': md5sum, 'size': st.st_size,
+                                        'mtime': st.st_mtime}
+
+    def index_headers(self, url):
+        """
+
+        Builds the conditional request headers for a remote index file. No
+        headers are returned if any of the local files synchronized from it
+        was modified, so that the index is downloaded again.
+
+        :param url: the URL of the remote index file.
+        :return: a dictionary of request headers.
+
+        .. versionadded:: 0.2
+
+        """
+        entry = self.data['indexes'].get(url)
+        if not self.index_intact(url):
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last-modified'):
+            headers['If-Modified-Since'] = entry['last-modified']
+        return headers
+
+    def index_intact(self, url):
+        """
+
+        Checks that an index file was synchronized before and that every
+        local file that depends on it is still as it was left.
+
+        :param url: the URL of the remote index file.
+        :return: True if the local copies can be trusted.
+
+        .. versionadded:: 0.2
+
+        """
+        entry = self.data['indexes'].get(url)
+        if not entry:
+            return False
+        return all(self.is_fresh(path) and
+                   self.data['files'][path]['md5'] == md5sum
+                   for path, md5sum in entry['files'].items())
+
+    def index_digest(self, url):
+        """
+
+        :param url: the URL of the remote index file.
+        :return: the recorded MD5sum of its contents, or None.
+
+        .. versionadded:: 0.2
+
+        """
+        return self.data['indexes'].get(url, {}).get('digest')
+
+    def set_index(self, url, headers, digest, files):
+        """
+
+        Records a remote index file once every local file that depends on
+        it has been synchronized.
+
+        :param url: the URL of the remote index file.
+        :param headers: the response headers of the index file.
+        :param digest: the MD5sum of the contents of the index file.
+        :param files: a dictionary mapping local paths to their MD5sum.
+
+        .. versionadded:: 0.2
+
+        """
+        with self.lock:
+            self.data['indexes'][url] = {
+                'etag': headers.get('etag'),
+                'last-modified': headers.get('last-modified'),
+                'digest': digest, 'files': files}
+
+
+def open_url(url, pool, headers=None, redirects=MAX_REDIRECTS):
+    """
+
+    Opens a URL for reading. HTTP URLs are requested through `pool`,
+    any other scheme (e.g. ``file://``) is handled by ``urllib2``.
+
+    :param url: the URL to open.
+    :param pool: a `ConnectionPool` object.
+    :param headers: a dictionary of additional request headers.
+    :param redirects: the number of redirections that may still be followed.
+    :return: a ``(status, response headers, file-like object)`` tuple.
+
+    .. versionadded:: 0.2
+
+    """
+    scheme, netloc, path, query, _ = urlparse.urlsplit(url)
+    if scheme not in ('http', 'https'):
+        response = urllib2.urlopen(url, timeout=pool.timeout)
+        return 200, {}, response
+    if query:
+        path = '%s?%s' % (path, query)
+
+    for retry in (True, False):
+        connection = pool.get(scheme, netloc)
+        try:
+            connection.request('GET', path or '/', headers=headers or {})
+            response = connection.getresponse()
+            break
+        except (httplib.HTTPException, IOError):
+            # The server may have closed an idle keep-alive connection.
+            pool.discard(scheme, netloc)
+            if not retry:
+                raise
+
+    response_headers = dict(response.getheaders())
+    if response.status in (301, 302, 303, 307) and redirects:
+        response.read()
+        return open_url(urlparse.urljoin(url, response_headers['location']),
+                        pool, headers, redirects - 1)
+    if response.status >= 400:
+        response.read()
+        raise IOError('HTTP error %s while getting %s' %
+                      (response.status, url))
+    return response.status, response_headers, response
+
+
+def fetch(url, path, md5sum=None, pool=None, headers=None):
+    """
+
+    Downloads a file, computing its MD5sum while it is streamed to a
+    temporary file in the same directory. The temporary file is renamed
+    to `path` only if the download is complete and the checksum matches,
+    so readers never see a partial file.
+
+    :param url: the URL of the remote file.
+    :param path: the local path where the file will be stored.
+    :param md5sum: the expected MD5sum. If None, it is not verified.
+    :param pool: a `ConnectionPool` object, a new one is used if None.
+    :param headers: a dictionary of additional request headers.
+    :return: a ``(status, response headers)`` tuple. The file is written
+             only when the status is 200.
+
+    .. versionadded:: 0.2
+
+    """
+    pool = pool or ConnectionPool()
+    status, response_headers, response = open_url(url, pool, headers)
+    if status != 200:
+        response.read()
+        return status, response_headers
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix='.%s.' % os.path.basename(path))
+    try:
+        m = hashlib.md5()
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                data = response.read(BLOCK_SIZE)
+                if not data:
+                    break
+                m.update(data)
+                f.write(data)
+        if md5sum and m.hexdigest() != md5sum:
+            raise IOError('MD5sum mismatch for %s: %s != %s' %
+                          (url, m.hexdigest(), md5sum))
+        os.rename(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return status, response_headers
+
+
+def sync_file(job, pool, metadata=None):
+    """
+
+    Makes sure that a local file matches its remote copy. The local file is
+    checked first and is downloaded only if it is missing or its MD5sum
+    differs from the expected one.
+
+    :param job: a ``(url, path, md5sum)`` tuple.
+    :param pool: a `ConnectionPool` object.
+    :param metadata: a `CacheMetadata` object. If given, the local file is
+                     only hashed when its size or modification time changed.
+    :return: `path` if the file was downloaded, None otherwise.
+
+    .. versionadded:: 0.2
+
+    """
+    url, path, md5sum = job
+    if metadata:
+        local_md5 = metadata.md5(path)
+    else:
+        local_md5 = md5Checksum(path)
+    if md5sum and local_md5 == md5sum:
+        logger.info('There are no changes in %s' % path)
+        return None
+    try:
+        fetch(url, path, md5sum, pool)
+    except (EnvironmentError, httplib.HTTPException), e:
+        logger.error('Could not get %s, error: %s' % (url, e))
+        return None
+    if metadata and md5sum:
+        metadata.set_file(path, md5sum)
+    return path
+
+
+def run_jobs(function, jobs, workers=FETCH_WORKERS):
+    """
+
+    Runs `function` over every job with a bounded pool of threads that
+    share one `ConnectionPool`.
+
+    :param function: a callable that receives a job and a `ConnectionPool`.
+    :param jobs: a list of jobs.
+    :param workers: the maximum number of concurrent jobs.
+    :return: the list of results, in the same order as `jobs`.
+
+    .. versionadded:: 0.2
+
+    """
+    if not jobs:
+        return []
+    pool = ConnectionPool()
+    threads = ThreadPool(min(workers, len(jobs)))
+    try:
+        return threads.map(lambda job: function(job, pool), jobs, 1)
+    finally:
+        threads.close()
+        threads.join()
+
+
+def fetch_all(jobs, workers=FETCH_WORKERS, metadata=None):
+    """
+
+    Synchronizes a set of local files with their remote copies using
+    `sync_file` concurrently.
+
+    :param jobs: a list of ``(url, path, md5sum)`` tuples.
+    :param workers: the maximum number of concurrent downloads.
+    :param metadata: an optional `CacheMetadata` object.
+    :return: the list of paths that were downloaded.
+
+    .. versionadded:: 0.2
+
+    """
+    return filter(None, run_jobs(lambda job, pool: sync_file(job, pool,
+                                                             metadata),
+                                 jobs, workers))
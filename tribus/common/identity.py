@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.common.identity
+======================
+
+This module contains bounded identity maps used while recording control
+files, so that rows looked up over and over (e.g. the ``libc6`` package
+or a popular maintainer) are queried only once per recording session.
+
+"""
+
+from collections import OrderedDict
+from tribus.common.logger import get_logger
+from tribus.config.pkgrecorder import IDENTITY_MAP_SIZE
+
+logger = get_logger()
+
+
+class LRUCache(object):
+    """
+
+    A dictionary that holds at most `size` items, discarding the least
+    recently used one when it is full. It counts its hits and misses.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, size=IDENTITY_MAP_SIZE):
+        self.size = size
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key):
+        """
+
+        :param key: the key to look up.
+        :return: the value stored for `key`, or None.
+
+        .. versionadded:: 0.2
+
+        """
+        try:
+            value = self.items.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.items[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """
+
+        Stores a value, evicting the least recently used one if needed.
+
+        :param key: the key of the value.
+        :param value: the value to store.
+
+        .. versionadded:: 0.2
+
+        """
+        self.items.pop(key, None)
+        self.items[key] = value
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def discard(self, key):
+        """
+
+        :param key: the key to remove, if present.
+
+        .. versionadded:: 0.2
+
+        """
+        self.items.pop(key, None)
+
+
+class RecordingSession(object):
+    """
+
+    A set of identity maps, one per model, shared by the model methods
+    that record a control file.
+
+    Objects are stored by their lookup values, so every lookup of the same
+    row during the session returns the same instance and only the first
+    one reaches the database.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, size=IDENTITY_MAP_SIZE):
+        self.size = size
+        self.maps = {}
+
+    def _key(self, lookup):
+        return tuple((field, getattr(value, 'pk', value))
+                     for field, value in sorted(lookup.items()))
+
+    def _map(self, model):
+        if model.__name__ not in self.maps:
+            self.maps[model.__name__] = LRUCache(self.size)
+        return self.maps[model.__name__]
+
+    def get_or_create(self, model, **lookup):
+        """
+
+        Works as ``model.objects.get_or_create(**lookup)``, but looks in the
+        identity map of `model` first.
+
+        :param model: a model class.
+        :param lookup: the field values that identify the object.
+        :return: an instance of `model`.
+
+        .. versionadded:: 0.2
+
+        """
+        identity_map = self._map(model)
+        key = self._key(lookup)
+        obj = identity_map.get(key)
+        if obj is None:
+            obj, _ = model.objects.get_or_create(**lookup)
+            identity_map.set(key, obj)
+        return obj
+
+    def forget(self, model, **lookup):
+        """
+
+        Removes an object from the identity map of `model`. It must be
+        called when the object is deleted during the session.
+
+        :param model: a model class.
+        :param lookup: the field values that identify the object.
+
+        .. versionadded:: 0.2
+
+        """
+        self._map(model).discard(self._key(lookup))
+
+    def stats(self):
+        """
+
+        :return: a dictionary mapping each model name to a ``(hits,
+                 misses)`` tuple.
+
+        .. versionadded:: 0.2
+
+        """
+        return dict((name, (identity_map.hits, identity_map.misses))
+                    for name, identity_map in self.maps.items())
+
+    def log_stats(self, name):
+        """
+
+        Logs the hits and misses of every identity map since the last
+        call, and resets the counters. The stored objects are kept.
+
+        :param name: what was recorded since the last call, e.g. the path
+                     of a control file.
+
+        .. versionadded:: 0.2
+
+        """
+        for model, (hits, misses) in sorted(self.stats().items()):
+            logger.info('%s: %s lookups, %s hits and %s misses in %s' %
+                        (model, hits + misses, hits, misses, name))
+        for identity_map in self.maps.values():
+            identity_map.hits = identity_map.misses = 0
+
+
+def get_or_create(model, session=None, **lookup):
+    """
+
+    Gets or creates an object through `session` if there is one, or
+    directly from the database otherwise.
+
+    :param model: a model class.
+    :param session: a `RecordingSession` object or None.
+    :param lookup: the field values that identify the object.
+    :return: an instance of `model`.
+
+    .. versionadded:: 0.2
+
+    """
+    if session is None:
+        obj, _ = model.objects.get_or_create(**lookup)
+        return obj
+    return session.get_or_create(model, **lookup)
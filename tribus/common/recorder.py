@@ -32,14 +32,32 @@ This module contains common functions to record package data from a repository.
 
 import os
 import re
-import gzip
-import urllib
-import urllib2
+import httplib
+import time
+import hashlib
+from multiprocessing import Pool
 from debian import deb822
+from email.Utils import parseaddr
+from django.db import connection, transaction, IntegrityError
 from django.db.models import Q
 from tribus.common.logger import get_logger
-from tribus.web.cloud.models import Package, Details
-from tribus.common.utils import md5Checksum, list_items, readconfig
+from tribus.common.controlfile import iter_control_file
+from tribus.common.identity import RecordingSession
+from tribus.common.version import version_key
+from tribus.web.cloud.catalogue import build_catalogue
+from tribus.web.cloud.graph import build_graphs
+from tribus.web.scopes import invalidate_responses
+from tribus.web.indexing import deferred_indexing, updated
+from tribus.common.fetcher import (CacheMetadata, open_url, run_jobs,
+                                   fetch_all)
+from tribus.web.cloud.models import (Package, Details, Maintainer, Tag,
+                                     Label, Relation, ReverseRelation,
+                                     VersionMatrix, relation_atoms,
+                                     invalidate_profiles)
+from tribus.common.utils import list_items, readconfig
+from tribus.config.pkgrecorder import (PACKAGE_FIELDS, DETAIL_FIELDS,
+                                       BULK_BATCH_SIZE, BULK_QUERY_SIZE,
+                                       FETCH_WORKERS, RECORDER_WORKERS)
 
 logger = get_logger()
 # hdlr = logging.FileHandler(os.path.join(BASEDIR, 'tribus_recorder.log'))
@@ -49,7 +67,7 @@ logger = get_logger()
 # logger.setLevel(logging.INFO)
 
 
-def update_paragraph(paragraph, branch, comp):
+def update_paragraph(paragraph, branch, comp, session=None):
     """
 
     Updates basic data and details of a package in the database.
@@ -58,6 +76,7 @@ def update_paragraph(paragraph, branch, comp):
     :param paragraph: contains information about a binary package.
     :param branch: codename of the Canaima's version that will be updated.
     :param comp: component to which the paragraph belongs.
+    :param session: an optional `RecordingSession` object.
 
     .. versionadded:: 0.1
 
@@ -66,20 +85,565 @@ def update_paragraph(paragraph, branch, comp):
     logger.info('Updating package "%s" in %s:%s' %
                 (paragraph['Package'], branch, comp))
     package = Package.objects.get(Name=paragraph.get('Package'))
-    package.update(paragraph, branch, comp)
+    package.update(paragraph, branch, comp, session)
     logger.info('Package "%s" successfully updated in %s:%s' %
                 (paragraph['Package'], branch, comp))
 
 
-def create_cache(repository_root, cache_dir_path):
+def chunks(items, size=BULK_QUERY_SIZE):
+    """
+
+    Splits a sequence into lists of at most `size` elements.
+
+    :param items: any iterable.
+    :param size: maximum length of each chunk.
+    :return: a generator of lists.
+
+    .. versionadded:: 0.2
+
+    >>> list(chunks(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+
+    """
+    items = list(items)
+    for i in xrange(0, len(items), size):
+        yield items[i:i + size]
+
+
+def filter_in(queryset, field, values):
+    """
+
+    Runs a ``field__in`` lookup over `values` in chunks small enough to
+    be accepted by every database backend.
+
+    :param queryset: the queryset to filter.
+    :param field: the name of the field to match against.
+    :param values: the values to look for.
+    :return: a generator with the matching results.
+
+    .. versionadded:: 0.2
+
+    """
+    for chunk in chunks(set(values)):
+        for result in queryset.filter(**{'%s__in' % field: chunk}):
+            yield result
+
+
+def paragraph_labels(paragraph):
+    """
+
+    Processes the contents of the 'Tag' field of a paragraph.
+
+    :param paragraph: contains information about a binary package.
+    :return: a list of ``(label name, tag value)`` tuples.
+
+    .. versionadded:: 0.2
+
+    """
+    labels = []
+    if 'Tag' in paragraph:
+        for tag in paragraph['Tag'].replace('\n', '').split(', '):
+            tag_name, tag_value = tag.split('::')
+            labels.append((tag_name, tag_value))
+    return labels
+
+
+def paragraph_relations(paragraph):
+    """
+
+    Flattens the relations of a paragraph the same way
+    `Details.add_relations` does.
+
+    :param paragraph: contains information about a binary package.
+    :return: a list of ``(relation_type, name, order, version, alt_id)``
+             tuples.
+
+    .. versionadded:: 0.2
+
+    """
+    return relation_atoms(paragraph.relations.items())
+
+
+def insert_missing(model, objects):
+    """
+
+    Inserts new rows with a single ``bulk_create``. If another process
+    inserts some of them at the same time, which breaks a unique
+    constraint, they are inserted one by one instead, skipping the ones
+    that already exist.
+
+    :param model: the model class.
+    :param objects: a list of unsaved instances of `model`.
+
+    .. versionadded:: 0.2
+
+    """
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(objects)
+    except IntegrityError:
+        for obj in objects:
+            try:
+                with transaction.atomic():
+                    obj.save(force_insert=True)
+            except IntegrityError:
+                pass
+
+
+def _get_or_create_ids(model, keys, key_fields, lookup_field, make):
+    """
+
+    Resolves the primary keys of `model` rows identified by `keys`,
+    creating the missing ones with a single ``bulk_create``. If another
+    process inserts some of them at the same time, the missing ones are
+    created one by one instead.
+
+    :param model: the model class.
+    :param keys: a set of tuples, one value per field in `key_fields`.
+    :param key_fields: the names of the fields that identify a row.
+    :param lookup_field: the field used to narrow the lookup query, it must
+                         be the first element of `key_fields`.
+    :param make: a callable that returns a new (unsaved) instance from a key.
+    :return: a dictionary mapping keys to primary keys.
+
+    .. versionadded:: 0.2
+
+    """
+    fields = list(key_fields) + ['id']
+    ids = {}
+
+    def lookup(pending):
+        for row in filter_in(model.objects.values_list(*fields),
+                             lookup_field, [key[0] for key in pending]):
+            if row[:-1] in pending:
+                ids.setdefault(row[:-1], row[-1])
+
+    lookup(keys)
+    missing = [key for key in keys if key not in ids]
+    if missing:
+        insert_missing(model, [make(key) for key in missing])
+        lookup(set(missing))
+    return ids
+
+
+def unique_paragraphs(paragraphs):
+    """
+
+    Removes repeated ``(package, architecture)`` paragraphs, keeping the
+    first one. `Package.objects.create_auto` ignores the repeated ones
+    because their details already exist.
+
+    :param paragraphs: an iterable of paragraphs.
+    :return: a list of paragraphs.
+
+    .. versionadded:: 0.2
+
+    """
+    unique, result = set(), []
+    for paragraph in paragraphs:
+        key = (paragraph['Package'], paragraph['Architecture'])
+        if key not in unique:
+            unique.add(key)
+            result.append(paragraph)
+    return result
+
+
+def bulk_record_packages(paragraphs, relations, update=False):
+    """
+
+    Records the basic data, maintainers and labels of the packages of a
+    batch of paragraphs, and creates the packages that are only known as
+    the target of a relation.
+
+    As in `Package.objects.create_auto`, the basic data of a package is only
+    recorded if the package does not exist yet or has no maintainer (i.e.
+    it was created as the target of a relation).
+
+    :param paragraphs: a list of paragraphs, as returned by
+                       `unique_paragraphs`.
+    :param relations: a dictionary mapping ``id(paragraph)`` to the result
+                      of `paragraph_relations`.
+    :param update: if True, the basic data and labels of every package are
+                   overwritten. The caller is expected to have deleted the
+                   previous labels.
+    :return: a tuple ``(package_ids, recorded)`` where `package_ids` maps
+             the name of every package in the batch (including the related
+             ones) to its primary key and `recorded` is the set of packages
+             whose basic data was recorded.
+
+    .. versionadded:: 0.2
+
+    """
+    names = set(p['Package'] for p in paragraphs)
+    related_names = set(atom[1] for atoms in relations.values()
+                        for atom in atoms)
+
+    existing = {}
+    for name, pk, maintainer in filter_in(
+            Package.objects.values_list('Name', 'id', 'Maintainer'),
+            'Name', names | related_names):
+        existing.setdefault(name, (pk, maintainer))
+
+    full = [p for p in paragraphs
+            if update or not existing.get(p['Package'], (None, None))[1]]
+
+    maintainer_ids = _get_or_create_ids(
+        Maintainer, set(parseaddr(p['Maintainer']) for p in full),
+        ['Name', 'Email'], 'Name',
+        lambda key: Maintainer(Name=key[0], Email=key[1]))
+
+    def package_data(paragraph):
+        data = dict((db_field, paragraph.get(field))
+                    for field, db_field in PACKAGE_FIELDS.items())
+        data['Maintainer'] = Maintainer(pk=maintainer_ids[
+            parseaddr(paragraph['Maintainer'])])
+        return data
+
+    new_packages, seen = [], set()
+    for paragraph in full:
+        if paragraph['Package'] in existing:
+            if paragraph['Package'] not in seen:
+                Package.objects.filter(pk=existing[paragraph['Package']][0]
+                                       ).update(**package_data(paragraph))
+        elif paragraph['Package'] not in seen:
+            new_packages.append(Package(**package_data(paragraph)))
+        seen.add(paragraph['Package'])
+    new_packages.extend(Package(Name=name)
+                        for name in related_names - names
+                        if name not in existing)
+    insert_missing(Package, new_packages)
+
+    package_ids = dict((name, pk) for name, (pk, _) in existing.items())
+    for name, pk in filter_in(Package.objects.values_list('Name', 'id'),
+                              'Name', [p.Name for p in new_packages]):
+        package_ids.setdefault(name, pk)
+    updated(Package, [package_ids[name]
+                      for name in seen | set(p.Name for p in new_packages)])
+
+    labels = dict((p['Package'], paragraph_labels(p)) for p in full)
+    tag_ids = _get_or_create_ids(
+        Tag, set((value,) for pairs in labels.values()
+                 for _, value in pairs),
+        ['Value'], 'Value', lambda key: Tag(Value=key[0]))
+    label_ids = _get_or_create_ids(
+        Label, set((tag_ids[(value,)], name)
+                   for pairs in labels.values() for name, value in pairs),
+        ['Tags', 'Name'], 'Tags',
+        lambda key: Label(Tags_id=key[0], Name=key[1]))
+    Package.Labels.through.objects.bulk_create(
+        [Package.Labels.through(package_id=package_ids[name],
+                                label_id=label_ids[(tag_ids[(value,)],
+                                                    label_name)])
+         for name, pairs in labels.items()
+         for label_name, value in set(pairs)])
+
+    return package_ids, seen
+
+
+def bulk_record_relations(paragraphs, relations, package_ids):
+    """
+
+    Makes sure that the relations of a batch of paragraphs exist.
+
+    :param paragraphs: a list of paragraphs.
+    :param relations: a dictionary mapping ``id(paragraph)`` to the result
+                      of `paragraph_relations`.
+    :param package_ids: a dictionary mapping package names to primary keys,
+                        as returned by `bulk_record_packages`.
+    :return: a dictionary mapping ``(related_package, relation_type, order,
+             version, alt_id)`` tuples to the primary key of the relation.
+
+    .. versionadded:: 0.2
+
+    """
+    return Relation.objects.bulk_get_or_create(
+        (package_ids[name], relation_type, order, version, alt_id)
+        for p in paragraphs
+        for relation_type, name, order, version, alt_id in relations[id(p)])
+
+
+def bulk_record_details(paragraphs, relations, package_ids, branch, comp):
+    """
+
+    Records the details of a batch of paragraphs and links them to their
+    packages and relations.
+
+    The version matrix is not refreshed here: `bulk_record_paragraphs`
+    refreshes it for its batch and `fill_db_sharded` rebuilds it once all
+    the shards are recorded.
+
+    :param paragraphs: the paragraphs whose details will be recorded.
+    :param relations: a dictionary mapping ``id(paragraph)`` to the result
+                      of `paragraph_relations`.
+    :param package_ids: a dictionary mapping package names to primary keys,
+                        as returned by `bulk_record_packages`.
+    :param branch: codename of the Canaima's version that will be recorded.
+    :param comp: component to which the paragraphs belong.
+    :return: the number of details recorded.
+
+    .. versionadded:: 0.2
+
+    """
+    Details.objects.bulk_create(
+        [Details(Distribution=branch, Component=comp,
+                 VersionKey=version_key(p.get('Version')),
+                 **dict((db_field, p.get(field))
+                        for field, db_field in DETAIL_FIELDS.items()))
+         for p in paragraphs])
+    details_ids = {}
+    for arch, filename, md5sum, pk in filter_in(
+            Details.objects.filter(Distribution=branch, Component=comp,
+                                   package__isnull=True).values_list(
+                'Architecture', 'Filename', 'MD5sum', 'id'),
+            'Filename', [p.get('Filename') for p in paragraphs]):
+        details_ids.setdefault((arch, filename, md5sum), pk)
+
+    def details_id(paragraph):
+        return details_ids[(paragraph.get('Architecture'),
+                            paragraph.get('Filename'),
+                            paragraph.get('MD5sum'))]
+
+    Package.Details.through.objects.bulk_create(
+        [Package.Details.through(package_id=package_ids[p['Package']],
+                                 details_id=details_id(p))
+         for p in paragraphs])
+    invalidate_profiles(package_ids[p['Package']] for p in paragraphs)
+    # The distributions and architectures are part of the search documents.
+    updated(Package, [package_ids[p['Package']] for p in paragraphs])
+
+    relation_ids = bulk_record_relations(paragraphs, relations, package_ids)
+    Details.Relations.through.objects.bulk_create(
+        [Details.Relations.through(details_id=details_id(p),
+                                   relation_id=pk)
+         for p in paragraphs
+         for pk in set(relation_ids[(package_ids[name], relation_type, order,
+                                     version, alt_id)]
+                       for relation_type, name, order, version, alt_id
+                       in relations[id(p)])])
+    ReverseRelation.objects.index_details(
+        details_id(p) for p in paragraphs)
+    return len(paragraphs)
+
+
+def bulk_record_paragraphs(paragraphs, branch, comp, update=False):
+    """
+
+    Records a batch of paragraphs using a few set-based queries.
+
+    The result is the same as calling `Package.objects.create_auto` on each
+    paragraph: packages, maintainers, tags, labels and relations are
+    resolved for the whole batch at once, missing rows are inserted with
+    ``bulk_create`` and many-to-many links are written directly into the
+    through tables. Search index signals are not sent for the new rows;
+    the recorded packages are added to the current search index batch
+    instead (see `tribus.web.indexing`).
+
+    :param paragraphs: a list of paragraphs from the same control file.
+    :param branch: codename of the Canaima's version that will be recorded.
+    :param comp: component to which the paragraphs belong.
+    :param update: if True, the basic data and labels of every package are
+                   overwritten and details are recorded even if they
+                   already exist. The caller is expected to have deleted
+                   the previous details and labels.
+    :return: the number of details recorded.
+
+    .. versionadded:: 0.2
+
+    """
+    paragraphs = unique_paragraphs(paragraphs)
+    relations = dict((id(p), paragraph_relations(p)) for p in paragraphs)
+    package_ids, full = bulk_record_packages(paragraphs, relations, update)
+
+    # Details are recorded for new packages, and for known packages that do
+    # not have details in this distribution and architecture yet.
+    recorded = set()
+    for pk, arch in filter_in(
+            Details.objects.filter(Distribution=branch, Component=comp
+                                   ).values_list('package', 'Architecture'),
+            'package', [package_ids[p['Package']] for p in paragraphs
+                        if p['Package'] not in full]):
+        recorded.add((pk, arch))
+    to_record = [p for p in paragraphs
+                 if p['Package'] in full or not
+                 ((package_ids[p['Package']], p['Architecture']) in recorded or
+                  (package_ids[p['Package']], 'all') in recorded)]
+
+    total = bulk_record_details(to_record, relations, package_ids, branch,
+                                comp)
+    VersionMatrix.objects.refresh(package_ids[p['Package']]
+                                  for p in to_record)
+    return total
+
+
+def record_control_file(control_file_path, branch, comp,
+                        batch_size=BULK_BATCH_SIZE):
+    """
+
+    Records a whole control file into the database in bulk.
+
+    The paragraphs are read in batches of `batch_size` and recorded with
+    `bulk_record_paragraphs`, inside a single transaction. The search index
+    is updated once, when the transaction ends.
+
+    :param control_file_path: path to a gzipped control file.
+    :param branch: codename of the Canaima's version that will be recorded.
+    :param comp: component to which the control file belongs.
+    :param batch_size: number of paragraphs kept in memory at once.
+    :return: the number of details recorded.
+
+    .. versionadded:: 0.2
+
+    """
+    total = 0
+    batch = []
+    logger.info('Recording %s in bulk' % control_file_path)
+    try:
+        with deferred_indexing(), transaction.atomic():
+            for paragraph in iter_control_file(control_file_path):
+                batch.append(paragraph)
+                if len(batch) >= batch_size:
+                    total += bulk_record_paragraphs(batch, branch, comp)
+                    batch = []
+            if batch:
+                total += bulk_record_paragraphs(batch, branch, comp)
+    except IOError, e:
+        logger.warning('Could not read control file in %s, error code #%s'
+                       % (control_file_path, e))
+        return 0
+    logger.info('%s details recorded from %s' % (total, control_file_path))
+    return total
+
+
+def read_release(job, pool):
+    """
+
+    Reads the list of control files of a distribution from its Release
+    file.
+
+    If a `CacheMetadata` object is given, the Release file is requested
+    conditionally and is considered unchanged if the server answers
+    ``304 Not Modified`` or if its contents have the recorded MD5sum.
+
+    :param job: a ``(codename, release url, metadata)`` tuple, `metadata`
+                may be None.
+    :param pool: a `ConnectionPool` object.
+    :return: a ``(codename, release url, md5list, headers, digest)`` tuple.
+             `md5list` is None if the Release file could not be read or
+             did not change.
+
+    .. versionadded:: 0.2
+
+    """
+    name, release_path, metadata = job
+    headers = metadata and metadata.index_headers(release_path) or {}
+    try:
+        status, response_headers, response = open_url(release_path, pool,
+                                                      headers)
+        content = response.read()
+    except (IOError, httplib.HTTPException), e:
+        logger.warning('Could not read release file in %s, error code #%s' % (release_path, e))
+        return name, release_path, None, {}, None
+    digest = hashlib.md5(content).hexdigest()
+    if status == 304 or (metadata and metadata.index_intact(release_path) and
+                         metadata.index_digest(release_path) == digest):
+        logger.info('There are no changes in %s' % release_path)
+        return name, release_path, None, response_headers, digest
+    return (name, release_path, deb822.Release(content).get('MD5sum'),
+            response_headers, digest)
+
+
+def control_file_jobs(repository_root, releases, cache_dir_path):
+    """
+
+    Lists the binary control files of a set of distributions together with
+    their location in the cache.
+
+    :param repository_root: url of the repository.
+    :param releases: a list of ``(codename, md5list)`` tuples, where
+                     `md5list` is the MD5sum field of a Release file.
+    :param cache_dir_path: path to the cache directory.
+    :return: a list of ``(url, path, md5sum)`` tuples.
+
+    .. versionadded:: 0.2
+
+    """
+    jobs = []
+    for name, md5list in releases:
+        for control_file_data in md5list or []:
+            if re.match('[\w]*-?[\w]*/[\w]*-[\w]*/Packages.gz$', control_file_data['name']):
+                component, architecture, _ = control_file_data['name'].split('/')
+                remote_file = os.path.join(repository_root, 'dists',
+                                           name, control_file_data['name'])
+                local_name = '_'.join([name, component,
+                                       architecture.replace('binary-', '')])
+                jobs.append((remote_file,
+                             os.path.join(cache_dir_path, local_name + '.gz'),
+                             control_file_data['md5sum']))
+    return jobs
+
+
+def cache_metadata_path(cache_dir_path):
+    """
+
+    Returns the path of the `CacheMetadata` file of a cache directory. It
+    is stored next to the directory so that it is not mistaken for a
+    control file.
+
+    :param cache_dir_path: path to the cache directory.
+    :return: the path of the metadata file.
+
+    .. versionadded:: 0.2
+
+    """
+    return os.path.normpath(cache_dir_path) + '.json'
+
+
+def update_cache_files(repository_root, releases, cache_dir_path, workers,
+                       metadata):
+    """
+
+    Downloads the control files listed in a set of Release files and
+    records the Release files in `metadata` once all their control files
+    are up to date.
+
+    :param repository_root: url of the repository.
+    :param releases: a list of tuples as returned by `read_release`.
+    :param cache_dir_path: path to the cache directory.
+    :param workers: maximum number of concurrent downloads.
+    :param metadata: a `CacheMetadata` object.
+    :return: the list of paths that were downloaded.
+
+    .. versionadded:: 0.2
+
+    """
+    jobs = dict((name, control_file_jobs(repository_root, [(name, md5list)],
+                                         cache_dir_path))
+                for name, _, md5list, _, _ in releases if md5list is not None)
+    downloaded = fetch_all(sum(jobs.values(), []), workers, metadata)
+    for name, release_path, md5list, headers, digest in releases:
+        if md5list is None:
+            continue
+        files = dict((path, md5sum) for _, path, md5sum in jobs[name])
+        if all(metadata.md5(path) == md5sum
+               for path, md5sum in files.items()):
+            metadata.set_index(release_path, headers, digest, files)
+    metadata.save()
+    return downloaded
+
+
+def create_cache(repository_root, cache_dir_path, workers=FETCH_WORKERS):
     """
 
     Creates the cache and all other necessary directories to organize the
     control files pulled from the repository.
 
+    The Release files and the control files of all distributions are
+    downloaded concurrently by `workers` threads.
+
     :param repository_root: url of the repository from which the control files
                             files will be pulled.
     :param cache_dir_path: path where the cache will be created.
+    :param workers: maximum number of concurrent downloads.
 
     .. versionadded:: 0.1
 
@@ -88,183 +652,480 @@ def create_cache(repository_root, cache_dir_path):
     if not os.path.isdir(cache_dir_path):
         os.makedirs(cache_dir_path)
 
-    branches = (branch.split()
+    metadata = CacheMetadata(cache_metadata_path(cache_dir_path))
+    branches = [tuple(branch.split())
                 for branch in readconfig(os.path.join(repository_root,
-                                                      'distributions')))
-    for name, release_path in branches:
-        release_path = os.path.join(repository_root, release_path)
-        try:
-            md5list = deb822.Release(urllib.urlopen(release_path)).get('MD5sum')
-        except urllib2.URLError, e:
-            logger.warning('Could not read release file in %s, error code #%s' % (release_path, e.code))
-        else:
-            for control_file_data in md5list:
-                if re.match('[\w]*-?[\w]*/[\w]*-[\w]*/Packages.gz$', control_file_data['name']):
-                    component, architecture, _ = control_file_data['name'].split('/')
-                    remote_file = os.path.join(repository_root, 'dists',
-                                               name, control_file_data['name'])
-                    local_name = '_'.join([name, component,
-                                           architecture.replace('binary-', '')])
-                    f = os.path.join(cache_dir_path, local_name + '.gz')
-
-                    if not os.path.isfile(f):
-                        try:
-                            urllib.urlretrieve(remote_file, f)
-                        except urllib2.URLError, e:
-                            logger.error('Could not get %s, error code #%s' % (remote_file, e.code))
-                    else:
-                        if md5Checksum(f) != control_file_data['md5sum']:
-                            os.remove(f)
-                            try:
-                                urllib.urlretrieve(remote_file, f)
-                            except urllib2.URLError, e:
-                                logger.error('Could not get %s, error code #%s' % (remote_file, e.code))
-
-
-def sync_cache(repository_root, cache_dir_path):
+                                                      'distributions'))]
+    releases = run_jobs(read_release,
+                        [(name, os.path.join(repository_root, release_path),
+                          None)
+                         for name, release_path in branches], workers)
+    update_cache_files(repository_root, releases, cache_dir_path, workers,
+                       metadata)
+
+
+def sync_cache(repository_root, cache_dir_path, workers=FETCH_WORKERS):
     """
 
     Synchronizes the existing control files in the cache,
     comparing the the ones in the repository with the local copies.
     If there are differences in the MD5sum field then the local
-    copies are deleted and copied again from the repository.
+    copies are replaced with the ones in the repository.
     It is assumed that the cache directory was created previously.
 
+    What is known about the cache is kept in a `CacheMetadata` file next
+    to it: Release files are requested conditionally and a distribution
+    whose Release file did not change is skipped entirely, and local
+    control files are only hashed if their size or modification time
+    changed. The Release files and the control files of all distributions
+    are downloaded concurrently by `workers` threads.
+
     :param repository_root: url of the repository from which the Packages
                             files will be updated.
     :param cache_dir_path: path to the desired cache directory.
+    :param workers: maximum number of concurrent downloads.
+    :return: a list with the names of the control files that changed.
 
     .. versionadded:: 0.1
 
     """
-    branches = (branch.split()
+    metadata = CacheMetadata(cache_metadata_path(cache_dir_path))
+    branches = [branch.split()[0]
                 for branch in readconfig(os.path.join(repository_root,
-                                                      'distributions')))
-    changes = []
-    for branch, _ in branches:
-        remote_branch_path = os.path.join(repository_root, 'dists', branch)
-        release_path = os.path.join(remote_branch_path, 'Release')
-        try:
-            md5list = deb822.Release(urllib.urlopen(release_path)).get('MD5sum')
-        except urllib2.URLError, e:
-            logger.warning('Could not read release file in %s, error code #%s' % (remote_branch_path, e.code))
-        else:
-            for package_control_file in md5list:
-                if re.match('[\w]*-?[\w]*/[\w]*-[\w]*/Packages.gz$', package_control_file['name']):
-                    component, architecture, _ = package_control_file['name'].split('/')
-                    remote_package_path = os.path.join(remote_branch_path, package_control_file['name'])
-                    local_name = '_'.join([branch, component,
-                                           architecture.replace('binary-', '')])
-                    f = os.path.join(cache_dir_path, local_name + '.gz')
-                    if package_control_file['md5sum'] != md5Checksum(f):
-                        if os.path.exists(f):
-                            os.remove(f)
-                        try:
-                            urllib.urlretrieve(remote_package_path, f)
-                            changes.append(os.path.basename(f))
-                        except urllib2.URLError, e:
-                            logger.error('Could not get %s, error code #%s' % (remote_package_path, e.code))
-                    else:
-                        logger.info('There are no changes in %s' % f)
-    return changes
-
-
-def update_db_from_cache(changes, cache_dir_path=None, simulate = False):
-    """
-
-    Updates all packages in a control file.
-
-    If a package exists but the MD5sum field is different from the one
-    stored in the database then it updates the package data fields.
-    If the package doesn't exists then its created.
-    If the package exists in the database but is not found in the control
-    file then its deleted.
+                                                      'distributions'))]
+    releases = run_jobs(read_release,
+                        [(branch, os.path.join(repository_root, 'dists',
+                                               branch, 'Release'), metadata)
+                         for branch in branches], workers)
+    return [os.path.basename(f)
+            for f in update_cache_files(repository_root, releases,
+                                        cache_dir_path, workers, metadata)]
+
+
+def control_file_snapshot(branch, comp, arch):
+    """
+
+    Loads the details recorded for a control file with a single query.
+
+    As in the control files themselves, details with architecture ``all``
+    are included for every architecture.
+
+    :param branch: codename of the Canaima's version.
+    :param comp: component of the control file.
+    :param arch: architecture of the control file.
+    :return: a dictionary mapping ``(package name, architecture)`` to a
+             ``(md5sum, details id, package id)`` tuple.
+
+    .. versionadded:: 0.2
+
+    """
+    snapshot = {}
+    for name, architecture, md5sum, pk, package_id in Details.objects.filter(
+            Distribution=branch, Component=comp, package__isnull=False
+            ).filter(Q(Architecture=arch) | Q(Architecture='all')
+                     ).values_list('package__Name', 'Architecture', 'MD5sum',
+                                   'id', 'package'):
+        snapshot[(name, architecture)] = (md5sum, pk, package_id)
+    return snapshot
+
+
+def diff_control_file(paragraphs, snapshot):
+    """
+
+    Compares the paragraphs of a control file against the recorded
+    snapshot of that control file. Only the MD5sum of each paragraph is
+    compared, so the relations of unchanged paragraphs read with
+    `iter_control_file` are never parsed.
+
+    :param paragraphs: an iterable of paragraphs.
+    :param snapshot: the dictionary returned by `control_file_snapshot`.
+    :return: a tuple ``(added, changed, removed)``. The first two are lists
+             of paragraphs, the last one is a list of snapshot keys whose
+             package is no longer in the control file.
+
+    .. versionadded:: 0.2
+
+    """
+    parsed = {}
+    for paragraph in paragraphs:
+        parsed.setdefault((paragraph['Package'], paragraph['Architecture']),
+                          paragraph)
+    names = set(name for name, _ in parsed)
+    added, changed = [], []
+    for key, paragraph in parsed.items():
+        if key not in snapshot:
+            added.append(paragraph)
+        elif snapshot[key][0] != paragraph['MD5sum']:
+            changed.append(paragraph)
+    removed = [key for key in snapshot if key[0] not in names]
+    return added, changed, removed
+
+
+def apply_control_file_diff(added, changed, removed, snapshot, branch, comp,
+                            batch_size=BULK_BATCH_SIZE):
+    """
+
+    Writes the result of `diff_control_file` into the database.
+
+    Removed details (and the packages left without details) are deleted,
+    changed paragraphs are re-recorded and new ones are added, in batches
+    of `batch_size`. Labels that are no longer referenced are deleted at
+    the end with a single query per chunk. Orphan relations are left for
+    `Relation.objects.delete_orphans`.
+
+    :param added: the paragraphs to record.
+    :param changed: the paragraphs to update.
+    :param removed: the snapshot keys to delete.
+    :param snapshot: the dictionary returned by `control_file_snapshot`.
+    :param branch: codename of the Canaima's version that will be updated.
+    :param comp: component of the control file.
+    :param batch_size: number of paragraphs written at once.
+
+    .. versionadded:: 0.2
+
+    """
+    label_ids = set()
+
+    def unlink(details_ids, package_ids):
+        invalidate_profiles(package_ids)
+        updated(Package, package_ids)
+        label_ids.update(filter_in(
+            Package.Labels.through.objects.values_list('label', flat=True),
+            'package', package_ids))
+        ReverseRelation.objects.unindex_details(details_ids)
+        for chunk in chunks(details_ids):
+            Details.objects.filter(pk__in=chunk).delete()
+
+    removed_packages = set(snapshot[key][2] for key in removed)
+    unlink([snapshot[key][1] for key in removed], removed_packages)
+    VersionMatrix.objects.refresh(removed_packages)
+    for chunk in chunks(removed_packages):
+        Package.objects.filter(pk__in=chunk, Details__isnull=True).delete()
+
+    for batch in chunks(changed, batch_size):
+        keys = [(p['Package'], p['Architecture']) for p in batch]
+        package_ids = set(snapshot[key][2] for key in keys)
+        unlink([snapshot[key][1] for key in keys], package_ids)
+        for chunk in chunks(package_ids):
+            Package.Labels.through.objects.filter(package__in=chunk).delete()
+        bulk_record_paragraphs(batch, branch, comp, update=True)
+
+    for batch in chunks(added, batch_size):
+        bulk_record_paragraphs(batch, branch, comp)
+
+    for chunk in chunks(label_ids):
+        Label.objects.filter(pk__in=chunk, package__isnull=True).delete()
+
+
+def update_db_from_cache(changes=None, cache_dir_path=None, simulate=False):
+    """
 
+    Updates all packages in a set of control files.
+
+    The recorded state of each control file is loaded with
+    `control_file_snapshot` and compared with its contents. Only the
+    differences are written: packages whose MD5sum changed are updated,
+    packages not yet recorded are created and packages that are no longer
+    in the control file are deleted. The search index is updated once per
+    control file. Relations left without details are deleted at the end of
+    the update with a single query, and the package catalogue is rebuilt.
+
+    :param changes: a list with the names of the control files to update.
+                    If None, every control file in the cache is updated.
     :param cache_dir_path: path to the desired cache directory.
+    :param simulate: if True, the differences are computed but nothing is
+                     written to the database.
+    :return: a dictionary which maps each control file to another
+             dictionary with the ``added``, ``changed`` and ``removed``
+             lists of ``(package name, architecture)`` pairs.
 
     .. versionadded:: 0.1
 
     """
-    if cache_dir_path:
+    if changes is None:
         control_files = list_items(cache_dir_path, False, True)
     else:
         control_files = changes
+    report = {}
     for control_file in control_files:
         name, _ = control_file.split(".")
         branch, comp, arch = name.split("_")
         path = os.path.join(cache_dir_path, control_file)
         try:
-            paragraphs = deb822.Packages.iter_paragraphs(gzip.open(path))
+            paragraphs = list(iter_control_file(path))
         except IOError, e:
             logger.warning('Could not read control file in %s, error code #%s' % (path, e))
-        else:
-            logger.info('=====================')
-            logger.info('Updating packages in %s:%s:%s' % (branch, comp, arch))
-            existent_packages = []
-            for paragraph in paragraphs:
-                existent_packages.append(paragraph['Package'])
-                exists = Details.objects.filter(package__Name=paragraph['Package'],
-                                                Architecture=paragraph['Architecture'],
-                                                Distribution=branch, 
-                                                Component = comp)
-                if exists:
-                    if paragraph['md5sum'] != exists[0].MD5sum:
-                        logger.info('The md5 checksum does not match in the package \'%s\':' % paragraph['Package'])
-                        logger.info('\'%s\' != \'%s\' ' % (paragraph['md5sum'], exists[0].MD5sum))
-                        if not simulate:
-                            update_paragraph(paragraph, branch, comp)
-                    else:
-                        logger.info('Nothing to change \'%s\':' % paragraph['Package'])
-                else:
-                    try:
-                        Package.objects.create_auto(paragraph, branch, comp)
-                    except:
-                        logger.error('Could not record %s' % paragraph['Package'])
-
-            bd_packages = Package.objects.filter(Details__Distribution=branch,
-                                                 Details__Component = comp
-                                                 ).filter(Q(Details__Architecture='all') |
-                                                          Q(Details__Architecture=arch)).distinct()
-            for package in bd_packages:
-                if package.Name not in existent_packages:
-                    logger.info("%s not in %s %s %s" % (package.Name, branch, comp, arch))
-                    for detail in package.Details.all():
-                        if (detail.Distribution == branch and detail.Component == comp and
-                            (detail.Architecture == arch or detail.Architecture == 'all')):
-                            for relation in detail.Relations.all():
-                                if not simulate:
-                                    detail.Relations.remove(relation)
-                                exists = Details.objects.filter(Relations=relation)
-                                if not exists:
-                                    if not simulate:
-                                        relation.delete()
-                            logger.info('Removing \'%s\' from \'%s\'...'
-                                        % (detail, package.Name))
-                            if not simulate:
-                                detail.delete()
-                    if not package.Details.all():
-                        logger.info('Removing %s...' % package.Name)
-                        if not simulate:
-                            package.delete()
-
-
-def fill_db_from_cache(cache_dir_path):
-    """
-
-    Records the data from each control file in the cache folder into the database.
+            continue
+
+        logger.info('=====================')
+        logger.info('Updating packages in %s:%s:%s' % (branch, comp, arch))
+        snapshot = control_file_snapshot(branch, comp, arch)
+        added, changed, removed = diff_control_file(paragraphs, snapshot)
+        report[control_file] = {
+            'added': sorted((p['Package'], p['Architecture']) for p in added),
+            'changed': sorted((p['Package'], p['Architecture'])
+                              for p in changed),
+            'removed': sorted(removed),
+        }
+        logger.info('%s added, %s changed and %s removed in %s:%s:%s' %
+                    (len(added), len(changed), len(removed),
+                     branch, comp, arch))
+        if not simulate:
+            with deferred_indexing():
+                with transaction.atomic():
+                    apply_control_file_diff(added, changed, removed,
+                                            snapshot, branch, comp)
+    if not simulate:
+        Relation.objects.delete_orphans()
+        build_catalogue()
+        build_graphs()
+        invalidate_responses('packages')
+    return report
+
+
+def fill_db_from_cache(cache_dir_path, bulk=False):
+    """
+
+    Records the data from each control file in the cache folder into the
+    database, and rebuilds the package catalogue.
 
     :param cache_dir_path: path where the package cache is stored.
+    :param bulk: if True, each control file is recorded with
+                 `record_control_file` instead of one `create_auto` call
+                 per paragraph.
 
     .. versionadded:: 0.1
 
     """
-    control_files = list_items(cache_dir_path, False, True)
-    for control_file in control_files:
+    session = RecordingSession()
+    for control_file_path, branch, comp in cache_control_files(
+            cache_dir_path):
+        if bulk:
+            record_control_file(control_file_path, branch, comp)
+            continue
+        with deferred_indexing():
+            for paragraph in iter_control_file(control_file_path):
+                try:
+                    Package.objects.create_auto(paragraph, branch, comp,
+                                                session)
+                except:
+                    logger.error('Could not record %s' % paragraph['Package'])
+        session.log_stats(control_file_path)
+    build_catalogue()
+    build_graphs()
+    invalidate_responses('packages')
+
+
+def control_file_batches(control_file_path, batch_size=BULK_BATCH_SIZE):
+    """
+
+    Reads a gzipped control file in batches of unique paragraphs.
+
+    :param control_file_path: path to a gzipped control file.
+    :param batch_size: number of paragraphs kept in memory at once.
+    :return: a generator of lists of paragraphs. A ``(package,
+             architecture)`` pair is yielded only the first time it appears
+             in the file.
+
+    .. versionadded:: 0.2
+
+    """
+    seen, batch = set(), []
+    for paragraph in iter_control_file(control_file_path):
+        key = (paragraph['Package'], paragraph['Architecture'])
+        if key in seen:
+            continue
+        seen.add(key)
+        batch.append(paragraph)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def cache_control_files(cache_dir_path):
+    """
+
+    Lists the control files of a cache folder.
+
+    :param cache_dir_path: path where the package cache is stored.
+    :return: a list of ``(path, branch, component)`` tuples.
+
+    .. versionadded:: 0.2
+
+    """
+    control_files = []
+    for control_file in list_items(cache_dir_path, False, True):
         name, _ = control_file.split(".")
         branch, comp, _ = name.split("_")
-        control_file_path = os.path.join(cache_dir_path, control_file)
-        for paragraph in deb822.Packages.iter_paragraphs(gzip.open(control_file_path, 'r')):
+        control_files.append((os.path.join(cache_dir_path, control_file),
+                              branch, comp))
+    return control_files
+
+
+def prepare_shards(control_files, batch_size=BULK_BATCH_SIZE):
+    """
+
+    Records the rows shared between control files before they are recorded
+    in parallel by `record_shard`.
+
+    Packages (with their maintainers and labels), the packages that are
+    only known as the target of a relation and the relations themselves
+    may appear in several control files, so they are created here, one
+    control file after the other. Architecture-independent paragraphs are
+    assigned to the first control file of their distribution and component
+    that contains them, so that no two shards record the same details.
+
+    :param control_files: a list of ``(path, branch, component)`` tuples.
+    :param batch_size: number of paragraphs kept in memory at once.
+    :return: a list of ``(path, branch, component, skip)`` jobs, where
+             `skip` is the list of architecture-independent packages that
+             belong to another shard.
+
+    .. versionadded:: 0.2
+
+    """
+    owned, jobs = set(), []
+    for path, branch, comp in control_files:
+        skip = set()
+        try:
+            with transaction.atomic():
+                for batch in control_file_batches(path, batch_size):
+                    own = []
+                    for paragraph in batch:
+                        if paragraph['Architecture'] == 'all':
+                            key = (branch, comp, paragraph['Package'])
+                            if key in owned:
+                                skip.add(paragraph['Package'])
+                                continue
+                            owned.add(key)
+                        own.append(paragraph)
+                    relations = dict((id(p), paragraph_relations(p))
+                                     for p in own)
+                    package_ids, _ = bulk_record_packages(own, relations)
+                    bulk_record_relations(own, relations, package_ids)
+        except IOError, e:
+            logger.warning('Could not read control file in %s, error code #%s'
+                           % (path, e))
+            continue
+        jobs.append((path, branch, comp, sorted(skip)))
+    return jobs
+
+
+def record_shard(job, batch_size=BULK_BATCH_SIZE):
+    """
+
+    Records the details of one control file, after `prepare_shards` has
+    created the shared rows. Only rows owned by this control file are
+    inserted, so shards of different control files can run concurrently.
+
+    The search index is not written here, since it only accepts one
+    writer at a time: the packages to index again are returned to the
+    caller instead.
+
+    :param job: a ``(path, branch, component, skip)`` tuple, as returned by
+                `prepare_shards`.
+    :param batch_size: number of paragraphs kept in memory at once.
+    :return: a ``(path, paragraphs, details recorded, seconds, packages)``
+             tuple, where `packages` is the set of primary keys of the
+             packages whose search documents must be updated.
+
+    .. versionadded:: 0.2
+
+    """
+    path, branch, comp, skip = job
+    skip = set(skip)
+    start = time.time()
+    read = total = 0
+    with deferred_indexing(flush=False) as index_batch, transaction.atomic():
+        for batch in control_file_batches(path, batch_size):
+            read += len(batch)
+            batch = [p for p in batch if p['Architecture'] != 'all' or
+                     p['Package'] not in skip]
+            relations = dict((id(p), paragraph_relations(p)) for p in batch)
+            names = set(p['Package'] for p in batch)
+            names.update(atom[1] for atoms in relations.values()
+                         for atom in atoms)
+            package_ids = {}
+            for name, pk in filter_in(
+                    Package.objects.values_list('Name', 'id'), 'Name', names):
+                package_ids.setdefault(name, pk)
+            recorded = set(filter_in(
+                Details.objects.filter(Distribution=branch, Component=comp
+                                       ).values_list('package',
+                                                     'Architecture'),
+                'package', [package_ids[p['Package']] for p in batch]))
+            batch = [p for p in batch
+                     if (package_ids[p['Package']], p['Architecture'])
+                     not in recorded and
+                     (package_ids[p['Package']], 'all') not in recorded]
+            total += bulk_record_details(batch, relations, package_ids,
+                                         branch, comp)
+    elapsed = time.time() - start
+    logger.info('%s: %s paragraphs, %s details recorded in %.2fs '
+                '(%.1f paragraphs/s)' % (path, read, total, elapsed,
+                                         read / max(elapsed, 0.001)))
+    return (path, read, total, elapsed,
+            set(index_batch.updates.get(Package, ())))
+
+
+def concurrent_writes():
+    """
+
+    :return: False if the database does not accept writes from several
+             processes at the same time. SQLite allows one writer, and its
+             in-memory databases (used by the tests) are not shared.
+
+    .. versionadded:: 0.2
+
+    """
+    return connection.vendor != 'sqlite'
+
+
+def fill_db_sharded(cache_dir_path, workers=RECORDER_WORKERS,
+                    batch_size=BULK_BATCH_SIZE):
+    """
+
+    Records every control file in the cache folder into the database,
+    using one process per control file.
+
+    The shared rows are created first by `prepare_shards` in the current
+    process. Then each control file is recorded by `record_shard` in a pool
+    of `workers` processes, each one with its own database connection. If
+    `workers` is 1, or the database does not accept concurrent writes, the
+    shards are recorded in the current process. The search documents
+    of the recorded packages are written and the version matrix is rebuilt
+    once every shard has finished, and the package catalogue is rebuilt at
+    the end.
+
+    :param cache_dir_path: path where the package cache is stored.
+    :param workers: the number of processes recording control files.
+    :param batch_size: number of paragraphs kept in memory at once.
+    :return: a list of ``(path, paragraphs, details recorded, seconds)``
+             tuples, one per control file.
+
+    .. versionadded:: 0.2
+
+    """
+    with deferred_indexing():
+        jobs = prepare_shards(cache_control_files(cache_dir_path),
+                              batch_size)
+        if workers <= 1 or len(jobs) <= 1 or not concurrent_writes():
+            shards = map(record_shard, jobs)
+        else:
+            # Forked processes must not share the connection of the parent.
+            connection.close()
+            pool = Pool(min(workers, len(jobs)))
             try:
-                Package.objects.create_auto(paragraph, branch, comp)
-            except:
-                logger.error('Could not record %s' % paragraph['Package'])
+                shards = pool.map(record_shard, jobs, 1)
+            finally:
+                pool.close()
+                pool.join()
+        for shard in shards:
+            updated(Package, shard[4])
+        VersionMatrix.objects.rebuild()
+    build_catalogue()
+    build_graphs()
+    invalidate_responses('packages')
+    return [shard[:4] for shard in shards]
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+These are the tests for the tribus.common.cache module.
+
+"""
+
+import time
+from django.core.cache import get_cache
+from django.test import TestCase
+
+
+class TwoLevelCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = get_cache('tribus.common.cache.TwoLevelCache',
+                               LOCATION='shared',
+                               OPTIONS={'L1_TIMEOUT': 60,
+                                        'BYPASS_PREFIXES': ['counter:'],
+                                        'STATS_INTERVAL': 100})
+        self.shared = get_cache('shared')
+        self.cache.clear()
+        self.cache.publish_stats()
+        self.shared.clear()
+
+    def test_levels(self):
+        """
+        El objetivo de este test es verificar que las lecturas se sirven
+        desde L1, que las escrituras llegan a L2 y que las claves excluidas
+        se leen siempre de L2.
+        """
+
+        self.cache.set('package', 'blender')
+        self.assertEqual(self.shared.get('package'), 'blender')
+        self.assertEqual(self.cache.get('package'), 'blender')
+
+        # Another worker changes the shared value: L1 keeps the old one
+        # until it is deleted or expires.
+        self.shared.set('package', 'bash')
+        self.assertEqual(self.cache.get('package'), 'blender')
+        self.cache.delete('package')
+        self.assertEqual(self.cache.get('package'), None)
+        self.assertEqual(self.shared.get('package'), None)
+
+        self.cache.set('counter:a', 1)
+        self.shared.incr('counter:a')
+        self.assertEqual(self.cache.get('counter:a'), 2)
+        self.assertEqual(self.cache.incr('counter:a'), 3)
+
+        self.shared.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2})
+        self.shared.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {'a': 1, 'b': 2})
+
+    def test_timeout(self):
+        """
+        El objetivo de este test es verificar que las escrituras sin tiempo
+        de expiracion usan el de L2 y no el de la cache de dos niveles.
+        """
+
+        cache = get_cache('tribus.common.cache.TwoLevelCache',
+                          LOCATION='shared', TIMEOUT=5)
+        for write in (lambda: cache.set('package', 'blender'),
+                      lambda: cache.set_many({'package': 'blender'}),
+                      lambda: cache.add('package', 'blender')):
+            self.shared.delete('package')
+            write()
+            expires = self.shared._expire_info[
+                self.shared.make_key('package')]
+            self.assertAlmostEqual(expires - time.time(),
+                                   self.shared.default_timeout, delta=5)
+
+    def test_stats(self):
+        """
+        El objetivo de este test es verificar que se cuentan los aciertos
+        de cada nivel y que se publican en L2.
+        """
+
+        self.cache.set('package', 'blender')
+        self.cache.get('package')
+        self.shared.set('user', 'homero')
+        self.cache.get('user')
+        self.cache.get('user')
+        self.cache.get('missing')
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['l1_hits'], stats['l2_hits'],
+                          stats['misses']), (2, 1, 1))
+        self.assertEqual(stats['reads'], 4)
+        self.assertEqual(stats['total'], 0.75)
+
+        self.cache.publish_stats()
+        self.assertEqual(self.cache.stats()['reads'], 0)
+        self.cache.get('package')
+        self.cache.publish_stats()
+        shared = self.cache.shared_stats()
+        self.assertEqual((shared['l1_hits'], shared['l2_hits'],
+                          shared['misses']), (3, 1, 1))
+        self.assertEqual(shared['l1'], 0.6)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+These are the tests for the tribus.common.controlfile module.
+
+"""
+
+import os
+import gzip
+import shutil
+import tempfile
+from StringIO import StringIO
+from debian import deb822
+from django.test import TestCase
+from tribus import BASEDIR
+from tribus.common.utils import get_path
+
+SMPLDIR = get_path([BASEDIR, 'tribus', 'common', 'tests', 'samples'])
+
+
+class ControlFileFunctions(TestCase):
+
+    def test_iter_paragraphs(self):
+
+        from tribus.common.controlfile import iter_paragraphs, RECORDED_FIELDS
+
+        for sample in ('Oldamd', 'Newi386', 'Blender'):
+            content = open(os.path.join(SMPLDIR, sample)).read()
+            expected = list(deb822.Packages.iter_paragraphs(
+                StringIO(content)))
+            # A small block size makes paragraphs span several blocks.
+            records = list(iter_paragraphs(StringIO(content), block_size=97))
+
+            self.assertEqual(len(records), len(expected))
+            for record, paragraph in zip(records, expected):
+                self.assertEqual(
+                    dict(record.items()),
+                    dict((field.lower(), value)
+                         for field, value in paragraph.items()
+                         if field.lower() in RECORDED_FIELDS))
+                self.assertEqual(record['Package'], paragraph['Package'])
+                self.assertEqual(record.get('Filename'),
+                                 paragraph.get('Filename'))
+                self.assertEqual(record.relations, paragraph.relations)
+
+    def test_separators_and_encoding(self):
+        """
+        El objetivo de este test es verificar que los parrafos se separan
+        por lineas vacias o que solo tienen espacios y tabuladores, que se
+        aceptan finales de linea CRLF, y que los valores se devuelven como
+        unicode, igual que en deb822.
+        """
+
+        from tribus.common.controlfile import iter_paragraphs
+
+        content = ('Package: a\r\nVersion: 1\r\n\r\n'
+                   'Package: b\nDescription: caf\xc3\xa9\n more\n \t \n'
+                   'Package: c\nMaintainer: J\xe9r <j@example.com>\n\n\n')
+        for block_size in (5, 1000):
+            records = list(iter_paragraphs(StringIO(content),
+                                           block_size=block_size))
+            self.assertEqual([record['Package'] for record in records],
+                             [u'a', u'b', u'c'])
+            self.assertEqual(records[0]['Version'], u'1')
+            self.assertEqual(records[1]['Description'], u'caf\xe9\n more')
+            self.assertEqual(records[2]['Maintainer'],
+                             u'J\xe9r <j@example.com>')
+            for record in records:
+                for value in record.fields.values():
+                    self.assertTrue(isinstance(value, unicode))
+
+    def test_relations_are_lazy(self):
+
+        from tribus.common.controlfile import parse_paragraph
+
+        record = parse_paragraph('Package: foo\nSHA256: bar\n'
+                                 ' baz\nDepends: libc6 (>= 2.3), a | b\n')
+        self.assertFalse('SHA256' in record)
+        self.assertEqual(record._relations, None)
+        self.assertEqual(record.relations['depends'],
+                         [[{'name': 'libc6', 'version': ('>=', '2.3'),
+                            'arch': None}],
+                          [{'name': 'a', 'version': None, 'arch': None},
+                           {'name': 'b', 'version': None, 'arch': None}]])
+        self.assertEqual(record.relations['provides'], [])
+
+    def test_iter_control_file(self):
+
+        from tribus.common.controlfile import iter_control_file
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, 'Packages.gz')
+            f = gzip.open(path, 'wb')
+            f.write(open(os.path.join(SMPLDIR, 'Oldi386')).read())
+            f.close()
+            names = [record['Package'] for record in iter_control_file(path)]
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertEqual(names, [p['Package'] for p in
+                                 deb822.Packages.iter_paragraphs(
+                                     open(os.path.join(SMPLDIR, 'Oldi386')))])
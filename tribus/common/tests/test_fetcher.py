@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+These are the tests for the tribus.common.fetcher module.
+
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import SocketServer
+import BaseHTTPServer
+import SimpleHTTPServer
+from django.test import TestCase
+from tribus import BASEDIR
+from tribus.common.utils import get_path, md5Checksum
+
+SMPLDIR = get_path([BASEDIR, 'tribus', 'common', 'tests', 'samples'])
+
+
+class SamplesServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class SamplesHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def translate_path(self, path):
+        return os.path.join(SMPLDIR, os.path.basename(path))
+
+    def log_message(self, *args):
+        pass
+
+
+class FetcherFunctions(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.sample = os.path.join(SMPLDIR, 'Blender')
+        self.url = 'file://' + self.sample
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_fetch(self):
+        from tribus.common.fetcher import fetch
+        path = os.path.join(self.tmpdir, 'Blender')
+        status, _ = fetch(self.url, path, md5Checksum(self.sample))
+        self.assertEqual(status, 200)
+        self.assertEqual(open(path).read(), open(self.sample).read())
+        self.assertEqual(os.listdir(self.tmpdir), ['Blender'])
+
+    def test_fetch_md5_mismatch(self):
+        from tribus.common.fetcher import fetch
+        path = os.path.join(self.tmpdir, 'Blender')
+        self.assertRaises(IOError, fetch, self.url, path, '0' * 32)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_fetch_all(self):
+        from tribus.common.fetcher import fetch_all
+        jobs = [('file://' + os.path.join(SMPLDIR, name),
+                 os.path.join(self.tmpdir, name),
+                 md5Checksum(os.path.join(SMPLDIR, name)))
+                for name in ('Oldamd', 'Oldi386', 'Newamd', 'Newi386')]
+        self.assertEqual(sorted(fetch_all(jobs, 2)),
+                         sorted(path for _, path, _ in jobs))
+        self.assertEqual(fetch_all(jobs, 2), [])
+
+    def test_fetch_all_http(self):
+        from tribus.common.fetcher import fetch_all
+        server = SamplesServer(('127.0.0.1', 0), SamplesHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            jobs = [('http://127.0.0.1:%s/%s' % (server.server_port, name),
+                     os.path.join(self.tmpdir, name),
+                     md5Checksum(os.path.join(SMPLDIR, name)))
+                    for name in ('Oldamd', 'Oldi386', 'Newamd', 'Newi386',
+                                 'Blender', 'BlenderNew')]
+            self.assertEqual(sorted(fetch_all(jobs, 2)),
+                             sorted(path for _, path, _ in jobs))
+        finally:
+            server.shutdown()
+            server.server_close()
+        for _, path, md5sum in jobs:
+            self.assertEqual(md5Checksum(path), md5sum)
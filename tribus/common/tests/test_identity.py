@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+These are the tests for the tribus.common.identity module.
+
+"""
+
+from debian import deb822
+from django.test import TestCase
+from tribus.web.cloud.models import Package, Maintainer, Label
+
+
+class IdentityFunctions(TestCase):
+
+    def test_lru_cache(self):
+
+        from tribus.common.identity import LRUCache
+
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_recording_session(self):
+
+        from tribus.common.identity import RecordingSession
+
+        session = RecordingSession()
+        libc6 = session.get_or_create(Package, Name='libc6')
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.assertTrue(
+                    session.get_or_create(Package, Name='libc6') is libc6)
+        maintainer = Maintainer.objects.create_auto(
+            'Foo <foo@example.com>', session)
+        self.assertTrue(maintainer is Maintainer.objects.create_auto(
+            'Foo <foo@example.com>', session))
+        self.assertEqual(session.stats(), {'Package': (10, 1),
+                                           'Maintainer': (1, 1)})
+
+        session.forget(Package, Name='libc6')
+        self.assertFalse(session.get_or_create(Package, Name='libc6')
+                         is libc6)
+        self.assertEqual(Package.objects.filter(Name='libc6').count(), 1)
+
+    def test_update_forgets_deleted_labels(self):
+
+        from tribus.common.identity import RecordingSession
+
+        old = deb822.Packages('Package: foo\nMaintainer: Foo <foo@example.com>'
+                              '\nArchitecture: all\nTag: role::program\n')
+        new = deb822.Packages('Package: foo\nMaintainer: Foo <foo@example.com>'
+                              '\nArchitecture: all\nTag: role::shared-lib\n')
+        session = RecordingSession()
+        package = Package.objects.create_auto(old, 'kukenan', 'main', session)
+        package.update(new, 'kukenan', 'main', session)
+        package.update(old, 'kukenan', 'main', session)
+
+        self.assertEqual([(l.Name, l.Tags.Value) for l in package.Labels.all()],
+                         [('role', 'program')])
+        self.assertEqual(Label.objects.count(), 1)
@@ -24,17 +24,79 @@ These are the tests for the tribus.common.recorder module.
 
 """
 
+import os
+import gzip
+import shutil
+import tempfile
 import email.Utils
 from debian import deb822
 from django.test import TestCase
 from tribus import BASEDIR
-from tribus.common.utils import get_path
-from tribus.web.cloud.models import Package, Details
+from tribus.common.utils import get_path, md5Checksum
+from tribus.web.cloud.models import (Package, Details, Relation,
+                                     ReverseRelation, VersionMatrix,
+                                     DistributionChange)
 
 SMPLDIR = get_path([BASEDIR, 'tribus', 'common', 'tests', 'samples'])
 test_dist = 'kukenan'
 
 
+def make_cache(samples):
+    """
+    Creates a temporary package cache with a gzipped copy of each sample,
+    named after the ``branch_comp_arch`` convention used by the recorder.
+    """
+    cache_dir = tempfile.mkdtemp()
+    for sample, arch in samples:
+        f = gzip.open(os.path.join(cache_dir, '%s_main_%s.gz' %
+                                   (test_dist, arch)), 'wb')
+        f.write(open(os.path.join(SMPLDIR, sample)).read())
+        f.close()
+    return cache_dir
+
+
+def make_repository(samples):
+    """
+    Creates a temporary repository with a Release file listing a gzipped
+    copy of each sample, and returns its ``file://`` url.
+    """
+    repository = tempfile.mkdtemp()
+    release = ['Codename: %s' % test_dist, 'MD5Sum:']
+    for sample, arch in samples:
+        name = os.path.join('main', 'binary-%s' % arch, 'Packages.gz')
+        path = os.path.join(repository, 'dists', test_dist, name)
+        os.makedirs(os.path.dirname(path))
+        f = gzip.open(path, 'wb')
+        f.write(open(os.path.join(SMPLDIR, sample)).read())
+        f.close()
+        release.append(' %s %s %s' % (md5Checksum(path),
+                                      os.path.getsize(path), name))
+    open(os.path.join(repository, 'dists', test_dist, 'Release'),
+         'w').write('\n'.join(release) + '\n')
+    open(os.path.join(repository, 'distributions'), 'w').write(
+        '%s dists/%s/Release\n' % (test_dist, test_dist))
+    return 'file://' + repository
+
+
+def db_snapshot():
+    """
+    Returns the recorded packages in a form that does not depend on
+    primary keys, so that two recording methods can be compared.
+    """
+    snapshot = {}
+    for p in Package.objects.all():
+        snapshot[p.Name] = (
+            p.Maintainer and (p.Maintainer.Name, p.Maintainer.Email),
+            p.Description, p.Section, p.Priority,
+            sorted((l.Name, l.Tags.Value) for l in p.Labels.all()),
+            sorted((d.Distribution, d.Component, d.Architecture, d.MD5sum,
+                    d.Size, sorted((r.relation_type, r.related_package.Name,
+                                    r.order, r.version, r.alt_id)
+                                   for r in d.Relations.all()))
+                   for d in p.Details.all()))
+    return snapshot
+
+
 class RecorderFunctions(TestCase):
 
     def setUp(self):
@@ -92,6 +154,160 @@ class RecorderFunctions(TestCase):
 
         self.assertEqual(d.Relations.all().count(), total_relations)
 
+    def test_fill_db_from_cache_bulk(self):
+
+        from tribus.common.recorder import fill_db_from_cache
+
+        cache_dir = make_cache([('Oldamd', 'amd64'), ('Oldi386', 'i386')])
+        try:
+            fill_db_from_cache(cache_dir)
+            expected = db_snapshot()
+            Package.objects.all().delete()
+            Details.objects.all().delete()
+            fill_db_from_cache(cache_dir, bulk=True)
+        finally:
+            shutil.rmtree(cache_dir)
+
+        self.assertTrue(expected)
+        self.assertEqual(db_snapshot(), expected)
+        self.assertFalse(Details.objects.filter(VersionKey__isnull=True))
+
+    def test_fill_db_sharded(self):
+
+        from tribus.common.recorder import fill_db_from_cache, fill_db_sharded
+
+        cache_dir = make_cache([('Oldamd', 'amd64'), ('Oldi386', 'i386')])
+        try:
+            fill_db_from_cache(cache_dir)
+            expected = db_snapshot()
+            Package.objects.all().delete()
+            Details.objects.all().delete()
+            shards = fill_db_sharded(cache_dir, workers=1)
+        finally:
+            shutil.rmtree(cache_dir)
+
+        self.assertEqual(db_snapshot(), expected)
+        self.assertEqual(len(shards), 2)
+        self.assertEqual(sum(recorded for _, _, recorded, _ in shards),
+                         Details.objects.count())
+
+    def test_fill_db_sharded_workers(self):
+        """
+        El objetivo de este test es verificar que dos shards que comparten
+        paquetes, grabados con varios workers, registran cada paquete una
+        sola vez y que el indice de busqueda se escribe una sola vez, en el
+        proceso que reparte los shards. Con SQLite los shards se graban en
+        el mismo proceso, porque no admite escrituras concurrentes.
+        """
+
+        from tribus.common.recorder import fill_db_from_cache, fill_db_sharded
+        from tribus.web.indexing import index_generation
+
+        cache_dir = make_cache([('Oldamd', 'amd64'), ('Oldi386', 'i386')])
+        try:
+            fill_db_from_cache(cache_dir)
+            expected = db_snapshot()
+            matrix = sorted(VersionMatrix.objects.values_list(
+                'package__Name', 'architecture', test_dist))
+            Package.objects.all().delete()
+            Details.objects.all().delete()
+            generation = index_generation()
+            shards = fill_db_sharded(cache_dir, workers=2)
+        finally:
+            shutil.rmtree(cache_dir)
+
+        self.assertEqual(db_snapshot(), expected)
+        self.assertEqual([len(shard) for shard in shards], [4, 4])
+        self.assertEqual(Package.objects.filter(Name='0ad').count(), 1)
+        self.assertEqual(
+            sorted(Package.objects.get(Name='0ad').Details.values_list(
+                'Architecture', flat=True)), ['amd64', 'i386'])
+        self.assertEqual(sorted(VersionMatrix.objects.values_list(
+            'package__Name', 'architecture', test_dist)), matrix)
+        self.assertEqual(index_generation(), generation + 1)
+
+    def test_update_db_from_cache(self):
+
+        from tribus.common.recorder import (fill_db_from_cache,
+                                            update_db_from_cache)
+
+        new_cache = make_cache([('Newamd', 'amd64'), ('Newi386', 'i386')])
+        old_cache = make_cache([('Oldamd', 'amd64'), ('Oldi386', 'i386')])
+        try:
+            fill_db_from_cache(new_cache)
+            expected = dict((name, data)
+                            for name, data in db_snapshot().items() if data[-1])
+            Package.objects.all().delete()
+            Details.objects.all().delete()
+            fill_db_from_cache(old_cache)
+
+            before = db_snapshot()
+            report = update_db_from_cache(None, new_cache, simulate=True)
+            self.assertEqual(db_snapshot(), before)
+            self.assertEqual(
+                report['%s_main_amd64.gz' % test_dist],
+                {'added': [],
+                 'changed': [('0ad', 'amd64'), ('0ad-data', 'all')],
+                 'removed': [('2ping', 'all'), ('3dchess', 'amd64')]})
+
+            update_db_from_cache(None, new_cache)
+        finally:
+            shutil.rmtree(new_cache)
+            shutil.rmtree(old_cache)
+
+        self.assertEqual(dict((name, data)
+                              for name, data in db_snapshot().items()
+                              if data[-1]), expected)
+        self.assertFalse(Relation.objects.filter(details__isnull=True))
+
+        reverse = sorted(ReverseRelation.objects.values_list(
+            'details', 'source', 'package', 'relation_type'))
+        self.assertTrue(reverse)
+        ReverseRelation.objects.rebuild()
+        self.assertEqual(sorted(ReverseRelation.objects.values_list(
+            'details', 'source', 'package', 'relation_type')), reverse)
+
+        matrix = sorted(VersionMatrix.objects.values_list(
+            'package', 'architecture', test_dist))
+        changes = DistributionChange.objects.count()
+        self.assertEqual(len(matrix), Details.objects.count())
+        VersionMatrix.objects.rebuild()
+        self.assertEqual(sorted(VersionMatrix.objects.values_list(
+            'package', 'architecture', test_dist)), matrix)
+        self.assertEqual(DistributionChange.objects.count(), changes)
+
+    def test_sync_cache(self):
+
+        from tribus.common.recorder import create_cache, sync_cache
+
+        repository = make_repository([('Oldamd', 'amd64'),
+                                      ('Oldi386', 'i386')])
+        cache_dir = os.path.join(tempfile.mkdtemp(), 'cache')
+        try:
+            create_cache(repository, cache_dir)
+            self.assertEqual(sorted(os.listdir(cache_dir)),
+                             ['%s_main_amd64.gz' % test_dist,
+                              '%s_main_i386.gz' % test_dist])
+            i386 = os.path.join(cache_dir, '%s_main_i386.gz' % test_dist)
+            os.utime(i386, (1400000000, 1400000000))
+            self.assertEqual(sync_cache(repository, cache_dir), [])
+
+            # Files whose size and mtime did not change are not hashed again
+            size = os.path.getsize(i386)
+            open(i386, 'wb').write('x' * size)
+            os.utime(i386, (1400000000, 1400000000))
+            os.remove(os.path.join(cache_dir, '%s_main_amd64.gz' % test_dist))
+            self.assertEqual(sync_cache(repository, cache_dir),
+                             ['%s_main_amd64.gz' % test_dist])
+
+            os.utime(i386, None)
+            self.assertEqual(sync_cache(repository, cache_dir),
+                             ['%s_main_i386.gz' % test_dist])
+            self.assertEqual(sync_cache(repository, cache_dir), [])
+        finally:
+            shutil.rmtree(repository.replace('file://', ''))
+            shutil.rmtree(os.path.dirname(cache_dir))
+
     # # TEST REDUNDANTE PERO NECESARIO (INCOMPLETO)
     # def test_update_cache(self):
     #     import urllib
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+These are the tests for the tribus.common.version module.
+
+"""
+
+from django.test import TestCase
+
+# Pairs of versions and the result of ``dpkg --compare-versions``.
+VERSIONS = [
+    ('1.0', '1.0-0', 0),
+    ('1.0', '1.00', 0),
+    ('0:1.0', '1.0', 0),
+    ('1:0.1', '2.0', 1),
+    ('1.0~rc1', '1.0', -1),
+    ('1.0~~', '1.0~', -1),
+    ('1.0', '1.0a', -1),
+    ('1.0a', '1.0.1', -1),
+    ('1.0', '1.0.0', -1),
+    ('1.2+b1', '1.2.1', -1),
+    ('2.63a-1', '2.69-3', -1),
+    ('5:0.8-2~', '5:0.8-2', -1),
+    ('1.0-1', '1.0-1~bpo1', 1),
+    ('1.0-1.1', '1.0-1', 1),
+    ('1.0-10', '1.0-9', 1),
+    ('2.6.32-5-amd64', '2.6.32-5', 1),
+]
+
+
+class VersionFunctions(TestCase):
+
+    def test_get_version(self):
+
+        from tribus.common.version import get_version
+
+        self.assertEqual(get_version((0, 2, 0, 'final', 0)), '0.2')
+        self.assertEqual(get_version((0, 2, 1, 'beta', 3)), '0.2.1b3')
+
+    def test_compare_versions(self):
+
+        from tribus.common.version import compare_versions
+
+        for a, b, result in VERSIONS:
+            self.assertEqual(cmp(compare_versions(a, b), 0), result)
+            self.assertEqual(cmp(compare_versions(b, a), 0), -result)
+
+    def test_version_key(self):
+
+        from tribus.common.version import version_key
+
+        for a, b, result in VERSIONS:
+            self.assertEqual(cmp(version_key(a), version_key(b)), result)
+        self.assertEqual(version_key(None), None)
+        versions = ['1.0', '1.0~rc1', '1:0.1', '1.0-1', '0.9', '1.0+dfsg']
+        self.assertEqual(sorted(versions, key=version_key),
+                         ['0.9', '1.0~rc1', '1.0', '1.0-1', '1.0+dfsg',
+                          '1:0.1'])
+
+    def test_check_relation(self):
+
+        from tribus.common.version import check_relation
+
+        self.assertTrue(check_relation('5:0.8-2', '>=', '5:0.8-2~'))
+        self.assertFalse(check_relation('0.8-2', '>=', '5:0.8-2~'))
+        self.assertTrue(check_relation('1.0', '<<', '1.0.1'))
+        self.assertFalse(check_relation('1.0', '>>', '1.0-0'))
+        self.assertTrue(check_relation('1.0', '=', '1.00'))
+        self.assertTrue(check_relation(None, None, None))
+        self.assertFalse(check_relation(None, '>=', '1.0'))
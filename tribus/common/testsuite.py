@@ -34,6 +34,9 @@ def runtests():
     settings.configure(**setting_attrs)
 
     from django.test.utils import get_runner
+    from south.management.commands import patch_for_test_db_setup
+
+    patch_for_test_db_setup()
 
     TestRunner = get_runner(settings)
     test_runner = TestRunner(verbosity=1, interactive=True)
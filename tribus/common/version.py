@@ -18,9 +18,46 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+"""
+
+tribus.common.version
+=====================
+
+This module builds the version number of Tribus, compares Debian package
+versions the way ``dpkg`` does, and builds sortable keys for them: two keys
+compare as plain strings in the same order as their versions, so version
+constraints can be evaluated by the database as range queries on an indexed
+column.
+
+"""
+
 import datetime
 import os
+import re
 import subprocess
+from itertools import izip_longest
+
+_segments = re.compile(r'(\D*)(\d*)')
+
+# Encoding of the non-digit characters of a version key. The tilde sorts
+# before the end of a segment, which sorts before letters, which sort before
+# any other character.
+TILDE = 'A'
+END = 'B'
+LETTER = 'L'
+OTHER = 'N'
+
+# Version constraints of package relations. ``<`` and ``>`` are the
+# deprecated forms of ``<=`` and ``>=``.
+RELATION_ORDERS = {
+    '<<': lambda c: c < 0,
+    '<=': lambda c: c <= 0,
+    '<': lambda c: c <= 0,
+    '=': lambda c: c == 0,
+    '>=': lambda c: c >= 0,
+    '>': lambda c: c >= 0,
+    '>>': lambda c: c > 0,
+}
 
 
 def get_version(version=None):
@@ -69,3 +106,128 @@ def get_git_changeset():
     except ValueError:
         return None
     return timestamp.strftime('%Y%m%d%H%M%S')
+
+
+def parse_version(version):
+    """
+
+    Splits a version in its epoch, upstream version and Debian revision.
+
+    :param version: a version string, e.g. ``5:0.8-2~``.
+    :return: a ``(epoch, upstream, revision)`` tuple, where `epoch` is an
+             integer and `revision` is an empty string if there is none.
+
+    .. versionadded:: 0.2
+
+    """
+    version = version.strip()
+    epoch, _, rest = version.partition(':') if ':' in version \
+        else ('', '', version)
+    upstream, _, revision = rest.rpartition('-') if '-' in rest \
+        else (rest, '', '')
+    return int(epoch or 0), upstream, revision
+
+
+def _order(char):
+    if char == '~':
+        return -1
+    if char.isalpha():
+        return ord(char)
+    return ord(char) + 256
+
+
+def _compare_part(a, b):
+    for (a_text, a_number), (b_text, b_number) in izip_longest(
+            _segments.findall(a)[:-1], _segments.findall(b)[:-1],
+            fillvalue=('', '')):
+        for a_char, b_char in izip_longest(a_text, b_text):
+            a_value = 0 if a_char is None else _order(a_char)
+            b_value = 0 if b_char is None else _order(b_char)
+            if a_value != b_value:
+                return cmp(a_value, b_value)
+        result = cmp(int(a_number or 0), int(b_number or 0))
+        if result:
+            return result
+    return 0
+
+
+def compare_versions(a, b):
+    """
+
+    Compares two versions with the algorithm of ``dpkg --compare-versions``.
+
+    :param a: a version string.
+    :param b: a version string.
+    :return: a negative number if `a` is lower than `b`, zero if they are
+             equal and a positive number if `a` is greater.
+
+    .. versionadded:: 0.2
+
+    """
+    a_epoch, a_upstream, a_revision = parse_version(a)
+    b_epoch, b_upstream, b_revision = parse_version(b)
+    return (cmp(a_epoch, b_epoch) or
+            _compare_part(a_upstream, b_upstream) or
+            _compare_part(a_revision, b_revision))
+
+
+def _number_key(number):
+    number = number.lstrip('0')
+    return '%02d%s' % (len(number), number)
+
+
+def _part_key(part):
+    key = []
+    # The last match of the expression is always empty.
+    for text, number in _segments.findall(part)[:-1] or [('', '')]:
+        for char in text:
+            if char == '~':
+                key.append(TILDE)
+            else:
+                key.append((LETTER if char.isalpha() else OTHER) + char)
+        key.append(END)
+        key.append(_number_key(number))
+    key.append(END)
+    return ''.join(key)
+
+
+def version_key(version):
+    """
+
+    Builds the sortable key of a version. For any two versions,
+    ``cmp(version_key(a), version_key(b))`` has the same sign as
+    ``compare_versions(a, b)``, and equal versions (e.g. ``1.0`` and
+    ``1.00-0``) have equal keys.
+
+    :param version: a version string, or None.
+    :return: an ASCII string, or None if `version` is None or empty.
+
+    .. versionadded:: 0.2
+
+    """
+    if not version:
+        return None
+    epoch, upstream, revision = parse_version(version)
+    return '%s%s%s' % (_number_key(str(epoch)), _part_key(upstream),
+                       _part_key(revision))
+
+
+def check_relation(version, order, required):
+    """
+
+    Checks whether a version satisfies a relation constraint.
+
+    :param version: the version of a package.
+    :param order: the operator of the constraint (``<<``, ``<=``, ``=``,
+                  ``>=`` or ``>>``), or None if there is no constraint.
+    :param required: the version of the constraint.
+    :return: True if `version` satisfies the constraint.
+
+    .. versionadded:: 0.2
+
+    """
+    if not order:
+        return True
+    if not version:
+        return False
+    return RELATION_ORDERS[order](compare_versions(version, required))
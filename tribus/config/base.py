@@ -21,6 +21,8 @@ if BASEDIR == '/usr/share/pyshared':
     ICONDIR = '/usr/share/icons/hicolor'
     LOCALEDIR = '/usr/share/locale'
     PACKAGECACHE = '/var/cache/tribus'
+    CATALOGUEINDEX = '/var/lib/tribus/catalogue'
+    GRAPHSDIR = '/var/lib/tribus/graphs'
     CHARMSDIR = BASEDIR + '/tribus/data/charms'
 
 else:
@@ -31,6 +33,8 @@ else:
     LOCALEDIR = BASEDIR + '/tribus/i18n'
     ICONDIR = BASEDIR + '/tribus/data/icons'
     PACKAGECACHE = BASEDIR + '/packagecache'
+    CATALOGUEINDEX = BASEDIR + '/catalogue'
+    GRAPHSDIR = BASEDIR + '/graphs'
     CHARMSDIR = BASEDIR + '/tribus/data/charms'
 
 # DEFAULT_CLI_OPTIONS = {
@@ -39,3 +39,22 @@ relation_types = ['pre-depends', 'depends', 'recommends', 'suggests',
 
 codenames = {'aponwao': '2.1', 'roraima': '3.0', 'auyantepui': '3.1',
              'kerepakupai': '4.0', 'kukenan': '4.1'}
+
+# Number of paragraphs kept in memory by the bulk recorder before they are
+# written to the database, and maximum number of values sent in a single
+# ``IN (...)`` lookup (SQLite refuses more than 999 query parameters).
+BULK_BATCH_SIZE = 1000
+BULK_QUERY_SIZE = 500
+
+# Number of control files downloaded concurrently by the recorder and
+# timeout, in seconds, of each connection to the repository.
+FETCH_WORKERS = 4
+FETCH_TIMEOUT = 60
+
+# Number of processes used to record control files in parallel by
+# ``fill_db_sharded``.
+RECORDER_WORKERS = 4
+
+# Maximum number of objects kept per model by the identity maps of a
+# recording session (see ``tribus.common.identity``).
+IDENTITY_MAP_SIZE = 10000
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import tempfile
 from tribus import BASEDIR
 from tribus.common.utils import get_path
 from tribus.config.ldap import AUTH_LDAP_BASE
@@ -34,6 +35,20 @@ INSTALLED_APPS = (
 
 ROOT_URLCONF = 'tribus.web.urls'
 
+CATALOGUE_INDEX = get_path([tempfile.gettempdir(), 'tribus-tests-catalogue'])
+DEPENDENCY_GRAPH_DIR = get_path([tempfile.gettempdir(), 'tribus-tests-graphs'])
+
+CACHES = {
+    'default': {
+        'BACKEND': 'tribus.common.cache.TwoLevelCache',
+        'LOCATION': 'shared',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tribus-tests-shared',
+    },
+}
+
 HAYSTACK_CONNECTIONS = {
     'default': {
         'ENGINE': 'haystack.backends.simple_backend.SimpleEngine',
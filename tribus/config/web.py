@@ -6,6 +6,7 @@ from celery.schedules import crontab
 
 from tribus import BASEDIR
 from tribus.common.utils import get_path
+from tribus.config.base import CATALOGUEINDEX, GRAPHSDIR
 from tribus.config.ldap import *
 
 djcelery.setup_loader()
@@ -98,15 +99,51 @@ CELERYBEAT_SCHEDULE = {
         "task": "tribus.web.cloud.tasks.update_cache",
         "schedule": crontab(minute=0, hour=0),  # A las 12 am
         "args": (),
-    }
+    },
+    "trim_timelines": {
+        "task": "tribus.web.tasks.trim_timelines",
+        "schedule": crontab(minute=30),  # Cada hora
+        "args": (),
+    },
 }
 
+# Each process keeps a small cache (L1) in front of the shared cache (L2).
+# L2 is memcached, shared by every worker and host of the web tier:
+# sessions and generation counters are always read from it. List every
+# memcached server of the deployment in MEMCACHED_LOCATION.
+MEMCACHED_LOCATION = ['127.0.0.1:11211']
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
-    }
+        'BACKEND': 'tribus.common.cache.TwoLevelCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'L1_TIMEOUT': 2,
+            'L1_MAX_ENTRIES': 1000,
+            'BYPASS_PREFIXES': ['django.contrib.sessions', 'search:generation',
+                                'api:scope:', 'autocomplete:users'],
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': MEMCACHED_LOCATION,
+        'TIMEOUT': 60 * 60 * 24,
+    },
 }
 
+# Seconds that the distributions shown in a package profile are cached.
+# The recorder invalidates them whenever the details of the package change.
+PROFILE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Tribs kept in the materialized timeline of each user, and number of
+# followers above which the tribs of a user are read on demand instead of
+# being copied to the timelines of their followers.
+TIMELINE_LENGTH = 800
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Seconds between checks for changes of the users suggested by the search
+# box. The package names are reloaded with the catalogue.
+AUTOCOMPLETE_REFRESH = 5
+
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
 
@@ -119,6 +156,15 @@ TASTYPIE_DEFAULT_FORMATS = ['json']
 ACCOUNT_ACTIVATION_DAYS = 7
 
 
+# Catalogo de paquetes generado por el recorder (ver
+# tribus.web.cloud.catalogue)
+CATALOGUE_INDEX = CATALOGUEINDEX
+
+# Grafos de dependencias por distribucion y arquitectura generados por el
+# recorder (ver tribus.web.cloud.graph)
+DEPENDENCY_GRAPH_DIR = GRAPHSDIR
+
+
 # CONFIGURACION HAYSTACK CON XAPIAN
 XAPIAN_INDEX = get_path([BASEDIR, 'xapian_index'])
 HAYSTACK_LOGGING = True
@@ -130,7 +176,12 @@ HAYSTACK_CONNECTIONS = {
     },
 }
 
-HAYSTACK_SIGNAL_PROCESSOR = 'celery_haystack.signals.CelerySignalProcessor'
+HAYSTACK_SIGNAL_PROCESSOR = 'tribus.web.signals.BatchingSignalProcessor'
+CELERY_HAYSTACK_DEFAULT_TASK = 'tribus.web.tasks.IndexingTask'
+
+# Seconds that the ids of a page of search results are cached. Pages are
+# also discarded whenever the search index is updated.
+SEARCH_CACHE_TIMEOUT = 60 * 60
 
 INSTALLED_APPS = (
     'ldapdb',
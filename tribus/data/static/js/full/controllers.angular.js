@@ -188,12 +188,12 @@ function TribController($scope, $timeout, $modal, Tribs, Timeline){
     $scope.controller_busy = controller_busy;
     $scope.trib_limit_to = trib_limit_to;
     $scope.trib_limit = trib_limit;
-    $scope.trib_offset = trib_offset;
+    $scope.trib_cursor = null;
     $scope.trib_orderby = trib_orderby;
     $scope.tribs = [];
     $scope.first_trib_id = '';
     $scope.new_tribs_passes = 0;
-    $scope.new_tribs_offset = trib_offset;
+    $scope.new_tribs_cursor = null;
     $scope.alerts = [];
 
     $scope.addAlert = function(alert_msg, alert_type) {
@@ -289,26 +289,27 @@ function TribController($scope, $timeout, $modal, Tribs, Timeline){
             var querydict = {
                 user_id: user_id,
                 order_by: $scope.trib_orderby,
-                limit: $scope.trib_limit,
-                offset: $scope.trib_offset
+                limit: $scope.trib_limit
             };
         } else if(template_name === 'profileView'){
             var service = Tribs;
             var querydict = {
                 user_id: userview_id,
                 order_by: $scope.trib_orderby,
-                limit: $scope.trib_limit,
-                offset: $scope.trib_offset
+                limit: $scope.trib_limit
             };
         } else if (template_name === 'dashboard'){
             var service = Timeline;
             var querydict = {
                 order_by: $scope.trib_orderby,
-                limit: $scope.trib_limit,
-                offset: $scope.trib_offset
+                limit: $scope.trib_limit
             };
         };
 
+        if($scope.trib_cursor){
+            querydict.cursor = $scope.trib_cursor;
+        }
+
         service.query(querydict, function(results){
             if(results.objects.length != 0){
                 for(var i = 0; i < results.objects.length; i++){
@@ -321,9 +322,8 @@ function TribController($scope, $timeout, $modal, Tribs, Timeline){
                     }
                 }
 
-                if($scope.tribs.length > $scope.trib_offset){
-                    $scope.trib_offset = $scope.trib_offset + trib_add;
-                }
+                $scope.trib_cursor = results.meta.next_cursor;
+                $scope.tribs_end = !$scope.trib_cursor;
 
                 if($scope.tribs.length > $scope.trib_limit_to){
                     $scope.trib_limit_to = $scope.tribs.length;
@@ -360,26 +360,27 @@ function TribController($scope, $timeout, $modal, Tribs, Timeline){
             var querydict = {
                 user_id: user_id,
                 order_by: $scope.trib_orderby,
-                limit: $scope.trib_limit,
-                offset: $scope.new_tribs_offset
+                limit: $scope.trib_limit
             };
         } else if(template_name === 'profileView'){
             var service = Tribs;
             var querydict = {
                 user_id: userview_id,
                 order_by: $scope.trib_orderby,
-                limit: $scope.trib_limit,
-                offset: $scope.new_tribs_offset
+                limit: $scope.trib_limit
             };
         } else if (template_name === 'dashboard'){
             var service = Timeline;
             var querydict = {
                 order_by: $scope.trib_orderby,
-                limit: $scope.trib_limit,
-                offset: $scope.new_tribs_offset
+                limit: $scope.trib_limit
             };
         };
 
+        if($scope.new_tribs_cursor){
+            querydict.cursor = $scope.new_tribs_cursor;
+        }
+
         service.query(querydict, function(results){
             if(results.objects.length != 0){
                 for(var i = 0; i < results.objects.length; i++){
@@ -397,12 +398,17 @@ function TribController($scope, $timeout, $modal, Tribs, Timeline){
                         }
 
                         if(i == (results.objects.length-1) && $scope.first_trib_id != ''){
-                            $scope.new_tribs_offset = $scope.new_tribs_offset + trib_add;
-                            $scope.new_tribs_passes = $scope.new_tribs_passes + 1;
-                            $timeout(function(){$scope.addNewTribs();});
+                            if(results.meta.next_cursor){
+                                $scope.new_tribs_cursor = results.meta.next_cursor;
+                                $scope.new_tribs_passes = $scope.new_tribs_passes + 1;
+                                $timeout(function(){$scope.addNewTribs();});
+                            } else {
+                                $scope.new_tribs_cursor = null;
+                                $scope.new_tribs_passes = 0;
+                            }
                         }
                     } else {
-                        $scope.new_tribs_offset = trib_offset;
+                        $scope.new_tribs_cursor = null;
                         $scope.new_tribs_passes = 0;
                         break;
                     }
@@ -429,11 +435,11 @@ function CommentController($scope, $timeout, $modal, Comments){
 
     $scope.comment_limit_to = comment_limit_to;
     $scope.comment_limit = comment_limit;
-    $scope.comment_offset = comment_offset;
+    $scope.comment_cursor = null;
     $scope.comment_orderby = comment_orderby;
     $scope.comments = [];
     $scope.first_comment_id = '';
-    $scope.new_comments_offset = comment_offset;
+    $scope.new_comments_cursor = null;
     $scope.new_comments_passes = 0;
 
     $scope.createNewComment = function(){
@@ -496,12 +502,17 @@ function CommentController($scope, $timeout, $modal, Comments){
             $scope.first_comment_id = $scope.comments[0].id;
         }
 
-        Comments.query({
+        var querydict = {
             trib_id: $scope.trib_id,
             order_by: '-'+$scope.comment_orderby,
-            limit: $scope.comment_limit,
-            offset: $scope.new_comments_offset
-        }, function(results){
+            limit: $scope.comment_limit
+        };
+
+        if($scope.new_comments_cursor){
+            querydict.cursor = $scope.new_comments_cursor;
+        }
+
+        Comments.query(querydict, function(results){
             if(results.objects.length != 0){
                 for(var i = 0; i < results.objects.length; i++){
                     if(results.objects[i].id != $scope.first_comment_id){
@@ -518,12 +529,17 @@ function CommentController($scope, $timeout, $modal, Comments){
                         }
 
                         if(i == (results.objects.length-1) && $scope.first_comment_id != ''){
-                            $scope.new_comments_offset = $scope.new_comments_offset + comment_add;
-                            $scope.new_comments_passes = $scope.new_comments_passes + 1;
-                            $timeout(function(){$scope.addNewComments();});
+                            if(results.meta.next_cursor){
+                                $scope.new_comments_cursor = results.meta.next_cursor;
+                                $scope.new_comments_passes = $scope.new_comments_passes + 1;
+                                $timeout(function(){$scope.addNewComments();});
+                            } else {
+                                $scope.new_comments_cursor = null;
+                                $scope.new_comments_passes = 0;
+                            }
                         }
                     } else {
-                        $scope.new_comments_offset = comment_offset;
+                        $scope.new_comments_cursor = null;
                         $scope.new_comments_passes = 0;
                         break;
                     }
@@ -550,12 +566,17 @@ function CommentController($scope, $timeout, $modal, Comments){
         $scope.comments_end = false;
         $scope.controller_busy = true;
 
-        Comments.query({
+        var querydict = {
             trib_id: $scope.trib_id,
             order_by: '-'+$scope.comment_orderby,
-            limit: $scope.comment_limit,
-            offset: $scope.comment_offset
-        }, function(results){
+            limit: $scope.comment_limit
+        };
+
+        if($scope.comment_cursor){
+            querydict.cursor = $scope.comment_cursor;
+        }
+
+        Comments.query(querydict, function(results){
             if(results.objects.length != 0){
                 for(var i = 0; i < results.objects.length; i++){
                     if(!idInArray(results.objects[i], $scope.comments)){
@@ -569,11 +590,10 @@ function CommentController($scope, $timeout, $modal, Comments){
                     if($scope.comments.length > $scope.comment_limit_to){
                         $scope.comment_limit_to = $scope.comments.length;
                     }
-
-                    if($scope.comments.length > $scope.comment_offset){
-                        $scope.comment_offset = $scope.comment_offset + comment_add;
-                    }
                 }
+
+                $scope.comment_cursor = results.meta.next_cursor;
+                $scope.comments_end = !$scope.comment_cursor;
             } else {
                 $scope.comments_end = true;
             }
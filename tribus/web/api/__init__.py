@@ -25,7 +25,9 @@ from tribus.web.api.resources import (TribResource, TimeLineResource,
     CommentResource, UserResource, SearchResource, UserProfileResource,
     UserFollowsResource, UserFollowersResource, CharmMetadataResource,
     CharmConfigResource, CharmListResource, CharmDeployResource,
-    CharmWipeContainers)
+    CharmWipeContainers, PackageDependsResource,
+    PackageReverseDependsResource, PackageReverseRelationsResource,
+    PackageChangesResource, PackageVersionsResource)
 
 
 api_01 = Api(api_name='0.1')
@@ -42,3 +44,8 @@ api_01.register(CharmConfigResource())
 api_01.register(CharmListResource())
 api_01.register(CharmDeployResource())
 api_01.register(CharmWipeContainers())
+api_01.register(PackageDependsResource())
+api_01.register(PackageReverseDependsResource())
+api_01.register(PackageReverseRelationsResource())
+api_01.register(PackageChangesResource())
+api_01.register(PackageVersionsResource())
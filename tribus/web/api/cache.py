@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+tribus.web.api.cache
+====================
+
+This module caches the serialized responses of the read-only requests of
+the API.
+
+A resource opts in by inheriting from `CachedResponseMixin` and using a
+`ResponseCache` as its ``cache``, with its own timeout and the scopes of
+data it depends on. Each scope has a version: a generation counter in the
+cache, increased by `invalidate_responses` from the code that changes the
+data (the recorder, the users, the tribs and comments), or for ``charms``
+a signature of the charm files. A cached response is only served while the
+versions of its scopes are the same as when it was stored. The scope
+versions live in `tribus.web.scopes`, which the models can import
+without loading the API.
+
+Responses carry an ``ETag``, and a request whose ``If-None-Match`` header
+matches it gets a ``304 Not Modified`` response without a body. The
+headers set by the resource are stored with the response, and the
+``Cache-Control`` and ``Vary`` headers of the cache are applied to every
+response served from it, including the ``304`` ones.
+
+"""
+
+import os
+import hashlib
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from tastypie.cache import SimpleCache
+from tribus.config.base import CHARMSDIR
+from tribus.web.scopes import scope_key
+
+CHARM_FILES = ('metadata.yaml', 'config.yaml', 'revision')
+
+# Headers of a response that are not stored with it: they are rebuilt for
+# each response served from the cache.
+UNSTORED_HEADERS = ('content-type', 'content-length', 'etag')
+
+
+def charms_signature(path=CHARMSDIR):
+    """
+
+    :param path: the directory of the charms.
+    :return: a tuple with the size and modification time of the files of
+             every charm that are read by the API. It changes whenever a
+             charm is added, removed or edited.
+
+    .. versionadded:: 0.2
+
+    """
+    signature = []
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return ()
+    for name in names:
+        for filename in CHARM_FILES:
+            try:
+                st = os.stat(os.path.join(path, name, filename))
+            except OSError:
+                continue
+            signature.append((name, filename, st.st_mtime, st.st_size))
+    return tuple(signature)
+
+
+class ResponseCache(SimpleCache):
+    """
+
+    A Tastypie cache for whole responses, used by `CachedResponseMixin`.
+
+    :param timeout: seconds that a response is kept.
+    :param scopes: names of `RESPONSE_SCOPES` whose changes invalidate the
+                   responses.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, timeout=60, scopes=(), *args, **kwargs):
+        kwargs.setdefault('varies', ['Accept', 'Cookie'])
+        super(ResponseCache, self).__init__(timeout, *args, **kwargs)
+        self.scopes = tuple(scopes)
+
+    def version(self):
+        """
+
+        :return: the current version of the scopes of the cache.
+
+        .. versionadded:: 0.2
+
+        """
+        keys = [scope_key(scope) for scope in self.scopes
+                if scope != 'charms']
+        generations = cache.get_many(keys) if keys else {}
+        version = [generations.get(key, 0) for key in keys]
+        if 'charms' in self.scopes:
+            version.append(charms_signature())
+        return hashlib.md5(repr(version)).hexdigest()
+
+    def response_key(self, resource_name, request):
+        """
+
+        :param resource_name: the name of the resource.
+        :param request: a GET request.
+        :return: the cache key of the response, which depends on the path,
+                 the query string, the ``Accept`` header and the user.
+
+        .. versionadded:: 0.2
+
+        """
+        user = getattr(request, 'user', None)
+        key = repr((request.path, sorted(request.GET.lists()),
+                    request.META.get('HTTP_ACCEPT', ''),
+                    user.pk if user is not None else None))
+        return 'api:response:%s:%s' % (resource_name,
+                                       hashlib.md5(key).hexdigest())
+
+    def cache_control(self):
+        # Clients must revalidate with the ETag, so that invalidated
+        # responses are not kept by them.
+        return {'max_age': 0, 'must_revalidate': True, 'private': True}
+
+
+def etag_matches(request, etag):
+    """
+
+    :param request: a request.
+    :param etag: the ``ETag`` of the response.
+    :return: True if the ``If-None-Match`` header of `request` contains
+             `etag`.
+
+    .. versionadded:: 0.2
+
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return header.strip() == '*' or etag in [
+        value.strip() for value in header.split(',')]
+
+
+class CachedResponseMixin(object):
+    """
+
+    Serves the GET requests of a resource from its `ResponseCache`. The
+    authentication and throttling of the resource are checked before.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def dispatch(self, request_type, request, **kwargs):
+        response_cache = self._meta.cache
+        if request.method != 'GET' or 'HTTP_X_HTTP_METHOD_OVERRIDE' in \
+                request.META or not isinstance(response_cache, ResponseCache):
+            return super(CachedResponseMixin, self).dispatch(
+                request_type, request, **kwargs)
+
+        self.is_authenticated(request)
+        key = response_cache.response_key(self._meta.resource_name, request)
+        version = response_cache.version()
+        cached = response_cache.get(key)
+        if cached is None or cached['version'] != version:
+            response = super(CachedResponseMixin, self).dispatch(
+                request_type, request, **kwargs)
+            if not response_cache.cacheable(request, response):
+                return response
+            cached = {'version': version,
+                      'content': response.content,
+                      'content_type': response['Content-Type'],
+                      'headers': [(name, value)
+                                  for name, value in response.items()
+                                  if name.lower() not in UNSTORED_HEADERS],
+                      'etag': '"%s"' % hashlib.md5(
+                          response.content).hexdigest()}
+            response_cache.set(key, cached)
+        else:
+            self.throttle_check(request)
+            self.log_throttled_access(request)
+
+        if etag_matches(request, cached['etag']):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(cached['content'],
+                                    content_type=cached['content_type'])
+        for name, value in cached.get('headers', ()):
+            response[name] = value
+        response['ETag'] = cached['etag']
+        patch_vary_headers(response, response_cache.varies)
+        patch_cache_control(response, **response_cache.cache_control())
+        return response
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+tribus.web.api.paginator
+========================
+
+This module pages the lists of the API by keyset instead of by offset.
+
+`KeysetPaginator` follows the ordering of the listed objects, with the
+primary key as the last field so that every position is unique. A page
+is read from the position after the last object of the previous page,
+which the client sends back as an opaque ``cursor``, so deep pages cost
+the same as the first one. The total count is not computed: the page
+asks for one extra object to know if there is a next one.
+
+"""
+
+import json
+import base64
+import binascii
+from urllib import urlencode
+from datetime import datetime
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from tastypie.exceptions import BadRequest
+from tastypie.paginator import Paginator
+from tribus.web.models import Trib
+from tribus.web.timeline import Timeline
+
+
+def encode_cursor(values):
+    """
+
+    :param values: the values of the ordering fields of an object.
+    :return: an opaque string that identifies the position after it.
+
+    .. versionadded:: 0.2
+
+    """
+    return base64.urlsafe_b64encode(json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value
+         for value in values])).rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+
+    :param cursor: a string returned by `encode_cursor`.
+    :return: the list of values it holds, still serialized.
+
+    .. versionadded:: 0.2
+
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(
+            str(cursor) + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise BadRequest('Invalid cursor.')
+    if not isinstance(values, list):
+        raise BadRequest('Invalid cursor.')
+    return values
+
+
+def keyset_filter(ordering, values):
+    """
+
+    :param ordering: a list of field names, all of them either ascending or
+                     descending (prefixed with ``-``).
+    :param values: the values of the fields at the current position.
+    :return: a ``Q`` object selecting the rows that come after it.
+
+    .. versionadded:: 0.2
+
+    """
+    lookup = '__lt' if ordering[0].startswith('-') else '__gt'
+    fields = [field.lstrip('-') for field in ordering]
+    query = Q()
+    for i in range(len(fields)):
+        conditions = dict(zip(fields[:i], values[:i]))
+        conditions[fields[i] + lookup] = values[i]
+        query |= Q(**conditions)
+    return query
+
+
+class KeysetPaginator(Paginator):
+    """
+
+    A Tastypie paginator that reads the page after the ``cursor``
+    parameter. The ``meta`` of each page holds the cursor of the next one
+    in ``next_cursor``, and its URI in ``next``; both are null on the last
+    page.
+
+    The objects must be a queryset, ordered in a single direction by
+    fields of its model. The ordering is completed with the primary key.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def get_model(self):
+        """
+
+        :return: the model of the paged objects.
+
+        .. versionadded:: 0.2
+
+        """
+        return self.objects.model
+
+    def get_ordering(self):
+        """
+
+        :return: the list of fields that identify a position, ending with
+                 the primary key.
+
+        .. versionadded:: 0.2
+
+        """
+        ordering = list(self.objects.query.order_by or
+                        self.get_model()._meta.ordering)
+        descending = bool(ordering) and ordering[0].startswith('-')
+        if any(field.startswith('-') != descending for field in ordering):
+            raise BadRequest('Ordering in mixed directions can not be paged.')
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    def get_cursor(self, ordering):
+        """
+
+        :param ordering: the list returned by `get_ordering`.
+        :return: the values of the ``cursor`` parameter, converted to the
+                 types of the fields, or None.
+
+        .. versionadded:: 0.2
+
+        """
+        cursor = self.request_data.get('cursor')
+        if not cursor:
+            return None
+        values = decode_cursor(cursor)
+        if len(values) != len(ordering):
+            raise BadRequest('Invalid cursor.')
+        opts = self.get_model()._meta
+        try:
+            return [opts.pk.to_python(value) if field.lstrip('-') == 'pk'
+                    else opts.get_field(field.lstrip('-')).to_python(value)
+                    for field, value in zip(ordering, values)]
+        except ValidationError:
+            raise BadRequest('Invalid cursor.')
+
+    def get_page(self, ordering, cursor, limit):
+        """
+
+        :return: the objects after `cursor`, up to `limit` of them plus
+                 one, or all of them if `limit` is 0.
+
+        .. versionadded:: 0.2
+
+        """
+        objects = self.objects.order_by(*ordering)
+        if cursor is not None:
+            objects = objects.filter(keyset_filter(ordering, cursor))
+        if limit:
+            return list(objects[:limit + 1])
+        return list(objects)
+
+    def get_values(self, obj, ordering):
+        """
+
+        :return: the values of the ordering fields of `obj`.
+
+        .. versionadded:: 0.2
+
+        """
+        return [getattr(obj, field.lstrip('-')) for field in ordering]
+
+    def get_count(self):
+        return None
+
+    def _generate_cursor_uri(self, limit, cursor):
+        if self.resource_uri is None:
+            return None
+        try:
+            params = self.request_data.copy()
+            for param in ('offset', 'cursor', 'limit'):
+                if param in params:
+                    del params[param]
+            params.update({'limit': limit, 'cursor': cursor})
+            encoded_params = params.urlencode()
+        except AttributeError:
+            params = dict((key, value.encode('utf-8')
+                           if isinstance(value, unicode) else value)
+                          for key, value in self.request_data.items()
+                          if key not in ('offset', 'cursor', 'limit'))
+            params.update({'limit': limit, 'cursor': cursor})
+            encoded_params = urlencode(params)
+        return '%s?%s' % (self.resource_uri, encoded_params)
+
+    def page(self):
+        limit = self.get_limit()
+        ordering = self.get_ordering()
+        objects = self.get_page(ordering, self.get_cursor(ordering), limit)
+        next_cursor = next_uri = None
+        if limit and len(objects) > limit:
+            objects = objects[:limit]
+            next_cursor = encode_cursor(self.get_values(objects[-1],
+                                                        ordering))
+            next_uri = self._generate_cursor_uri(limit, next_cursor)
+        return {
+            self.collection_name: objects,
+            'meta': {
+                'limit': limit,
+                'next': next_uri,
+                'next_cursor': next_cursor,
+                'previous': None,
+            },
+        }
+
+
+class TimelinePaginator(KeysetPaginator):
+    """
+
+    A `KeysetPaginator` for a `tribus.web.timeline.Timeline`, which is
+    always ordered from the newest trib to the oldest.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def get_model(self):
+        return Trib
+
+    def get_ordering(self):
+        return ['-trib_pub_date', '-id']
+
+    def get_page(self, ordering, cursor, limit):
+        timeline = Timeline(self.objects.user_id,
+                            tuple(cursor) if cursor else None)
+        if limit:
+            return timeline[:limit + 1]
+        return timeline[:]
@@ -27,7 +27,8 @@ from django.http.response import Http404
 
 from tastypie import fields
 from tastypie.cache import NoCache
-from tastypie.constants import ALL_WITH_RELATIONS
+from tastypie.constants import ALL, ALL_WITH_RELATIONS
+from tastypie.exceptions import BadRequest
 from tastypie.resources import ModelResource, Resource
 from tastypie.fields import ManyToManyField, OneToOneField
 from tastypie.authentication import SessionAuthentication
@@ -38,10 +39,18 @@ from waffle import switch_is_active
 from haystack.query import SearchQuerySet, EmptySearchQuerySet
 
 from tribus.web.models import Trib, Comment
-from tribus.web.cloud.models import Package
+from tribus.web.timeline import Timeline, fan_out
+from tribus.web.search import facet_filters, narrow_packages
+from tribus.web.autocomplete import complete_packages, complete_users
+from tribus.web.cloud.models import (Package, ReverseRelation,
+                                     VersionMatrix, DistributionChange,
+                                     INVERSE_CHANGES)
+from tribus.web.cloud.graph import get_graph, valid_graph
 from tribus.web.profile.models import UserProfile
 from tribus.web.forms import TribForm, CommentForm
 from tribus.web.api.tasks import queue_charm_deploy, wipe_host_conts
+from tribus.web.api.cache import ResponseCache, CachedResponseMixin
+from tribus.web.api.paginator import KeysetPaginator, TimelinePaginator
 
 from tribus.web.api.authorization import (
     TimelineAuthorization,
@@ -56,6 +65,14 @@ from tribus.common.charms.repository import LocalCharmRepository
 from tribus.common.charms.directory import CharmDirectory
 from tribus.common.utils import get_path
 from tribus.config.base import CHARMSDIR
+from tribus.config.pkgrecorder import codenames
+
+# Seconds that the responses of each group of resources are cached. They
+# are also discarded when the data they depend on changes.
+CHARMS_CACHE_TIMEOUT = 60 * 60
+PACKAGES_CACHE_TIMEOUT = 60 * 60
+TYPEAHEAD_CACHE_TIMEOUT = 60
+TRIBS_CACHE_TIMEOUT = 60
 
 
 class UserResource(ModelResource):
@@ -65,7 +82,7 @@ class UserResource(ModelResource):
         related_name='user')
 
     class Meta:
-        queryset = User.objects.all()
+        queryset = User.objects.select_related('user_profile')
         resource_name = 'user/details'
         ordering = ['id']
         excludes = ['password', 'is_active', 'is_staff', 'is_superuser']
@@ -76,6 +93,21 @@ class UserResource(ModelResource):
         cache = NoCache()
 
 
+class EmbeddedUserResource(ModelResource):
+    # Es el autor que se incluye en cada trib y comentario: solo lleva los
+    # datos que se muestran, sin el perfil ni los seguidores, y su
+    # resource_uri es el de UserResource
+    class Meta:
+        queryset = User.objects.all()
+        resource_name = 'user/details'
+        fields = ['id', 'username', 'first_name', 'last_name', 'email']
+        allowed_methods = ['get']
+        filtering = {'id': ALL}
+        authorization = UserAuthorization()
+        authentication = SessionAuthentication()
+        cache = NoCache()
+
+
 class UserProfileResource(ModelResource):
     user = OneToOneField(
         to='tribus.web.api.resources.UserResource',
@@ -95,7 +127,8 @@ class UserProfileResource(ModelResource):
         null=True)
 
     class Meta:
-        queryset = UserProfile.objects.all()
+        queryset = UserProfile.objects.select_related('user').prefetch_related(
+            'follows', 'followers')
         resource_name = 'user/profile'
         ordering = ['id']
         allowed_methods = ['get', 'patch']
@@ -134,57 +167,80 @@ class UserFollowsResource(ModelResource):
 
 
 class TimeLineResource(ModelResource):
-    user_id = fields.ToOneField(UserResource, attribute='user_id', full=True)
+    user_id = fields.ToOneField(EmbeddedUserResource, attribute='user_id',
+                                full=True)
     trib_pub_date = fields.DateTimeField(attribute='trib_pub_date')
     trib_content = fields.CharField(attribute='trib_content')
 
     class Meta:
-        queryset = Trib.objects.all()
+        queryset = Trib.objects.select_related('user_id')
         resource_name = 'user/timeline'
         ordering = ['trib_pub_date']
         allowed_methods = ['get']
         authorization = TimelineAuthorization()
         authentication = SessionAuthentication()
+        paginator_class = TimelinePaginator
         cache = NoCache()
 
+    def obj_get_list(self, bundle, **kwargs):
+        # El timeline se lee de la tabla materializada, desde la posicion
+        # que indique el cursor (ver TimelinePaginator)
+        return Timeline(bundle.request.user.id)
+
+    def apply_sorting(self, obj_list, options=None):
+        # El timeline siempre se ordena del trib mas nuevo al mas viejo
+        return obj_list
 
-class TribResource(ModelResource):
-    user_id = fields.ToOneField(UserResource, attribute='user_id', full=True)
+
+class TribResource(CachedResponseMixin, ModelResource):
+    user_id = fields.ToOneField(EmbeddedUserResource, attribute='user_id',
+                                full=True)
     trib_pub_date = fields.DateTimeField(attribute='trib_pub_date')
     trib_content = fields.CharField(attribute='trib_content')
 
     class Meta:
-        queryset = Trib.objects.all()
+        queryset = Trib.objects.select_related('user_id')
         resource_name = 'user/tribs'
         ordering = ['trib_pub_date']
         allowed_methods = ['get', 'post', 'delete']
         filtering = {'user_id': ALL_WITH_RELATIONS}
         authorization = TribAuthorization()
         authentication = SessionAuthentication()
+        paginator_class = KeysetPaginator
         validation = CleanedDataFormValidation(form_class=TribForm)
-        cache = NoCache()
+        cache = ResponseCache(timeout=TRIBS_CACHE_TIMEOUT,
+                              scopes=('tribs', 'users'))
+
+    def obj_create(self, bundle, **kwargs):
+        bundle = super(TribResource, self).obj_create(bundle, **kwargs)
+        fan_out(bundle.obj)
+        return bundle
 
 
-class CommentResource(ModelResource):
-    user_id = fields.ToOneField(UserResource, attribute='user_id', full=True)
+class CommentResource(CachedResponseMixin, ModelResource):
+    user_id = fields.ToOneField(EmbeddedUserResource, attribute='user_id',
+                                full=True)
     trib_id = fields.ToOneField(TribResource, attribute='trib_id', full=True)
     comment_pub_date = fields.DateTimeField(attribute='comment_pub_date')
     comment_content = fields.CharField(attribute='comment_content')
 
     class Meta:
-        queryset = Comment.objects.all()
+        queryset = Comment.objects.select_related('user_id',
+                                                  'trib_id__user_id')
         resource_name = 'tribs/comments'
         ordering = ['comment_pub_date']
         allowed_methods = ['get', 'post', 'delete']
         filtering = {'trib_id': ALL_WITH_RELATIONS}
         authorization = CommentAuthorization()
         authentication = SessionAuthentication()
+        paginator_class = KeysetPaginator
         validation = CleanedDataFormValidation(form_class=CommentForm)
-        cache = NoCache()
+        cache = ResponseCache(timeout=TRIBS_CACHE_TIMEOUT,
+                              scopes=('tribs', 'users'))
 
 
 class SearchUserResource(Resource):
-    name = fields.CharField(attribute='autoname')
+    name = fields.CharField(attribute='username')
     description = fields.CharField(attribute='description')
 
     class Meta:
@@ -197,7 +253,8 @@ class SearchUserResource(Resource):
             filters = bundle.request.GET.copy()
         filters.update(kwargs)
         if 'q' in filters:
-            sqs = SearchQuerySet().models(
+            # Xapian solo se consulta si no hay coincidencias por prefijo
+            sqs = complete_users(filters['q']) or SearchQuerySet().models(
                 User).autocomplete(autoname=filters['q'])[:5]
         else:
             sqs = EmptySearchQuerySet()
@@ -213,7 +270,7 @@ class SearchUserResource(Resource):
 
 
 class SearchPackageResource(Resource):
-    name = fields.CharField(attribute='autoname')
+    name = fields.CharField(attribute='name')
     description = fields.CharField(attribute='description')
 
     class Meta:
@@ -226,8 +283,12 @@ class SearchPackageResource(Resource):
             filters = bundle.request.GET.copy()
         filters.update(kwargs)
         if 'q' in filters:
-            sqs = SearchQuerySet().models(
-                Package).autocomplete(autoname=filters['q'])[:5]
+            # Xapian solo se consulta si no hay coincidencias por prefijo o
+            # si se filtra por facetas
+            sqs = (not facet_filters(filters) and
+                   complete_packages(filters['q'])) or narrow_packages(
+                SearchQuerySet().models(Package).autocomplete(
+                    autoname=filters['q']), filters)[:5]
         else:
             sqs = EmptySearchQuerySet()
 
@@ -241,7 +302,7 @@ class SearchPackageResource(Resource):
         return page
 
 
-class SearchResource(Resource):
+class SearchResource(CachedResponseMixin, Resource):
     users = fields.ListField()
     packages = fields.ListField()
 
@@ -249,6 +310,8 @@ class SearchResource(Resource):
         resource_name = 'search'
         allowed_methods = ['get']
         include_resource_uri = False
+        cache = ResponseCache(timeout=TYPEAHEAD_CACHE_TIMEOUT,
+                              scopes=('packages', 'users'))
 
     def dehydrate_users(self, bundle):
         if switch_is_active('profile'):
@@ -294,12 +357,14 @@ class CharmObject(object):
         return self._data
 
 
-class CharmListResource(Resource):
+class CharmListResource(CachedResponseMixin, Resource):
     charms = fields.ListField(attribute='charms')
 
     class Meta:
         resource_name = 'charms/list'
         object_class = CharmObject
+        cache = ResponseCache(timeout=CHARMS_CACHE_TIMEOUT,
+                              scopes=('charms',))
 
     def get_object_list(self, bundle):
 
@@ -320,7 +385,7 @@ class CharmListResource(Resource):
         return self.get_object_list(bundle)
 
 
-class CharmMetadataResource(Resource):
+class CharmMetadataResource(CachedResponseMixin, Resource):
     name = fields.CharField(attribute='name')
     summary = fields.CharField(attribute='summary')
     maintainer = fields.CharField(attribute='maintainer')
@@ -329,6 +394,8 @@ class CharmMetadataResource(Resource):
     class Meta:
         resource_name = 'charms/metadata'
         object_class = CharmObject
+        cache = ResponseCache(timeout=CHARMS_CACHE_TIMEOUT,
+                              scopes=('charms',))
 
     def get_object_list(self, bundle):
 
@@ -348,12 +415,14 @@ class CharmMetadataResource(Resource):
         return self.get_object_list(bundle)
 
 
-class CharmConfigResource(Resource):
+class CharmConfigResource(CachedResponseMixin, Resource):
     config = fields.CharField(attribute='config')
 
     class Meta:
         resource_name = 'charms/config'
         object_class = CharmObject
+        cache = ResponseCache(timeout=CHARMS_CACHE_TIMEOUT,
+                              scopes=('charms',))
 
     def get_object_list(self, bundle):
 
@@ -405,3 +474,188 @@ class CharmWipeContainers(Resource):
     def obj_create(self, bundle, **kwargs):
         wipe_host_conts.apply_async([bundle.data])
         return bundle
+
+
+class PackageObject(CharmObject):
+    pass
+
+
+class PackageGraphResource(CachedResponseMixin, Resource):
+    name = fields.CharField(attribute='name')
+    distribution = fields.CharField(attribute='distribution')
+    architecture = fields.CharField(attribute='architecture')
+    packages = fields.ListField(attribute='packages')
+
+    class Meta:
+        object_class = PackageObject
+        allowed_methods = ['get']
+        include_resource_uri = False
+        cache = ResponseCache(timeout=PACKAGES_CACHE_TIMEOUT,
+                              scopes=('packages',))
+
+    def get_object_list(self, bundle):
+        filters = {}
+        if hasattr(bundle.request, 'GET'):
+            filters = bundle.request.GET
+
+        name = filters.get('name', None)
+        distribution = filters.get('distribution', None)
+        architecture = filters.get('architecture', None)
+
+        if not valid_graph(distribution, architecture):
+            raise BadRequest("Unknown distribution or architecture.")
+
+        graph = get_graph(distribution, architecture)
+
+        if graph is None or name not in graph:
+            raise Http404("Sorry, no package with that name.")
+
+        return [PackageObject({
+                    'name': name,
+                    'distribution': distribution,
+                    'architecture': architecture,
+                    'packages': self.closure(graph, name, filters),
+                })]
+
+    def obj_get_list(self, bundle, **kwargs):
+        return self.get_object_list(bundle)
+
+
+class PackageDependsResource(PackageGraphResource):
+
+    class Meta(PackageGraphResource.Meta):
+        resource_name = 'packages/depends'
+
+    def closure(self, graph, name, filters):
+        return graph.depends(
+            name, alternatives=filters.get('alternatives') == 'all')
+
+
+class PackageReverseDependsResource(PackageGraphResource):
+
+    class Meta(PackageGraphResource.Meta):
+        resource_name = 'packages/rdepends'
+
+    def closure(self, graph, name, filters):
+        return graph.rdepends(
+            name, transitive=filters.get('transitive') != 'false')
+
+
+class PackageReverseRelationsResource(CachedResponseMixin, Resource):
+    name = fields.CharField(attribute='name')
+    relation_type = fields.CharField(attribute='relation_type', null=True)
+    packages = fields.ListField(attribute='packages')
+
+    class Meta:
+        resource_name = 'packages/reverse'
+        object_class = PackageObject
+        allowed_methods = ['get']
+        include_resource_uri = False
+        cache = ResponseCache(timeout=PACKAGES_CACHE_TIMEOUT,
+                              scopes=('packages',))
+
+    def get_object_list(self, bundle):
+        filters = {}
+        if hasattr(bundle.request, 'GET'):
+            filters = bundle.request.GET
+
+        name = filters.get('name', None)
+        relation_type = filters.get('type', None)
+
+        try:
+            package = Package.objects.get(Name=name)
+        except Package.DoesNotExist:
+            raise Http404("Sorry, no package with that name.")
+
+        return [PackageObject({
+                    'name': name,
+                    'relation_type': relation_type,
+                    'packages': [{
+                        'name': r.source.Name,
+                        'relation_type': r.relation_type,
+                        'distribution': r.distribution,
+                        'architecture': r.architecture,
+                    } for r in ReverseRelation.objects.of_package(
+                        package, relation_type)],
+                })]
+
+    def obj_get_list(self, bundle, **kwargs):
+        return self.get_object_list(bundle)
+
+
+class PackageChangesResource(CachedResponseMixin, Resource):
+    name = fields.CharField(attribute='name')
+    architecture = fields.CharField(attribute='architecture')
+    change = fields.CharField(attribute='change')
+    old_version = fields.CharField(attribute='old_version', null=True)
+    new_version = fields.CharField(attribute='new_version', null=True)
+
+    class Meta:
+        resource_name = 'packages/changes'
+        object_class = PackageObject
+        allowed_methods = ['get']
+        include_resource_uri = False
+        cache = ResponseCache(timeout=PACKAGES_CACHE_TIMEOUT,
+                              scopes=('packages',))
+
+    def get_object_list(self, bundle):
+        filters = {}
+        if hasattr(bundle.request, 'GET'):
+            filters = bundle.request.GET
+
+        old = filters.get('from', None)
+        new = filters.get('to', None)
+        change = filters.get('change', None)
+
+        if old not in codenames or new not in codenames:
+            raise BadRequest("Unknown distribution codename, expected one "
+                             "of: %s." % ', '.join(sorted(codenames)))
+        if change and change not in INVERSE_CHANGES:
+            raise BadRequest("Unknown change, expected one of: %s." %
+                             ', '.join(sorted(INVERSE_CHANGES)))
+
+        return [PackageObject({
+                    'name': name,
+                    'architecture': architecture,
+                    'change': kind,
+                    'old_version': old_version,
+                    'new_version': new_version,
+                }) for name, architecture, kind, old_version, new_version
+                in DistributionChange.objects.between(
+                    old, new, filters.get('architecture', None), change)]
+
+    def obj_get_list(self, bundle, **kwargs):
+        return self.get_object_list(bundle)
+
+
+class PackageVersionsResource(CachedResponseMixin, Resource):
+    name = fields.CharField(attribute='name')
+    architectures = fields.DictField(attribute='architectures')
+
+    class Meta:
+        resource_name = 'packages/versions'
+        object_class = PackageObject
+        allowed_methods = ['get']
+        include_resource_uri = False
+        cache = ResponseCache(timeout=PACKAGES_CACHE_TIMEOUT,
+                              scopes=('packages',))
+
+    def get_object_list(self, bundle):
+        filters = {}
+        if hasattr(bundle.request, 'GET'):
+            filters = bundle.request.GET
+
+        name = filters.get('name', None)
+        rows = VersionMatrix.objects.filter(package__Name=name)
+
+        if not rows:
+            raise Http404("Sorry, no package with that name.")
+
+        return [PackageObject({
+                    'name': name,
+                    'architectures': dict((row.architecture, row.as_dict())
+                                          for row in rows),
+                })]
+
+    def obj_get_list(self, bundle, **kwargs):
+        return self.get_object_list(bundle)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+"""
+
+These are the tests for the typeahead of the search box.
+
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test.testcases import TestCase
+from tribus.web.cloud.models import Package
+from tribus.web.cloud.catalogue import build_catalogue
+from tribus.web.autocomplete import (PrefixIndex, USERS_GENERATION_KEY,
+                                     complete_packages, users_changed)
+
+
+class AutocompleteTests(TestCase):
+
+    def test_prefix_index(self):
+        """
+        El objetivo de este test es verificar que el indice en memoria
+        devuelve las entradas cuyas claves empiezan por el prefijo, sin
+        repetirlas y sin distinguir mayusculas.
+        """
+
+        index = PrefixIndex([('python', 1), ('python-django', 2),
+                             ('Pyro', 3), ('perl', 4), ('Django', 2),
+                             ('', 5)])
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.complete('py'), [3, 1, 2])
+        self.assertEqual(index.complete('PY', limit=2), [3, 1])
+        self.assertEqual(index.complete('d'), [2])
+        self.assertEqual(index.complete('ruby'), [])
+        self.assertEqual(index.complete(' '), [])
+
+    def test_complete_packages(self):
+        """
+        El objetivo de este test es verificar que las sugerencias de
+        paquetes se toman del catalogo y se actualizan cuando este se
+        reconstruye.
+        """
+
+        for name in ['blender', 'blends-dev', 'bash']:
+            Package.objects.create(Name=name, Description='%s package' % name)
+        build_catalogue()
+        self.assertEqual([entry.name for entry in complete_packages('ble')],
+                         ['blender', 'blends-dev'])
+        self.assertEqual(complete_packages('blender')[0].description,
+                         'blender package')
+
+        Package.objects.create(Name='bleachbit')
+        build_catalogue()
+        self.assertEqual([entry.name for entry in complete_packages('blea')],
+                         ['bleachbit'])
+
+    def test_users_changed(self):
+        """
+        El objetivo de este test es verificar que cada cambio de usuarios
+        incrementa la generacion del indice de usuarios, salvo los que solo
+        guardan campos que el indice no usa, como el ultimo inicio de
+        sesion.
+        """
+
+        cache.delete(USERS_GENERATION_KEY)
+        users_changed()
+        users_changed()
+        self.assertEqual(cache.get(USERS_GENERATION_KEY), 2)
+
+        # update_last_login guarda solo last_login en cada inicio de sesion.
+        users_changed(sender=User, update_fields=frozenset(['last_login']))
+        self.assertEqual(cache.get(USERS_GENERATION_KEY), 2)
+        users_changed(sender=User, update_fields=frozenset(['first_name']))
+        self.assertEqual(cache.get(USERS_GENERATION_KEY), 3)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+"""
+
+These are the tests for the cache of the API responses.
+
+"""
+
+import os
+import shutil
+import tempfile
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test.client import RequestFactory
+from django.test.testcases import TestCase
+from tastypie.resources import Resource
+from tribus.web.api.cache import (ResponseCache, CachedResponseMixin,
+                                  charms_signature)
+from tribus.web.scopes import (invalidate_responses, invalidation_receiver,
+                               scope_key)
+
+
+class CounterResource(CachedResponseMixin, Resource):
+
+    calls = 0
+
+    class Meta:
+        resource_name = 'counter'
+        cache = ResponseCache(timeout=60, scopes=('packages',))
+
+    def get_list(self, request, **kwargs):
+        CounterResource.calls += 1
+        response = self.create_response(request, {'calls': self.calls})
+        response['Content-Language'] = 'es'
+        return response
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        CounterResource.calls = 0
+        self.view = CounterResource().wrap_view('dispatch_list')
+
+    def request(self, path='/api/0.1/counter/', **headers):
+        request = RequestFactory().get(path, HTTP_ACCEPT='application/json',
+                                       **headers)
+        request.user = AnonymousUser()
+        return request
+
+    def get(self, path='/api/0.1/counter/', **headers):
+        return self.view(self.request(path, **headers))
+
+    def test_cached_response(self):
+        """
+        El objetivo de este test es verificar que las respuestas se sirven
+        desde la cache, con su ETag, hasta que se invalida su ambito.
+        """
+
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        etag = response['ETag']
+
+        cached = self.get()
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(CounterResource.calls, 1)
+
+        not_modified = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, '')
+
+        self.get('/api/0.1/counter/?page=2')
+        self.assertEqual(CounterResource.calls, 2)
+
+        invalidate_responses('tribs')
+        self.get()
+        self.assertEqual(CounterResource.calls, 2)
+
+        invalidate_responses('packages')
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(CounterResource.calls, 3)
+
+    def assertCacheHeaders(self, response):
+        self.assertEqual(sorted(response['Cache-Control'].split(', ')),
+                         ['max-age=0', 'must-revalidate', 'private'])
+        self.assertEqual(response['Vary'], 'Accept, Cookie')
+        self.assertEqual(response['Content-Language'], 'es')
+
+    def test_cached_headers(self):
+        """
+        El objetivo de este test es verificar que las respuestas servidas
+        desde la cache, incluidas las 304, conservan las cabeceras de la
+        respuesta original y las de control de cache.
+        """
+
+        response = self.get()
+        self.assertCacheHeaders(response)
+
+        cached = self.get()
+        self.assertEqual(CounterResource.calls, 1)
+        self.assertCacheHeaders(cached)
+
+        not_modified = CounterResource().dispatch(
+            'list', self.request(HTTP_IF_NONE_MATCH=response['ETag']))
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertCacheHeaders(not_modified)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_invalidation_receiver(self):
+        """
+        El objetivo de este test es verificar que los guardados que solo
+        cambian campos ignorados, como el ultimo inicio de sesion, no
+        invalidan las respuestas.
+        """
+
+        receiver = invalidation_receiver('users',
+                                         ignored_fields=['last_login'])
+        invalidate_responses('users')
+        generation = cache.get(scope_key('users'))
+
+        receiver(sender=None, update_fields=frozenset(['last_login']))
+        self.assertEqual(cache.get(scope_key('users')), generation)
+        receiver(sender=None, update_fields=frozenset(['last_login',
+                                                       'email']))
+        self.assertEqual(cache.get(scope_key('users')), generation + 1)
+        receiver(sender=None)
+        self.assertEqual(cache.get(scope_key('users')), generation + 2)
+
+    def test_charms_signature(self):
+        """
+        El objetivo de este test es verificar que la firma de los charms
+        cambia cuando se modifica uno de sus archivos.
+        """
+
+        charms = tempfile.mkdtemp()
+        try:
+            self.assertEqual(charms_signature(charms), ())
+            os.mkdir(os.path.join(charms, 'mysql'))
+            with open(os.path.join(charms, 'mysql', 'metadata.yaml'),
+                      'w') as f:
+                f.write('name: mysql\n')
+            signature = charms_signature(charms)
+            self.assertEqual(len(signature), 1)
+            self.assertEqual(signature, charms_signature(charms))
+
+            with open(os.path.join(charms, 'mysql', 'metadata.yaml'),
+                      'a') as f:
+                f.write('summary: MySQL\n')
+            self.assertNotEqual(signature, charms_signature(charms))
+        finally:
+            shutil.rmtree(charms)
+        self.assertEqual(charms_signature(charms), ())
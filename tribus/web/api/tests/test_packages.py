@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+These are the tests for the parameters of the package resources.
+
+"""
+
+import json
+from django.conf.urls import patterns, include, url
+from django.core.cache import cache
+from django.test.client import RequestFactory
+from django.test.testcases import TestCase
+from tribus.web.api import api_01
+from tribus.web.api.resources import (PackageChangesResource,
+                                      PackageDependsResource)
+
+urlpatterns = patterns('', url(r'^api/', include(api_01.urls)))
+
+
+class PackageChangesTests(TestCase):
+
+    urls = 'tribus.web.api.tests.test_packages'
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **params):
+        request = RequestFactory().get('/', params)
+        return PackageChangesResource().wrap_view('dispatch_list')(request)
+
+    def test_parameters(self):
+        """
+        El objetivo de este test es verificar que una distribucion o un tipo
+        de cambio desconocidos se responden con un error 400 en lugar de
+        un error interno.
+        """
+
+        response = self.get(**{'from': 'kerepakupai', 'to': 'kukenan',
+                               'change': 'upgraded'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['objects'], [])
+
+        for params in ({'from': 'kerepakupai', 'to': 'kukenan',
+                        'change': 'renamed'},
+                       {'from': 'sid', 'to': 'kukenan'},
+                       {'from': 'kerepakupai'}):
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Unknown', response.content)
+
+
+class PackageGraphTests(TestCase):
+
+    urls = 'tribus.web.api.tests.test_packages'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_parameters(self):
+        """
+        El objetivo de este test es verificar que una distribucion o una
+        arquitectura invalidas se responden con un error 400 antes de
+        buscar el archivo del grafo.
+        """
+
+        for params in ({'name': 'bash', 'distribution': 'kukenan',
+                        'architecture': '../../tmp/x'},
+                       {'name': 'bash', 'distribution': '../../tmp/x',
+                        'architecture': 'amd64'},
+                       {'name': 'bash'}):
+            request = RequestFactory().get('/', params)
+            response = PackageDependsResource().wrap_view('dispatch_list')(
+                request)
+            self.assertEqual(response.status_code, 400)
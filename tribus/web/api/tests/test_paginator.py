@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+"""
+
+These are the tests for the keyset pagination of the API.
+
+"""
+
+import datetime
+from django.http import QueryDict
+from django.test.testcases import TestCase
+from tastypie.exceptions import BadRequest
+from tribus.web.api.paginator import (KeysetPaginator, encode_cursor,
+                                      decode_cursor)
+from tribus.web.cloud.models import Package
+
+
+class KeysetPaginatorTests(TestCase):
+
+    def setUp(self):
+        # Los paquetes con la misma descripcion solo se distinguen por el id
+        for name, description in [('bash', 'shell'), ('blender', '3d'),
+                                  ('curl', 'http'), ('dash', 'shell'),
+                                  ('emacs', 'editor'), ('zsh', 'shell')]:
+            Package.objects.create(Name=name, Description=description)
+
+    def page(self, objects, query):
+        return KeysetPaginator(QueryDict(query), objects,
+                               resource_uri='/api/0.1/packages/',
+                               limit=2).page()
+
+    def test_pages(self):
+        """
+        El objetivo de este test es verificar que las paginas se leen
+        desde el cursor de la pagina anterior, sin contar el total, en el
+        orden pedido y sin saltar ni repetir objetos con el mismo valor.
+        """
+
+        for ordering in ['Description', '-Description']:
+            objects = Package.objects.order_by(ordering)
+            expected = list(Package.objects.order_by(
+                ordering, ordering.replace('Description', 'id')))
+            seen = []
+            query = 'order_by=%s' % ordering
+            while True:
+                page = self.page(objects, query)
+                self.assertFalse('total_count' in page['meta'])
+                self.assertTrue(len(page['objects']) <= 2)
+                seen.extend(page['objects'])
+                cursor = page['meta']['next_cursor']
+                if cursor is None:
+                    self.assertEqual(page['meta']['next'], None)
+                    break
+                self.assertTrue(('cursor=%s' % cursor) in
+                                page['meta']['next'])
+                self.assertTrue(('order_by=%s' % ordering) in
+                                page['meta']['next'])
+                query = 'order_by=%s&offset=4&cursor=%s' % (ordering, cursor)
+            self.assertEqual(seen, expected)
+
+    def test_cursors(self):
+        """
+        El objetivo de este test es verificar que los cursores guardan los
+        valores de la posicion y que un cursor invalido se rechaza.
+        """
+
+        date = datetime.datetime(2014, 5, 1, 10, 30, 15, 250)
+        self.assertEqual(decode_cursor(encode_cursor([date, 42])),
+                         ['2014-05-01T10:30:15.000250', 42])
+
+        objects = Package.objects.order_by('Description')
+        for cursor in ['%%%', encode_cursor([1]), 'bm90IGpzb24']:
+            self.assertRaises(BadRequest, self.page, objects,
+                              'cursor=%s' % cursor)
+        self.assertRaises(BadRequest, self.page,
+                          Package.objects.order_by('Description', '-id'), '')
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+"""
+
+These are the tests for the number of queries of the API lists. Each page
+must be served within a fixed budget of queries, whatever its size.
+
+The test settings do not install ``tribus.web`` nor ``tribus.web.profile``,
+so the tables of their models are created here.
+
+"""
+
+import json
+import datetime
+from django.conf.urls import patterns, include, url
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.testcases import TestCase
+from django.test.utils import CaptureQueriesContext
+from tribus.web.api import api_01
+from tribus.web.api.resources import (TribResource, CommentResource,
+                                      TimeLineResource, UserProfileResource)
+from tribus.web.models import Trib, Comment, TimelineEntry
+from tribus.web.profile.models import UserProfile
+from tribus.web.timeline import fan_out
+
+urlpatterns = patterns('', url(r'^api/', include(api_01.urls)))
+
+MODELS = [UserProfile, UserProfile.follows.through,
+          UserProfile.followers.through, Trib, Comment, TimelineEntry]
+
+PAGE_SIZE = 20
+TRIBS_QUERIES = 1
+COMMENTS_QUERIES = 1
+TIMELINE_QUERIES = 4
+PROFILES_QUERIES = 4
+
+
+class QueryBudgetTests(TestCase):
+
+    urls = 'tribus.web.api.tests.test_queries'
+
+    @classmethod
+    def setUpClass(cls):
+        super(QueryBudgetTests, cls).setUpClass()
+        cursor = connection.cursor()
+        for model in MODELS:
+            for sql in connection.creation.sql_create_model(
+                    model, no_style())[0]:
+                cursor.execute(sql)
+
+    @classmethod
+    def tearDownClass(cls):
+        cursor = connection.cursor()
+        for model in reversed(MODELS):
+            cursor.execute('DROP TABLE %s' % connection.ops.quote_name(
+                model._meta.db_table))
+        super(QueryBudgetTests, cls).tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user('user%s' % i,
+                                               'user%s@example.com' % i, 'x')
+                      for i in range(5)]
+        self.user = self.users[0]
+        self.user.user_profile.follows.add(*self.users[1:])
+        for user in self.users[1:]:
+            user.user_profile.followers.add(self.user)
+
+        date = datetime.datetime(2014, 1, 1)
+        self.tribs = []
+        for i in range(PAGE_SIZE * 2):
+            trib = Trib.objects.create(
+                user_id=self.users[i % len(self.users)],
+                trib_pub_date=date + datetime.timedelta(minutes=i),
+                trib_content='trib %s' % i)
+            fan_out(trib)
+            self.tribs.append(trib)
+        for i in range(PAGE_SIZE * 2):
+            Comment.objects.create(
+                user_id=self.users[i % len(self.users)],
+                trib_id=self.tribs[0],
+                comment_pub_date=date + datetime.timedelta(minutes=i),
+                comment_content='comment %s' % i)
+
+    def get_list(self, resource, budget, **params):
+        params.setdefault('limit', PAGE_SIZE)
+        request = RequestFactory().get('/', params)
+        request.user = self.user
+        with CaptureQueriesContext(connection) as queries:
+            response = resource.wrap_view('dispatch_list')(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            len(queries) <= budget,
+            '%s queries for %s, the budget is %s:\n%s' % (
+                len(queries), resource._meta.resource_name, budget,
+                '\n'.join(query['sql'] for query in queries.captured_queries)))
+        return json.loads(response.content)
+
+    def assertEmbeddedUser(self, user):
+        self.assertEqual(sorted(user.keys()),
+                         ['email', 'first_name', 'id', 'last_name',
+                          'resource_uri', 'username'])
+        self.assertEqual(user['resource_uri'],
+                         '/api/0.1/user/details/%s/' % user['id'])
+
+    def test_tribs(self):
+        """
+        El objetivo de este test es verificar que una pagina de tribs, con
+        sus autores incluidos, se sirve sin exceder el presupuesto de
+        consultas.
+        """
+
+        page = self.get_list(TribResource(), TRIBS_QUERIES,
+                             order_by='-trib_pub_date')
+        self.assertEqual(len(page['objects']), PAGE_SIZE)
+        self.assertEmbeddedUser(page['objects'][0]['user_id'])
+
+        page = self.get_list(TribResource(), TRIBS_QUERIES,
+                             order_by='-trib_pub_date',
+                             cursor=page['meta']['next_cursor'])
+        self.assertEqual(len(page['objects']), PAGE_SIZE)
+
+    def test_comments(self):
+        """
+        El objetivo de este test es verificar que una pagina de comentarios,
+        con sus autores y el trib al que responden, se sirve sin exceder el
+        presupuesto de consultas.
+        """
+
+        page = self.get_list(CommentResource(), COMMENTS_QUERIES,
+                             trib_id=self.tribs[0].id,
+                             order_by='-comment_pub_date')
+        self.assertEqual(len(page['objects']), PAGE_SIZE)
+        self.assertEmbeddedUser(page['objects'][0]['user_id'])
+        self.assertEmbeddedUser(page['objects'][0]['trib_id']['user_id'])
+
+    def test_timeline(self):
+        """
+        El objetivo de este test es verificar que una pagina del timeline
+        se sirve sin exceder el presupuesto de consultas.
+        """
+
+        page = self.get_list(TimeLineResource(), TIMELINE_QUERIES)
+        self.assertEqual(len(page['objects']), PAGE_SIZE)
+        self.assertEmbeddedUser(page['objects'][0]['user_id'])
+
+    def test_profiles(self):
+        """
+        El objetivo de este test es verificar que los seguidores de una
+        pagina de perfiles se leen con una consulta por relacion, y no una
+        por perfil.
+        """
+
+        page = self.get_list(UserProfileResource(), PROFILES_QUERIES)
+        self.assertEqual(len(page['objects']), len(self.users))
+        profile = [p for p in page['objects']
+                   if p['user'] == '/api/0.1/user/details/%s/' %
+                   self.user.id][0]
+        self.assertEqual(len(profile['follows']), len(self.users) - 1)
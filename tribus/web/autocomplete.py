@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+tribus.web.autocomplete
+=======================
+
+This module answers the typeahead of the search box from sorted arrays
+kept in the memory of each web worker, using binary search on the prefix
+typed by the user.
+
+The package names are those of the in-memory catalogue, which is rebuilt
+by the recorder after each synchronization. The users are loaded from the
+database, and loaded again when the generation stored in the cache changes;
+it is increased every time a user is saved or deleted, and checked at most
+every ``AUTOCOMPLETE_REFRESH`` seconds.
+
+"""
+
+import time
+import bisect
+import threading
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from tribus.web.cloud.catalogue import get_catalogue
+
+AUTOCOMPLETE_LIMIT = 5
+AUTOCOMPLETE_REFRESH = 5
+USERS_GENERATION_KEY = 'autocomplete:users'
+
+# Fields of ``User`` read by the user index.
+INDEXED_USER_FIELDS = frozenset(['username', 'first_name', 'last_name',
+                                 'description', 'is_active'])
+
+UserEntry = namedtuple('UserEntry', ['username', 'fullname', 'description'])
+
+
+class PrefixIndex(object):
+    """
+
+    A sorted array of lowercase keys, each pointing to an entry. An entry
+    can have several keys, e.g. the username and the first name of a user.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, pairs):
+        """
+
+        :param pairs: an iterable of ``(key, entry)`` tuples.
+
+        .. versionadded:: 0.2
+
+        """
+        pairs = sorted((key.lower(), i, entry)
+                       for i, (key, entry) in enumerate(pairs) if key)
+        self.keys = [key for key, _, _ in pairs]
+        self.entries = [entry for _, _, entry in pairs]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def complete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """
+
+        :param prefix: the text typed by the user.
+        :param limit: the maximum number of entries returned.
+        :return: a list with the first distinct entries having a key that
+                 starts with `prefix`, ignoring case.
+
+        .. versionadded:: 0.2
+
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        found = []
+        for i in xrange(bisect.bisect_left(self.keys, prefix), len(self.keys)):
+            if len(found) >= limit or not self.keys[i].startswith(prefix):
+                break
+            if self.entries[i] not in found:
+                found.append(self.entries[i])
+        return found
+
+
+def users_changed(sender=None, update_fields=None, **kwargs):
+    """
+
+    Increases the generation of the user index, so that every worker loads
+    it again. It is connected to the ``post_save`` and ``post_delete``
+    signals of ``User``. Saves limited to fields that the index does not
+    read, such as the ``last_login`` saved on each login, are ignored.
+
+    :param update_fields: the fields saved, or None if all of them were.
+
+    .. versionadded:: 0.2
+
+    """
+    if update_fields is not None and not \
+            INDEXED_USER_FIELDS.intersection(update_fields):
+        return
+    try:
+        cache.incr(USERS_GENERATION_KEY)
+    except ValueError:
+        cache.set(USERS_GENERATION_KEY, 1, None)
+
+
+def build_user_index():
+    """
+
+    :return: a `PrefixIndex` of the active users, by username, first name,
+             last name and full name.
+
+    .. versionadded:: 0.2
+
+    """
+    pairs = []
+    for username, first, last, description in User.objects.filter(
+            is_active=True).values_list('username', 'first_name', 'last_name',
+                                        'description').iterator():
+        entry = UserEntry(username, (u'%s %s' % (first, last)).strip(),
+                          description)
+        for key in set([username, first, last, entry.fullname]):
+            pairs.append((key, entry))
+    return PrefixIndex(pairs)
+
+
+_package_index = (None, PrefixIndex([]))
+_user_index = (None, 0, PrefixIndex([]))
+_lock = threading.Lock()
+
+
+def get_package_index():
+    """
+
+    :return: a `PrefixIndex` of the package names of the catalogue, built
+             again when the catalogue is reloaded.
+
+    .. versionadded:: 0.2
+
+    """
+    global _package_index
+    catalogue = get_catalogue()
+    with _lock:
+        if _package_index[0] is not catalogue:
+            _package_index = (catalogue, PrefixIndex(
+                (entry.name, entry) for entry in catalogue.entries))
+        return _package_index[1]
+
+
+def get_user_index():
+    """
+
+    :return: the `PrefixIndex` of the users, built again if the generation
+             in the cache changed since it was loaded.
+
+    .. versionadded:: 0.2
+
+    """
+    global _user_index
+    refresh = getattr(settings, 'AUTOCOMPLETE_REFRESH', AUTOCOMPLETE_REFRESH)
+    with _lock:
+        generation, checked, index = _user_index
+        now = time.time()
+        if generation is None or now - checked >= refresh:
+            current = cache.get(USERS_GENERATION_KEY, 0)
+            if current != generation:
+                index = build_user_index()
+            _user_index = (current, now, index)
+        return index
+
+
+def complete_packages(prefix, limit=AUTOCOMPLETE_LIMIT):
+    """
+
+    :param prefix: the text typed by the user.
+    :param limit: the maximum number of packages returned.
+    :return: a list of ``CatalogueEntry`` objects.
+
+    .. versionadded:: 0.2
+
+    """
+    return get_package_index().complete(prefix, limit)
+
+
+def complete_users(prefix, limit=AUTOCOMPLETE_LIMIT):
+    """
+
+    :param prefix: the text typed by the user.
+    :param limit: the maximum number of users returned.
+    :return: a list of `UserEntry` objects.
+
+    .. versionadded:: 0.2
+
+    """
+    return get_user_index().complete(prefix, limit)
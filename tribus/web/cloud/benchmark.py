@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.web.cloud.benchmark
+==========================
+
+This module measures the lookups that the recorder and the cloud views
+run most often, recording the query plan chosen by the database and the
+average time of each one. Running it before and after a schema change
+shows whether the change is used by the database.
+
+"""
+
+import time
+from django.db import connection
+from tribus.web.cloud.models import Package, Details, Relation, Label
+
+EXPLAIN = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+
+def hot_queries():
+    """
+
+    Builds the benchmarked querysets, using values taken from the data
+    that is already recorded.
+
+    :return: a list of ``(name, queryset)`` tuples. It is empty if there
+             are no details recorded.
+
+    .. versionadded:: 0.2
+
+    """
+    details = Details.objects.filter(package__isnull=False)[:1]
+    relation = Relation.objects.filter(related_package__isnull=False)[:1]
+    label = Label.objects.all()[:1]
+    if not details:
+        return []
+    details = details[0]
+    package = Package.objects.filter(Details=details)[0]
+
+    queries = [
+        ('package_by_name', Package.objects.filter(Name=package.Name)),
+        ('details_by_distribution', Details.objects.filter(
+            Distribution=details.Distribution, Component=details.Component,
+            Architecture=details.Architecture)),
+        ('details_by_package_name', Details.objects.filter(
+            package__Name=package.Name, Distribution=details.Distribution)),
+    ]
+    if relation:
+        queries.append(('relation_by_package_and_type',
+                        Relation.objects.filter(
+                            related_package=relation[0].related_package_id,
+                            relation_type=relation[0].relation_type)))
+    if label:
+        queries.append(('label_by_name_and_tag', Label.objects.filter(
+            Name=label[0].Name, Tags=label[0].Tags_id)))
+    return queries
+
+
+def explain(queryset):
+    """
+
+    :param queryset: a queryset.
+    :return: the query plan chosen by the database, as a list of lines, or
+             an empty list if the database is not supported.
+
+    .. versionadded:: 0.2
+
+    """
+    prefix = EXPLAIN.get(connection.vendor)
+    if not prefix:
+        return []
+    sql, params = queryset.query.sql_with_params()
+    cursor = connection.cursor()
+    cursor.execute(prefix + sql, params)
+    return [' '.join(unicode(column) for column in row)
+            for row in cursor.fetchall()]
+
+
+def time_queryset(queryset, repeat):
+    """
+
+    :param queryset: a queryset.
+    :param repeat: how many times the query is run.
+    :return: the average time of the query, in milliseconds.
+
+    .. versionadded:: 0.2
+
+    """
+    start = time.time()
+    for _ in xrange(repeat):
+        list(queryset.all())
+    return (time.time() - start) * 1000.0 / repeat
+
+
+def run_benchmark(repeat=100):
+    """
+
+    Measures every query returned by `hot_queries`.
+
+    :param repeat: how many times each query is run.
+    :return: a dictionary mapping query names to dictionaries with the
+             ``sql``, ``plan`` and ``ms`` (average milliseconds) of the
+             query.
+
+    .. versionadded:: 0.2
+
+    """
+    results = {}
+    for name, queryset in hot_queries():
+        results[name] = {'sql': unicode(queryset.query),
+                         'plan': explain(queryset),
+                         'ms': time_queryset(queryset, repeat)}
+    return results
+
+
+def compare(before, after):
+    """
+
+    Compares two results of `run_benchmark`.
+
+    :param before: the results taken before a change.
+    :param after: the results taken after the change.
+    :return: a list of ``(name, ms before, ms after, plan changed)``
+             tuples, for the queries present in both results.
+
+    .. versionadded:: 0.2
+
+    """
+    return [(name, before[name]['ms'], after[name]['ms'],
+             before[name]['plan'] != after[name]['plan'])
+            for name in sorted(set(before) & set(after))]
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.web.cloud.catalogue
+==========================
+
+This module contains the package catalogue: a compact file with the name
+and short description of every package, sorted by name. The recorder
+rebuilds it after each synchronization and the package list is rendered
+from an in-memory copy of it, so browsing the catalogue queries neither
+the search index nor the database.
+
+"""
+
+import os
+import bisect
+import tempfile
+import threading
+from collections import namedtuple
+from django.conf import settings
+from django.core.paginator import Page
+from tribus.common.logger import get_logger
+from tribus.config.base import CATALOGUEINDEX
+from tribus.web.cloud.models import Package
+
+logger = get_logger()
+
+DESCRIPTION_LENGTH = 200
+
+CatalogueEntry = namedtuple('CatalogueEntry', ['name', 'description'])
+
+
+def short_description(description):
+    """
+
+    :param description: the description of a package, or None.
+    :return: the first line of the description, with at most
+             `DESCRIPTION_LENGTH` characters.
+
+    .. versionadded:: 0.2
+
+    """
+    if not description:
+        return u''
+    line = description.strip().split('\n', 1)[0].replace('\t', ' ')
+    return line[:DESCRIPTION_LENGTH]
+
+
+def catalogue_path():
+    """
+
+    :return: the path of the catalogue file, taken from the
+             ``CATALOGUE_INDEX`` setting.
+
+    .. versionadded:: 0.2
+
+    """
+    return getattr(settings, 'CATALOGUE_INDEX', CATALOGUEINDEX)
+
+
+def build_catalogue(path=None):
+    """
+
+    Writes the catalogue file from the packages recorded in the database.
+    Each line holds the name and the short description of a package,
+    separated by a tab. The file is replaced atomically.
+
+    :param path: path of the catalogue file. Defaults to `catalogue_path`.
+    :return: the number of packages written.
+
+    .. versionadded:: 0.2
+
+    """
+    path = path or catalogue_path()
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    total = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    # Sorted in Python, so that the order does not depend on the collation
+    # of the database and matches the lookups done with ``bisect``.
+    rows = sorted(Package.objects.values_list('Name', 'Description'
+                                              ).iterator())
+    try:
+        with os.fdopen(fd, 'w') as f:
+            for name, description in rows:
+                f.write((u'%s\t%s\n' % (
+                    name, short_description(description))).encode('utf-8'))
+                total += 1
+        os.chmod(tmp_path, 0644)
+        os.rename(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logger.info('%s packages written to the catalogue in %s' % (total, path))
+    return total
+
+
+class Catalogue(object):
+    """
+
+    An in-memory copy of the catalogue file.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.names = [entry.name for entry in entries]
+
+    @classmethod
+    def load(cls, path):
+        """
+
+        :param path: path of the catalogue file.
+        :return: a `Catalogue` object, empty if the file does not exist.
+
+        .. versionadded:: 0.2
+
+        """
+        entries = []
+        if os.path.isfile(path):
+            with open(path) as f:
+                for line in f:
+                    name, _, description = line.decode('utf-8').rstrip(
+                        '\n').partition('\t')
+                    entries.append(CatalogueEntry(name, description))
+        return cls(entries)
+
+    def page(self, paginator, number=None, after=None):
+        """
+
+        Returns a page of the catalogue, either by number or by the name of
+        the last package of the previous page. Both are resolved without
+        scanning the catalogue.
+
+        :param paginator: a ``Paginator`` built over `entries`.
+        :param number: the number of the page.
+        :param after: a package name. If given, the page starts at the
+                      first package that sorts after it.
+        :return: a ``Page`` object.
+        :raises InvalidPage: if the page does not exist.
+
+        .. versionadded:: 0.2
+
+        """
+        if after is None:
+            return paginator.page(number or 1)
+        start = bisect.bisect_right(self.names, after)
+        return Page(self.entries[start:start + paginator.per_page],
+                    start // paginator.per_page + 1, paginator)
+
+
+_catalogues = {}
+_lock = threading.Lock()
+
+
+def get_catalogue(path=None):
+    """
+
+    Returns the in-memory copy of the catalogue file, loading it again if
+    the file was rebuilt since it was loaded.
+
+    :param path: path of the catalogue file. Defaults to `catalogue_path`.
+    :return: a `Catalogue` object.
+
+    .. versionadded:: 0.2
+
+    """
+    path = path or catalogue_path()
+    try:
+        st = os.stat(path)
+        version = (st.st_ino, st.st_mtime, st.st_size)
+    except OSError:
+        version = None
+    with _lock:
+        loaded = _catalogues.get(path)
+        if loaded is None or loaded[0] != version:
+            loaded = (version, Catalogue.load(path))
+            _catalogues[path] = loaded
+    return loaded[1]
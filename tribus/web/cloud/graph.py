@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.web.cloud.graph
+======================
+
+This module contains the dependency graph of a distribution and
+architecture, built from the recorded `Details` and `Relation` rows.
+
+Packages are numbered by name and the graph is kept in flat integer
+arrays (compressed adjacency lists), so it can be saved to a compact
+snapshot file, loaded quickly when a worker starts and walked without
+touching the database.
+
+Each package has a list of clauses, one per dependency: a clause is the
+list of packages that can satisfy it, more than one if it has
+alternatives (same ``alt_id``).
+
+"""
+
+import os
+import re
+import array
+import tempfile
+import threading
+import cPickle
+from collections import deque
+from django.conf import settings
+from tribus.common.logger import get_logger
+from tribus.config.base import GRAPHSDIR
+from tribus.config.pkgrecorder import codenames
+from tribus.web.cloud.models import Details
+
+logger = get_logger()
+
+DEPENDENCY_TYPES = ['pre-depends', 'depends']
+SNAPSHOT_VERSION = 1
+
+# Architectures accepted in the names of the graph snapshots.
+ARCHITECTURE_NAME = re.compile(r'^[a-z0-9-]+$')
+
+
+def _offsets(groups):
+    """
+    Flattens a list of lists into a ``(offsets, items)`` pair of arrays,
+    where the items of group ``i`` are ``items[offsets[i]:offsets[i + 1]]``.
+    """
+    offsets, items = array.array('l', [0]), array.array('l')
+    for group in groups:
+        items.extend(group)
+        offsets.append(len(items))
+    return offsets, items
+
+
+class DependencyGraph(object):
+    """
+
+    The dependency graph of a distribution and architecture.
+
+    :param names: the sorted list of package names. The position of a name
+                  is the id of the package in the other arrays.
+    :param real: a ``bytearray`` with 1 for the packages that have details
+                 in this distribution and architecture, and 0 for the ones
+                 that are only the target of a relation.
+    :param clauses: a ``(offsets, clause ids)`` pair mapping each package
+                    to its clauses.
+    :param targets: a ``(offsets, package ids)`` pair mapping each clause
+                    to the packages that satisfy it.
+    :param reverse: a ``(offsets, package ids)`` pair mapping each package
+                    to the packages that depend on it.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, distribution, architecture, names, real, clauses,
+                 targets, reverse):
+        self.distribution = distribution
+        self.architecture = architecture
+        self.names = names
+        self.real = real
+        self.clauses = clauses
+        self.targets = targets
+        self.reverse = reverse
+        self.ids = dict((name, i) for i, name in enumerate(names))
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, distribution, architecture):
+        """
+
+        Builds the graph from the database with a single query.
+        Architecture-independent packages are part of every architecture.
+
+        :param distribution: the codename of the distribution.
+        :param architecture: the architecture.
+        :return: a `DependencyGraph` object.
+
+        .. versionadded:: 0.2
+
+        """
+        architectures = [architecture, 'all']
+        sources = set(Details.objects.filter(
+            Distribution=distribution, Architecture__in=architectures
+        ).values_list('package__Name', flat=True))
+        sources.discard(None)
+
+        groups = {}
+        for details, relation_type, alt_id, relation, name in \
+                Details.Relations.through.objects.filter(
+                    details__Distribution=distribution,
+                    details__Architecture__in=architectures,
+                    relation__relation_type__in=DEPENDENCY_TYPES,
+                    relation__related_package__isnull=False).values_list(
+                        'details', 'relation__relation_type',
+                        'relation__alt_id', 'relation',
+                        'relation__related_package__Name'):
+            # Relations without alternatives are clauses on their own.
+            key = (details, relation_type, alt_id or -relation)
+            groups.setdefault(key, set()).add(name)
+        source_of = dict(Details.objects.filter(
+            Distribution=distribution, Architecture__in=architectures,
+            package__isnull=False).values_list('id', 'package__Name'))
+
+        names = sorted(sources.union(*groups.values()) if groups
+                       else sources)
+        ids = dict((name, i) for i, name in enumerate(names))
+        clauses_of = [set() for _ in names]
+        for (details, _, _), targets in groups.items():
+            if details not in source_of:
+                continue
+            clauses_of[ids[source_of[details]]].add(
+                tuple(sorted(ids[name] for name in targets)))
+
+        clause_list, package_clauses = [], []
+        for clauses in clauses_of:
+            package_clauses.append(range(len(clause_list),
+                                         len(clause_list) + len(clauses)))
+            clause_list.extend(sorted(clauses))
+        reverse = [set() for _ in names]
+        for source, clauses in enumerate(clauses_of):
+            for clause in clauses:
+                for target in clause:
+                    if target != source:
+                        reverse[target].add(source)
+
+        real = bytearray(len(names))
+        for name in sources:
+            real[ids[name]] = 1
+        return cls(distribution, architecture, names, real,
+                   _offsets(package_clauses), _offsets(clause_list),
+                   _offsets(sorted(group) for group in reverse))
+
+    def save(self, path):
+        """
+
+        Writes the graph to a snapshot file, replacing it atomically.
+
+        :param path: the path of the snapshot file.
+
+        .. versionadded:: 0.2
+
+        """
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                cPickle.dump((SNAPSHOT_VERSION, self.distribution,
+                              self.architecture, '\n'.join(self.names),
+                              str(self.real),
+                              [a.tostring() for a in self.clauses +
+                               self.targets + self.reverse]),
+                             f, cPickle.HIGHEST_PROTOCOL)
+            os.chmod(tmp_path, 0644)
+            os.rename(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path):
+        """
+
+        :param path: the path of a snapshot file written by `save`.
+        :return: a `DependencyGraph` object, or None if the file does not
+                 exist or was written by another version.
+
+        .. versionadded:: 0.2
+
+        """
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            data = cPickle.load(f)
+        if data[0] != SNAPSHOT_VERSION:
+            return None
+        _, distribution, architecture, names, real, arrays = data
+        arrays = [array.array('l', raw) for raw in arrays]
+        return cls(distribution, architecture,
+                   names.split('\n') if names else [], bytearray(real),
+                   tuple(arrays[0:2]), tuple(arrays[2:4]),
+                   tuple(arrays[4:6]))
+
+    def _clauses(self, package):
+        offsets, clause_ids = self.clauses
+        targets_offsets, targets = self.targets
+        for i in xrange(offsets[package], offsets[package + 1]):
+            clause = clause_ids[i]
+            yield targets[targets_offsets[clause]:
+                          targets_offsets[clause + 1]]
+
+    def _dependents(self, package):
+        offsets, sources = self.reverse
+        return sources[offsets[package]:offsets[package + 1]]
+
+    def resolve(self, clause, chosen=None):
+        """
+
+        Chooses the package that satisfies a clause: one already in
+        `chosen` if there is any, otherwise the first package with details
+        in this distribution and architecture, otherwise the first one.
+        The order of alternatives is not recorded, so "first" means first
+        by name.
+
+        :param clause: a list of package ids.
+        :param chosen: a container of package ids already chosen.
+        :return: a package id.
+
+        .. versionadded:: 0.2
+
+        """
+        if chosen is not None:
+            for package in clause:
+                if package in chosen:
+                    return package
+        for package in clause:
+            if self.real[package]:
+                return package
+        return clause[0]
+
+    def depends(self, name, alternatives=False):
+        """
+
+        Computes the transitive closure of the ``depends`` and
+        ``pre-depends`` relations of a package.
+
+        :param name: the name of the package.
+        :param alternatives: if True, every alternative of a clause is
+                             followed. Otherwise only the one chosen by
+                             `resolve`.
+        :return: the sorted list of the names of the packages needed by
+                 `name`, not including itself.
+
+        .. versionadded:: 0.2
+
+        """
+        start = self.ids[name]
+        seen = set([start])
+        queue = deque([start])
+        while queue:
+            for clause in self._clauses(queue.popleft()):
+                if alternatives:
+                    chosen = clause
+                else:
+                    chosen = [self.resolve(clause, seen)]
+                for package in chosen:
+                    if package not in seen:
+                        seen.add(package)
+                        queue.append(package)
+        seen.discard(start)
+        return sorted(self.names[package] for package in seen)
+
+    def rdepends(self, name, transitive=True):
+        """
+
+        Computes the packages that depend on a package, through any of the
+        alternatives of their clauses.
+
+        :param name: the name of the package.
+        :param transitive: if False, only direct reverse dependencies are
+                           returned.
+        :return: the sorted list of the names of the dependent packages.
+
+        .. versionadded:: 0.2
+
+        """
+        start = self.ids[name]
+        if not transitive:
+            return sorted(self.names[package]
+                          for package in self._dependents(start))
+        seen = set([start])
+        queue = deque([start])
+        while queue:
+            for package in self._dependents(queue.popleft()):
+                if package not in seen:
+                    seen.add(package)
+                    queue.append(package)
+        seen.discard(start)
+        return sorted(self.names[package] for package in seen)
+
+
+def valid_graph(distribution, architecture):
+    """
+
+    :param distribution: the codename of the distribution.
+    :param architecture: the architecture.
+    :return: True if `distribution` is a known codename and `architecture`
+             only has lowercase letters, digits and hyphens. The names of
+             the snapshot files are built from them, so no other values
+             can be turned into a path.
+
+    .. versionadded:: 0.2
+
+    """
+    return (distribution in codenames and architecture is not None and
+            ARCHITECTURE_NAME.match(architecture) is not None)
+
+
+def graph_path(distribution, architecture):
+    """
+
+    :param distribution: the codename of the distribution.
+    :param architecture: the architecture.
+    :return: the path of the snapshot file of the graph, inside the
+             ``DEPENDENCY_GRAPH_DIR`` setting.
+    :raises ValueError: if `valid_graph` rejects the names.
+
+    .. versionadded:: 0.2
+
+    """
+    if not valid_graph(distribution, architecture):
+        raise ValueError('Invalid graph name: %r, %r' %
+                         (distribution, architecture))
+    return os.path.join(
+        getattr(settings, 'DEPENDENCY_GRAPH_DIR', GRAPHSDIR),
+        '%s_%s.graph' % (distribution, architecture))
+
+
+def build_graphs():
+    """
+
+    Builds and saves the graph of every distribution and architecture
+    with recorded details.
+
+    :return: the list of ``(distribution, architecture)`` pairs built.
+
+    .. versionadded:: 0.2
+
+    """
+    built = []
+    for distribution, architecture in Details.objects.exclude(
+            Architecture='all').values_list(
+                'Distribution', 'Architecture').distinct():
+        if not valid_graph(distribution, architecture):
+            logger.warning('Skipping the graph of %s:%s' %
+                           (distribution, architecture))
+            continue
+        graph = DependencyGraph.build(distribution, architecture)
+        graph.save(graph_path(distribution, architecture))
+        logger.info('Dependency graph of %s:%s saved with %s packages' %
+                    (distribution, architecture, len(graph)))
+        built.append((distribution, architecture))
+    return built
+
+
+_graphs = {}
+_lock = threading.Lock()
+
+
+def get_graph(distribution, architecture):
+    """
+
+    Returns the graph of a distribution and architecture, loading its
+    snapshot file again if it was rebuilt since it was loaded.
+
+    :param distribution: the codename of the distribution.
+    :param architecture: the architecture.
+    :return: a `DependencyGraph` object, or None if there is no snapshot
+             or `valid_graph` rejects the names.
+
+    .. versionadded:: 0.2
+
+    """
+    if not valid_graph(distribution, architecture):
+        return None
+    path = graph_path(distribution, architecture)
+    try:
+        st = os.stat(path)
+        version = (st.st_ino, st.st_mtime, st.st_size)
+    except OSError:
+        return None
+    with _lock:
+        loaded = _graphs.get(path)
+        if loaded is None or loaded[0] != version:
+            loaded = (version, DependencyGraph.load(path))
+            _graphs[path] = loaded
+    return loaded[1]
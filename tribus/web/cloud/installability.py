@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.web.cloud.installability
+===============================
+
+This module checks, for every package of a distribution and architecture,
+whether its ``depends`` and ``pre-depends`` relations can be satisfied by
+the packages of the same distribution, honouring alternatives, version
+constraints and ``provides``. Conflicts are not taken into account.
+
+The relations are loaded with two queries into integer arrays, and the
+check is a unit propagation: every package starts as installable, a
+dependency with no installable candidate left breaks the package that
+needs it, and each broken package is propagated once to the dependencies
+where it is a candidate. The candidates of each distinct relation are
+computed only once.
+
+"""
+
+import time
+import array
+from collections import deque
+from django.db import transaction
+from tribus.common.logger import get_logger
+from tribus.common.version import version_key, RELATION_ORDERS
+from tribus.config.pkgrecorder import codenames
+from tribus.web.cloud.graph import DEPENDENCY_TYPES
+from tribus.web.cloud.models import (Details, Installability,
+                                     invalidate_profiles)
+
+logger = get_logger()
+
+MISSING_LENGTH = 255
+
+
+def satisfies(key, order, required_key):
+    """
+
+    :param key: the version key of a package, or None.
+    :param order: the operator of a relation, or None.
+    :param required_key: the version key of the relation.
+    :return: True if the version satisfies the relation.
+
+    .. versionadded:: 0.2
+
+    """
+    if not order:
+        return True
+    if key is None or required_key is None:
+        return False
+    return RELATION_ORDERS[order](cmp(key, required_key))
+
+
+def describe_clause(atoms):
+    """
+
+    :param atoms: a list of ``(name, order, version, key)`` tuples.
+    :return: the clause as written in a control file, e.g.
+             ``libc6 (>= 2.13) | libc6.1``.
+
+    .. versionadded:: 0.2
+
+    """
+    return ' | '.join(
+        '%s (%s %s)' % (name, order, version) if order else name
+        for name, order, version, _ in atoms)[:MISSING_LENGTH]
+
+
+class InstallabilityChecker(object):
+    """
+
+    Checks the installability of the details of a distribution and
+    architecture. Architecture-independent details are checked as part of
+    every architecture.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, distribution, architecture):
+        self.distribution = distribution
+        self.architecture = architecture
+        self.details = array.array('l')
+        self.packages = array.array('l')
+        self.keys = []
+        self.by_name = {}
+        self.provides = {}
+        self.clauses = []
+        self.owners = array.array('l')
+        self._candidates = {}
+
+    def load(self):
+        """
+
+        Loads the details and their relations with two queries.
+
+        .. versionadded:: 0.2
+
+        """
+        architectures = [self.architecture, 'all']
+        units = {}
+        for pk, package, name, key in Details.objects.filter(
+                Distribution=self.distribution,
+                Architecture__in=architectures,
+                package__isnull=False).values_list(
+                    'id', 'package', 'package__Name', 'VersionKey'):
+            units[pk] = len(self.details)
+            self.details.append(pk)
+            self.packages.append(package)
+            self.keys.append(key)
+            self.by_name.setdefault(name, []).append(units[pk])
+
+        groups = {}
+        for details, relation_type, alt_id, relation, name, order, version, \
+                key in Details.Relations.through.objects.filter(
+                    details__Distribution=self.distribution,
+                    details__Architecture__in=architectures,
+                    relation__relation_type__in=DEPENDENCY_TYPES + [
+                        'provides'],
+                    relation__related_package__isnull=False).values_list(
+                        'details', 'relation__relation_type',
+                        'relation__alt_id', 'relation',
+                        'relation__related_package__Name', 'relation__order',
+                        'relation__version', 'relation__version_key'):
+            if details not in units:
+                continue
+            if version and key is None:
+                key = version_key(version)
+            unit = units[details]
+            if relation_type == 'provides':
+                self.provides.setdefault(name, []).append((unit, key))
+            else:
+                # Relations without alternatives are clauses on their own.
+                groups.setdefault((unit, relation_type, alt_id or -relation),
+                                  []).append((name, order, version, key))
+
+        for (unit, _, _), atoms in sorted(groups.items()):
+            self.owners.append(unit)
+            self.clauses.append(sorted(set(atoms)))
+
+    def candidates(self, atom):
+        """
+
+        :param atom: a ``(name, order, version, key)`` tuple.
+        :return: the tuple of units that satisfy it, either directly or
+                 through ``provides``. It is computed once per atom.
+
+        .. versionadded:: 0.2
+
+        """
+        name, order, _, key = atom
+        cache_key = (name, order, key)
+        if cache_key not in self._candidates:
+            found = set(unit for unit in self.by_name.get(name, ())
+                        if satisfies(self.keys[unit], order, key))
+            found.update(unit for unit, provided in self.provides.get(name, ())
+                         if satisfies(provided, order, key))
+            self._candidates[cache_key] = tuple(sorted(found))
+        return self._candidates[cache_key]
+
+    def check(self):
+        """
+
+        Runs the unit propagation.
+
+        :return: a list with a ``(details id, package id, installable,
+                 missing)`` tuple per details, where `missing` describes
+                 the first dependency that can not be satisfied.
+
+        .. versionadded:: 0.2
+
+        """
+        alive = array.array('l')
+        watchers = {}
+        broken = bytearray(len(self.details))
+        reasons = {}
+        queue = deque()
+
+        def breaks(unit, clause):
+            if not broken[unit]:
+                broken[unit] = 1
+                reasons[unit] = clause
+                queue.append(unit)
+
+        for clause, atoms in enumerate(self.clauses):
+            candidates = set()
+            for atom in atoms:
+                candidates.update(self.candidates(atom))
+            alive.append(len(candidates))
+            for unit in candidates:
+                watchers.setdefault(unit, []).append(clause)
+            if not candidates:
+                breaks(self.owners[clause], clause)
+
+        while queue:
+            for clause in watchers.get(queue.popleft(), ()):
+                alive[clause] -= 1
+                if not alive[clause]:
+                    breaks(self.owners[clause], clause)
+
+        return [(pk, self.packages[unit], not broken[unit],
+                 describe_clause(self.clauses[reasons[unit]])
+                 if broken[unit] else None)
+                for unit, pk in enumerate(self.details)]
+
+    def save(self, results):
+        """
+
+        Replaces the stored results of the distribution and architecture,
+        and invalidates the cached profiles of its packages.
+
+        :param results: the list returned by `check`.
+
+        .. versionadded:: 0.2
+
+        """
+        with transaction.atomic():
+            Installability.objects.filter(
+                details__Distribution=self.distribution,
+                architecture=self.architecture).delete()
+            Installability.objects.bulk_create(
+                [Installability(details_id=pk, architecture=self.architecture,
+                                installable=installable, missing=missing)
+                 for pk, _, installable, missing in results],
+                batch_size=500)
+        invalidate_profiles(package for _, package, _, _ in results)
+
+
+def check_distribution(distribution):
+    """
+
+    Checks and stores the installability of every package of a
+    distribution, in each of its architectures.
+
+    :param distribution: the codename of the distribution.
+    :return: a dictionary mapping each architecture to a ``(installable,
+             total)`` tuple.
+
+    .. versionadded:: 0.2
+
+    """
+    summary = {}
+    for architecture in Details.objects.filter(
+            Distribution=distribution).exclude(Architecture='all').values_list(
+                'Architecture', flat=True).distinct():
+        start = time.time()
+        checker = InstallabilityChecker(distribution, architecture)
+        checker.load()
+        results = checker.check()
+        checker.save(results)
+        summary[architecture] = (sum(1 for r in results if r[2]),
+                                 len(results))
+        logger.info('%s of %s packages installable in %s:%s (%.2f s)' % (
+            summary[architecture] + (distribution, architecture,
+                                     time.time() - start)))
+    return summary
+
+
+def check_codenames(distributions=None):
+    """
+
+    Runs `check_distribution` on several distributions.
+
+    :param distributions: a list of codenames. Defaults to the codenames of
+                          ``tribus.config.pkgrecorder``.
+    :return: a dictionary mapping each codename to the result of
+             `check_distribution`.
+
+    .. versionadded:: 0.2
+
+    """
+    return dict((distribution, check_distribution(distribution))
+                for distribution in sorted(distributions or codenames))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from optparse import make_option
+from django.core.management.base import BaseCommand
+from tribus.web.cloud.benchmark import run_benchmark, compare
+
+
+class Command(BaseCommand):
+    help = ('Records the query plans and timings of the hot lookups of the '
+            'recorder and the cloud views.')
+    option_list = BaseCommand.option_list + (
+        make_option('--repeat', type='int', dest='repeat', default=100,
+                    help='How many times each query is run.'),
+        make_option('--output', dest='output', default=None,
+                    help='Write the results to this JSON file.'),
+        make_option('--compare', dest='compare', default=None,
+                    help='Compare against the results in this JSON file.'),
+    )
+
+    def handle(self, *args, **options):
+        results = run_benchmark(options['repeat'])
+        for name, result in sorted(results.items()):
+            self.stdout.write('%s: %.3f ms' % (name, result['ms']))
+            for line in result['plan']:
+                self.stdout.write('    %s' % line)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+        if options['compare']:
+            with open(options['compare']) as f:
+                before = json.load(f)
+            for name, ms_before, ms_after, plan_changed in compare(before,
+                                                                   results):
+                self.stdout.write('%s: %.3f ms -> %.3f ms%s' % (
+                    name, ms_before, ms_after,
+                    ' (plan changed)' if plan_changed else ''))
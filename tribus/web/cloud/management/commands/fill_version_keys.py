@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from tribus.web.cloud.models import Details, Relation
+from tribus.web.cloud.upgrade import backfill_version_keys
+
+
+class Command(BaseCommand):
+    help = ('Computes the version keys of the details and relations '
+            'recorded before they were introduced.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            computed = backfill_version_keys(Details, Relation)
+        for model, total in sorted(computed.items(),
+                                   key=lambda item: item[0].__name__):
+            self.stdout.write('%s %s version keys computed.' %
+                              (total, model.__name__))
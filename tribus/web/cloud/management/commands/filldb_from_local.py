@@ -18,14 +18,31 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from optparse import make_option
 from django.core.management.base import BaseCommand
-from tribus.common.recorder import fill_db_from_cache, create_cache
+from tribus.common.recorder import fill_db_from_cache, fill_db_sharded, create_cache
 from tribus.config.pkgrecorder import LOCAL_ROOT
 from tribus.config.base import PACKAGECACHE
 
 
 class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--bulk', action='store_true', dest='bulk',
+                    default=False,
+                    help='Record each control file with bulk inserts.'),
+        make_option('--workers', type='int', dest='workers', default=0,
+                    help='Record the control files in parallel with this '
+                         'number of processes.'),
+    )
 
     def handle(self, *args, **options):
         create_cache(LOCAL_ROOT, PACKAGECACHE)
-        fill_db_from_cache(PACKAGECACHE)
+        if options['workers']:
+            for path, paragraphs, recorded, elapsed in fill_db_sharded(
+                    PACKAGECACHE, options['workers']):
+                self.stdout.write('%s: %s paragraphs, %s details in %.2fs '
+                                  '(%.1f paragraphs/s)' % (
+                                      path, paragraphs, recorded, elapsed,
+                                      paragraphs / max(elapsed, 0.001)))
+        else:
+            fill_db_from_cache(PACKAGECACHE, options['bulk'])
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from django.core.management.base import BaseCommand
+from tribus.web.cloud.models import VersionMatrix, DistributionChange
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the version matrix and the changes between '
+            'distributions from the details already recorded.')
+
+    def handle(self, *args, **options):
+        VersionMatrix.objects.rebuild()
+        self.stdout.write('%s rows and %s changes between distributions.' %
+                          (VersionMatrix.objects.count(),
+                           DistributionChange.objects.count()))
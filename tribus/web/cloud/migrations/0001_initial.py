@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'Maintainer'
+        db.create_table(u'cloud_maintainer', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('Name', self.gf('django.db.models.fields.CharField')(max_length=100)),
+            ('Email', self.gf('django.db.models.fields.EmailField')(max_length=75)),
+        ))
+        db.send_create_signal(u'cloud', ['Maintainer'])
+
+        # Adding model 'Package'
+        db.create_table(u'cloud_package', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('Name', self.gf('django.db.models.fields.CharField')(max_length=150)),
+            ('Maintainer', self.gf('django.db.models.fields.related.ForeignKey')(to=orm['cloud.Maintainer'], null=True)),
+            ('Section', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+            ('Essential', self.gf('django.db.models.fields.CharField')(max_length=10, null=True)),
+            ('Priority', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+            ('MultiArch', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+            ('Description', self.gf('django.db.models.fields.TextField')(max_length=500, null=True)),
+            ('Homepage', self.gf('django.db.models.fields.URLField')(max_length=200, null=True)),
+            ('Bugs', self.gf('django.db.models.fields.CharField')(max_length=200, null=True)),
+        ))
+        db.send_create_signal(u'cloud', ['Package'])
+
+        # Adding M2M table for field Labels on 'Package'
+        m2m_table_name = db.shorten_name(u'cloud_package_Labels')
+        db.create_table(m2m_table_name, (
+            ('id', models.AutoField(verbose_name='ID', primary_key=True, auto_created=True)),
+            ('package', models.ForeignKey(orm[u'cloud.package'], null=False)),
+            ('label', models.ForeignKey(orm[u'cloud.label'], null=False))
+        ))
+        db.create_unique(m2m_table_name, ['package_id', 'label_id'])
+
+        # Adding M2M table for field Details on 'Package'
+        m2m_table_name = db.shorten_name(u'cloud_package_Details')
+        db.create_table(m2m_table_name, (
+            ('id', models.AutoField(verbose_name='ID', primary_key=True, auto_created=True)),
+            ('package', models.ForeignKey(orm[u'cloud.package'], null=False)),
+            ('details', models.ForeignKey(orm[u'cloud.details'], null=False))
+        ))
+        db.create_unique(m2m_table_name, ['package_id', 'details_id'])
+
+        # Adding model 'Tag'
+        db.create_table(u'cloud_tag', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('Value', self.gf('django.db.models.fields.CharField')(max_length=200)),
+        ))
+        db.send_create_signal(u'cloud', ['Tag'])
+
+        # Adding model 'Label'
+        db.create_table(u'cloud_label', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('Name', self.gf('django.db.models.fields.CharField')(max_length=100)),
+            ('Tags', self.gf('django.db.models.fields.related.ForeignKey')(to=orm['cloud.Tag'], null=True)),
+        ))
+        db.send_create_signal(u'cloud', ['Label'])
+
+        # Adding model 'Relation'
+        db.create_table(u'cloud_relation', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('related_package', self.gf('django.db.models.fields.related.ForeignKey')(to=orm['cloud.Package'], null=True, blank=True)),
+            ('version', self.gf('django.db.models.fields.CharField')(max_length=50, null=True, blank=True)),
+            ('order', self.gf('django.db.models.fields.CharField')(max_length=75, null=True, blank=True)),
+            ('relation_type', self.gf('django.db.models.fields.CharField')(max_length=75, null=True, blank=True)),
+            ('alt_id', self.gf('django.db.models.fields.IntegerField')(null=True)),
+        ))
+        db.send_create_signal(u'cloud', ['Relation'])
+
+        # Adding model 'Details'
+        db.create_table(u'cloud_details', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('Version', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+            ('Architecture', self.gf('django.db.models.fields.CharField')(max_length=75, null=True)),
+            ('Component', self.gf('django.db.models.fields.CharField')(max_length=75, null=True)),
+            ('Distribution', self.gf('django.db.models.fields.CharField')(max_length=75)),
+            ('Size', self.gf('django.db.models.fields.IntegerField')(null=True)),
+            ('InstalledSize', self.gf('django.db.models.fields.IntegerField')(null=True)),
+            ('MD5sum', self.gf('django.db.models.fields.CharField')(max_length=75, null=True)),
+            ('Filename', self.gf('django.db.models.fields.CharField')(max_length=150, null=True)),
+        ))
+        db.send_create_signal(u'cloud', ['Details'])
+
+        # Adding M2M table for field Relations on 'Details'
+        m2m_table_name = db.shorten_name(u'cloud_details_Relations')
+        db.create_table(m2m_table_name, (
+            ('id', models.AutoField(verbose_name='ID', primary_key=True, auto_created=True)),
+            ('details', models.ForeignKey(orm[u'cloud.details'], null=False)),
+            ('relation', models.ForeignKey(orm[u'cloud.relation'], null=False))
+        ))
+        db.create_unique(m2m_table_name, ['details_id', 'relation_id'])
+
+
+    def backwards(self, orm):
+        # Deleting model 'Maintainer'
+        db.delete_table(u'cloud_maintainer')
+
+        # Deleting model 'Package'
+        db.delete_table(u'cloud_package')
+
+        # Removing M2M table for field Labels on 'Package'
+        db.delete_table(db.shorten_name(u'cloud_package_Labels'))
+
+        # Removing M2M table for field Details on 'Package'
+        db.delete_table(db.shorten_name(u'cloud_package_Details'))
+
+        # Deleting model 'Tag'
+        db.delete_table(u'cloud_tag')
+
+        # Deleting model 'Label'
+        db.delete_table(u'cloud_label')
+
+        # Deleting model 'Relation'
+        db.delete_table(u'cloud_relation')
+
+        # Deleting model 'Details'
+        db.delete_table(u'cloud_details')
+
+        # Removing M2M table for field Relations on 'Details'
+        db.delete_table(db.shorten_name(u'cloud_details_Relations'))
+
+
+    models = {
+        u'cloud.details': {
+            'Architecture': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'Component': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'Distribution': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'Filename': ('django.db.models.fields.CharField', [], {'max_length': '150', 'null': 'True'}),
+            'InstalledSize': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'MD5sum': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'Meta': {'object_name': 'Details'},
+            'Relations': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'to': u"orm['cloud.Relation']", 'null': 'True', 'blank': 'True'}),
+            'Size': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'Version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.label': {
+            'Meta': {'ordering': "['Name']", 'object_name': 'Label'},
+            'Name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'Tags': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['cloud.Tag']", 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.maintainer': {
+            'Email': ('django.db.models.fields.EmailField', [], {'max_length': '75'}),
+            'Meta': {'ordering': "['Name']", 'object_name': 'Maintainer'},
+            'Name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.package': {
+            'Bugs': ('django.db.models.fields.CharField', [], {'max_length': '200', 'null': 'True'}),
+            'Description': ('django.db.models.fields.TextField', [], {'max_length': '500', 'null': 'True'}),
+            'Details': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'to': u"orm['cloud.Details']", 'null': 'True', 'blank': 'True'}),
+            'Essential': ('django.db.models.fields.CharField', [], {'max_length': '10', 'null': 'True'}),
+            'Homepage': ('django.db.models.fields.URLField', [], {'max_length': '200', 'null': 'True'}),
+            'Labels': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'to': u"orm['cloud.Label']", 'null': 'True', 'blank': 'True'}),
+            'Maintainer': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['cloud.Maintainer']", 'null': 'True'}),
+            'Meta': {'ordering': "['Name']", 'object_name': 'Package'},
+            'MultiArch': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'Name': ('django.db.models.fields.CharField', [], {'max_length': '150'}),
+            'Priority': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'Section': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.relation': {
+            'Meta': {'object_name': 'Relation'},
+            'alt_id': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'order': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True', 'blank': 'True'}),
+            'related_package': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['cloud.Package']", 'null': 'True', 'blank': 'True'}),
+            'relation_type': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True', 'blank': 'True'}),
+            'version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True', 'blank': 'True'})
+        },
+        u'cloud.tag': {
+            'Meta': {'object_name': 'Tag'},
+            'Value': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        }
+    }
+
+    complete_apps = ['cloud']
\ No newline at end of file
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'VersionMatrix'
+        db.create_table(u'cloud_versionmatrix', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('package', self.gf('django.db.models.fields.related.ForeignKey')(related_name='versions', to=orm['cloud.Package'])),
+            ('architecture', self.gf('django.db.models.fields.CharField')(max_length=75)),
+            ('aponwao', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+            ('roraima', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+            ('auyantepui', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+            ('kerepakupai', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+            ('kukenan', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+        ))
+        db.send_create_signal(u'cloud', ['VersionMatrix'])
+
+        # Adding unique constraint on 'VersionMatrix', fields ['package', 'architecture']
+        db.create_unique(u'cloud_versionmatrix', ['package_id', 'architecture'])
+
+        # Adding model 'ReverseRelation'
+        db.create_table(u'cloud_reverserelation', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('package', self.gf('django.db.models.fields.related.ForeignKey')(related_name='reverse_relations', to=orm['cloud.Package'])),
+            ('source', self.gf('django.db.models.fields.related.ForeignKey')(related_name='+', to=orm['cloud.Package'])),
+            ('details', self.gf('django.db.models.fields.related.ForeignKey')(related_name='+', to=orm['cloud.Details'])),
+            ('relation_type', self.gf('django.db.models.fields.CharField')(max_length=75)),
+            ('distribution', self.gf('django.db.models.fields.CharField')(max_length=75)),
+            ('architecture', self.gf('django.db.models.fields.CharField')(max_length=75, null=True)),
+        ))
+        db.send_create_signal(u'cloud', ['ReverseRelation'])
+
+        # Adding index on 'ReverseRelation', fields ['package', 'relation_type']
+        db.create_index(u'cloud_reverserelation', ['package_id', 'relation_type'])
+
+        # Adding model 'DistributionChange'
+        db.create_table(u'cloud_distributionchange', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('package', self.gf('django.db.models.fields.related.ForeignKey')(related_name='+', to=orm['cloud.Package'])),
+            ('architecture', self.gf('django.db.models.fields.CharField')(max_length=75)),
+            ('old', self.gf('django.db.models.fields.CharField')(max_length=75)),
+            ('new', self.gf('django.db.models.fields.CharField')(max_length=75)),
+            ('change', self.gf('django.db.models.fields.CharField')(max_length=10)),
+            ('old_version', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+            ('new_version', self.gf('django.db.models.fields.CharField')(max_length=50, null=True)),
+        ))
+        db.send_create_signal(u'cloud', ['DistributionChange'])
+
+        # Adding index on 'DistributionChange', fields ['old', 'new', 'change']
+        db.create_index(u'cloud_distributionchange', ['old', 'new', 'change'])
+
+        # Adding model 'Installability'
+        db.create_table(u'cloud_installability', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('details', self.gf('django.db.models.fields.related.ForeignKey')(related_name='installability', to=orm['cloud.Details'])),
+            ('architecture', self.gf('django.db.models.fields.CharField')(max_length=75)),
+            ('installable', self.gf('django.db.models.fields.BooleanField')(default=True)),
+            ('missing', self.gf('django.db.models.fields.CharField')(max_length=255, null=True, blank=True)),
+        ))
+        db.send_create_signal(u'cloud', ['Installability'])
+
+        # Adding unique constraint on 'Installability', fields ['details', 'architecture']
+        db.create_unique(u'cloud_installability', ['details_id', 'architecture'])
+
+        # Adding index on 'Label', fields ['Name', 'Tags']
+        db.create_index(u'cloud_label', ['Name', 'Tags_id'])
+
+        # Adding field 'Relation.hash'
+        db.add_column(u'cloud_relation', 'hash',
+                      self.gf('django.db.models.fields.CharField')(max_length=40, null=True),
+                      keep_default=False)
+
+        # Adding field 'Relation.version_key'
+        db.add_column(u'cloud_relation', 'version_key',
+                      self.gf('django.db.models.fields.CharField')(db_index=True, max_length=200, null=True, blank=True),
+                      keep_default=False)
+
+        # Adding index on 'Relation', fields ['related_package', 'relation_type']
+        db.create_index(u'cloud_relation', ['related_package_id', 'relation_type'])
+
+        # Adding field 'Details.VersionKey'
+        db.add_column(u'cloud_details', 'VersionKey',
+                      self.gf('django.db.models.fields.CharField')(max_length=200, null=True, db_index=True),
+                      keep_default=False)
+
+        # Adding index on 'Details', fields ['Distribution', 'Component', 'Architecture']
+        db.create_index(u'cloud_details', ['Distribution', 'Component', 'Architecture'])
+
+
+    def backwards(self, orm):
+        # Removing index on 'Details', fields ['Distribution', 'Component', 'Architecture']
+        db.delete_index(u'cloud_details', ['Distribution', 'Component', 'Architecture'])
+
+        # Removing index on 'Relation', fields ['related_package', 'relation_type']
+        db.delete_index(u'cloud_relation', ['related_package_id', 'relation_type'])
+
+        # Removing index on 'Label', fields ['Name', 'Tags']
+        db.delete_index(u'cloud_label', ['Name', 'Tags_id'])
+
+        # Removing unique constraint on 'Installability', fields ['details', 'architecture']
+        db.delete_unique(u'cloud_installability', ['details_id', 'architecture'])
+
+        # Removing index on 'DistributionChange', fields ['old', 'new', 'change']
+        db.delete_index(u'cloud_distributionchange', ['old', 'new', 'change'])
+
+        # Removing index on 'ReverseRelation', fields ['package', 'relation_type']
+        db.delete_index(u'cloud_reverserelation', ['package_id', 'relation_type'])
+
+        # Removing unique constraint on 'VersionMatrix', fields ['package', 'architecture']
+        db.delete_unique(u'cloud_versionmatrix', ['package_id', 'architecture'])
+
+        # Deleting model 'VersionMatrix'
+        db.delete_table(u'cloud_versionmatrix')
+
+        # Deleting model 'ReverseRelation'
+        db.delete_table(u'cloud_reverserelation')
+
+        # Deleting model 'DistributionChange'
+        db.delete_table(u'cloud_distributionchange')
+
+        # Deleting model 'Installability'
+        db.delete_table(u'cloud_installability')
+
+        # Deleting field 'Relation.hash'
+        db.delete_column(u'cloud_relation', 'hash')
+
+        # Deleting field 'Relation.version_key'
+        db.delete_column(u'cloud_relation', 'version_key')
+
+        # Deleting field 'Details.VersionKey'
+        db.delete_column(u'cloud_details', 'VersionKey')
+
+
+    models = {
+        u'cloud.details': {
+            'Architecture': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'Component': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'Distribution': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'Filename': ('django.db.models.fields.CharField', [], {'max_length': '150', 'null': 'True'}),
+            'InstalledSize': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'MD5sum': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'Meta': {'object_name': 'Details', 'index_together': "[['Distribution', 'Component', 'Architecture']]"},
+            'Relations': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'to': u"orm['cloud.Relation']", 'null': 'True', 'blank': 'True'}),
+            'Size': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'Version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'VersionKey': ('django.db.models.fields.CharField', [], {'max_length': '200', 'null': 'True', 'db_index': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.distributionchange': {
+            'Meta': {'object_name': 'DistributionChange', 'index_together': "[['old', 'new', 'change']]"},
+            'architecture': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'change': ('django.db.models.fields.CharField', [], {'max_length': '10'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'new': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'new_version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'old': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'old_version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'package': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'+'", 'to': u"orm['cloud.Package']"})
+        },
+        u'cloud.installability': {
+            'Meta': {'unique_together': "[['details', 'architecture']]", 'object_name': 'Installability'},
+            'architecture': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'details': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'installability'", 'to': u"orm['cloud.Details']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'installable': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'missing': ('django.db.models.fields.CharField', [], {'max_length': '255', 'null': 'True', 'blank': 'True'})
+        },
+        u'cloud.label': {
+            'Meta': {'ordering': "['Name']", 'object_name': 'Label', 'index_together': "[['Name', 'Tags']]"},
+            'Name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'Tags': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['cloud.Tag']", 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.maintainer': {
+            'Email': ('django.db.models.fields.EmailField', [], {'max_length': '75'}),
+            'Meta': {'ordering': "['Name']", 'object_name': 'Maintainer'},
+            'Name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.package': {
+            'Bugs': ('django.db.models.fields.CharField', [], {'max_length': '200', 'null': 'True'}),
+            'Description': ('django.db.models.fields.TextField', [], {'max_length': '500', 'null': 'True'}),
+            'Details': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'to': u"orm['cloud.Details']", 'null': 'True', 'blank': 'True'}),
+            'Essential': ('django.db.models.fields.CharField', [], {'max_length': '10', 'null': 'True'}),
+            'Homepage': ('django.db.models.fields.URLField', [], {'max_length': '200', 'null': 'True'}),
+            'Labels': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'to': u"orm['cloud.Label']", 'null': 'True', 'blank': 'True'}),
+            'Maintainer': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['cloud.Maintainer']", 'null': 'True'}),
+            'Meta': {'ordering': "['Name']", 'object_name': 'Package'},
+            'MultiArch': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'Name': ('django.db.models.fields.CharField', [], {'max_length': '150'}),
+            'Priority': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'Section': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.relation': {
+            'Meta': {'object_name': 'Relation', 'index_together': "[['related_package', 'relation_type']]"},
+            'alt_id': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'hash': ('django.db.models.fields.CharField', [], {'max_length': '40', 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'order': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True', 'blank': 'True'}),
+            'related_package': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['cloud.Package']", 'null': 'True', 'blank': 'True'}),
+            'relation_type': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True', 'blank': 'True'}),
+            'version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True', 'blank': 'True'}),
+            'version_key': ('django.db.models.fields.CharField', [], {'db_index': 'True', 'max_length': '200', 'null': 'True', 'blank': 'True'})
+        },
+        u'cloud.reverserelation': {
+            'Meta': {'object_name': 'ReverseRelation', 'index_together': "[['package', 'relation_type']]"},
+            'architecture': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'details': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'+'", 'to': u"orm['cloud.Details']"}),
+            'distribution': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'package': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'reverse_relations'", 'to': u"orm['cloud.Package']"}),
+            'relation_type': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'source': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'+'", 'to': u"orm['cloud.Package']"})
+        },
+        u'cloud.tag': {
+            'Meta': {'object_name': 'Tag'},
+            'Value': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.versionmatrix': {
+            'Meta': {'unique_together': "[['package', 'architecture']]", 'object_name': 'VersionMatrix'},
+            'aponwao': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'architecture': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'auyantepui': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'kerepakupai': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'kukenan': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'package': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'versions'", 'to': u"orm['cloud.Package']"}),
+            'roraima': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'})
+        }
+    }
+
+    complete_apps = ['cloud']
\ No newline at end of file
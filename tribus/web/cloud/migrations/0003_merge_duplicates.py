@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import DataMigration
+from django.db import models
+from tribus.web.cloud.upgrade import (merge_duplicate_packages,
+                                      backfill_relation_hashes,
+                                      backfill_version_keys)
+
+class Migration(DataMigration):
+
+    def forwards(self, orm):
+        # The next migration makes the package names and the relation
+        # hashes unique, so the rows recorded before must not repeat them.
+        merge_duplicate_packages(orm['cloud.Package'], orm['cloud.Relation'])
+        backfill_relation_hashes(orm['cloud.Relation'], orm['cloud.Details'])
+        backfill_version_keys(orm['cloud.Details'], orm['cloud.Relation'])
+
+    def backwards(self, orm):
+        # Merged rows can not be split again; the hashes and version keys
+        # are dropped with their columns by the previous migration.
+        pass
+
+    models = {
+        u'cloud.details': {
+            'Architecture': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'Component': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'Distribution': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'Filename': ('django.db.models.fields.CharField', [], {'max_length': '150', 'null': 'True'}),
+            'InstalledSize': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'MD5sum': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'Meta': {'object_name': 'Details', 'index_together': "[['Distribution', 'Component', 'Architecture']]"},
+            'Relations': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'to': u"orm['cloud.Relation']", 'null': 'True', 'blank': 'True'}),
+            'Size': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'Version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'VersionKey': ('django.db.models.fields.CharField', [], {'max_length': '200', 'null': 'True', 'db_index': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.distributionchange': {
+            'Meta': {'object_name': 'DistributionChange', 'index_together': "[['old', 'new', 'change']]"},
+            'architecture': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'change': ('django.db.models.fields.CharField', [], {'max_length': '10'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'new': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'new_version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'old': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'old_version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'package': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'+'", 'to': u"orm['cloud.Package']"})
+        },
+        u'cloud.installability': {
+            'Meta': {'unique_together': "[['details', 'architecture']]", 'object_name': 'Installability'},
+            'architecture': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'details': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'installability'", 'to': u"orm['cloud.Details']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'installable': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'missing': ('django.db.models.fields.CharField', [], {'max_length': '255', 'null': 'True', 'blank': 'True'})
+        },
+        u'cloud.label': {
+            'Meta': {'ordering': "['Name']", 'object_name': 'Label', 'index_together': "[['Name', 'Tags']]"},
+            'Name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'Tags': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['cloud.Tag']", 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.maintainer': {
+            'Email': ('django.db.models.fields.EmailField', [], {'max_length': '75'}),
+            'Meta': {'ordering': "['Name']", 'object_name': 'Maintainer'},
+            'Name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.package': {
+            'Bugs': ('django.db.models.fields.CharField', [], {'max_length': '200', 'null': 'True'}),
+            'Description': ('django.db.models.fields.TextField', [], {'max_length': '500', 'null': 'True'}),
+            'Details': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'to': u"orm['cloud.Details']", 'null': 'True', 'blank': 'True'}),
+            'Essential': ('django.db.models.fields.CharField', [], {'max_length': '10', 'null': 'True'}),
+            'Homepage': ('django.db.models.fields.URLField', [], {'max_length': '200', 'null': 'True'}),
+            'Labels': ('django.db.models.fields.related.ManyToManyField', [], {'symmetrical': 'False', 'to': u"orm['cloud.Label']", 'null': 'True', 'blank': 'True'}),
+            'Maintainer': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['cloud.Maintainer']", 'null': 'True'}),
+            'Meta': {'ordering': "['Name']", 'object_name': 'Package'},
+            'MultiArch': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'Name': ('django.db.models.fields.CharField', [], {'max_length': '150'}),
+            'Priority': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'Section': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.relation': {
+            'Meta': {'object_name': 'Relation', 'index_together': "[['related_package', 'relation_type']]"},
+            'alt_id': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'hash': ('django.db.models.fields.CharField', [], {'max_length': '40', 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'order': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True', 'blank': 'True'}),
+            'related_package': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['cloud.Package']", 'null': 'True', 'blank': 'True'}),
+            'relation_type': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True', 'blank': 'True'}),
+            'version': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True', 'blank': 'True'}),
+            'version_key': ('django.db.models.fields.CharField', [], {'db_index': 'True', 'max_length': '200', 'null': 'True', 'blank': 'True'})
+        },
+        u'cloud.reverserelation': {
+            'Meta': {'object_name': 'ReverseRelation', 'index_together': "[['package', 'relation_type']]"},
+            'architecture': ('django.db.models.fields.CharField', [], {'max_length': '75', 'null': 'True'}),
+            'details': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'+'", 'to': u"orm['cloud.Details']"}),
+            'distribution': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'package': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'reverse_relations'", 'to': u"orm['cloud.Package']"}),
+            'relation_type': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'source': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'+'", 'to': u"orm['cloud.Package']"})
+        },
+        u'cloud.tag': {
+            'Meta': {'object_name': 'Tag'},
+            'Value': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'})
+        },
+        u'cloud.versionmatrix': {
+            'Meta': {'unique_together': "[['package', 'architecture']]", 'object_name': 'VersionMatrix'},
+            'aponwao': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'architecture': ('django.db.models.fields.CharField', [], {'max_length': '75'}),
+            'auyantepui': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'kerepakupai': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'kukenan': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'}),
+            'package': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'versions'", 'to': u"orm['cloud.Package']"}),
+            'roraima': ('django.db.models.fields.CharField', [], {'max_length': '50', 'null': 'True'})
+        }
+    }
+
+    complete_apps = ['cloud']
+    symmetrical = True
@@ -32,11 +32,19 @@
 # import os
 # import logging
 # from tribus import BASEDIR
-from django.db import models
+import json
+import hashlib
+from collections import OrderedDict
+from django.db import models, connection, transaction, IntegrityError
+from django.core.cache import cache
 from email.Utils import parseaddr
 from django.db.models import Q
 from tribus.common.logger import get_logger
-from tribus.config.pkgrecorder import PACKAGE_FIELDS, DETAIL_FIELDS
+from tribus.common.identity import get_or_create
+from tribus.common.version import version_key, check_relation
+from tribus.config.pkgrecorder import (PACKAGE_FIELDS, DETAIL_FIELDS,
+                                       BULK_QUERY_SIZE, codenames)
+from tribus.web.indexing import updated
 
 logger = get_logger()
 # hdlr = logging.FileHandler(os.path.join(BASEDIR, 'tribus_recorder.log'))
@@ -46,9 +54,113 @@ logger = get_logger()
 # logger.setLevel(logging.INFO)
 
 
+def _chunks(items, size=BULK_QUERY_SIZE):
+    items = list(items)
+    for i in xrange(0, len(items), size):
+        yield items[i:i + size]
+
+
+def relation_atoms(relations_list):
+    """
+
+    Flattens a list of package relations into one tuple per related
+    package, numbering the groups of alternatives as `Details.add_relations`
+    does: each group gets an `alt_id` starting from 1 for every relation
+    type, and relations without alternatives get 0.
+
+    :param relations_list: a list of ``(relation_type, relations)`` tuples,
+                           as returned by ``paragraph.relations.items()``.
+    :return: a list of ``(relation_type, name, order, version, alt_id)``
+             tuples.
+
+    .. versionadded:: 0.2
+
+    """
+    atoms = []
+    for relation_type, relations in relations_list:
+        alt_id = 1
+        for relation in relations or []:
+            if len(relation) > 1:
+                for element in relation:
+                    atoms.append(relation_atom(relation_type, element, alt_id))
+                alt_id += 1
+            else:
+                atoms.append(relation_atom(relation_type, relation[0], 0))
+    return atoms
+
+
+def relation_atom(relation_type, fields, alt_id=0):
+    """
+
+    :param relation_type: a string indicating the relationship type.
+    :param fields: a dictionary with the relation information, as in
+                   `Details.add_relation`.
+    :param alt_id: the index of the group of alternatives, or 0.
+    :return: a ``(relation_type, name, order, version, alt_id)`` tuple.
+
+    .. versionadded:: 0.2
+
+    """
+    order, version = fields.get('version', None) or (None, None)
+    return (relation_type, fields['name'], order, version, alt_id)
+
+
+PROFILE_CACHE_PARTS = ('distributions', 'reverse')
+
+
+def profile_cache_key(package_id, part='distributions'):
+    """
+
+    :param package_id: the primary key of a package.
+    :param part: the part of the profile, one of `PROFILE_CACHE_PARTS`.
+    :return: the cache key of that part of its profile.
+
+    .. versionadded:: 0.2
+
+    """
+    return 'cloud:profile:%s:%s' % (part, package_id)
+
+
+def invalidate_profiles(package_ids):
+    """
+
+    Removes the cached profile data of a set of packages. It must be called
+    whenever the details of a package are recorded, updated or deleted.
+
+    :param package_ids: an iterable of package primary keys.
+
+    .. versionadded:: 0.2
+
+    """
+    keys = [profile_cache_key(pk, part) for pk in set(package_ids)
+            for part in PROFILE_CACHE_PARTS]
+    if keys:
+        cache.delete_many(keys)
+
+
+# Filtros de rango equivalentes a cada operador de version.
+VERSION_LOOKUPS = {'<<': 'lt', '<=': 'lte', '<': 'lte', '=': 'exact',
+                   '>=': 'gte', '>': 'gte', '>>': 'gt'}
+
+
+def relation_hash(key):
+    """
+
+    Computes the content hash that identifies a relation.
+
+    :param key: a ``(related_package_id, relation_type, order, version,
+                alt_id)`` tuple.
+    :return: the SHA1 hex digest of the key.
+
+    .. versionadded:: 0.2
+
+    """
+    return hashlib.sha1(json.dumps(list(key))).hexdigest()
+
+
 class MaintainerManager(models.Manager):
 
-    def create_auto(self, maintainer_data):
+    def create_auto(self, maintainer_data, session=None):
         """
 
         Query the database for an existent maintainer.
@@ -56,6 +168,7 @@ class MaintainerManager(models.Manager):
 
         :param maintainer_data: a string which contains maintainer's name and
                                 email.
+        :param session: an optional `RecordingSession` object.
         :return: a `Maintainer` object.
         :rtype: ``Maintainer``
 
@@ -64,9 +177,8 @@ class MaintainerManager(models.Manager):
         """
 
         maintainer_name, maintainer_mail = parseaddr(maintainer_data)
-        maintainer, _ = self.get_or_create(Name=maintainer_name,
-                                           Email=maintainer_mail)
-        return maintainer
+        return get_or_create(Maintainer, session, Name=maintainer_name,
+                             Email=maintainer_mail)
 
 
 class Maintainer(models.Model):
@@ -91,7 +203,7 @@ class Maintainer(models.Model):
 
 class PackageManager(models.Manager):
 
-    def create_auto(self, paragraph, branch, comp):
+    def create_auto(self, paragraph, branch, comp, session=None):
         """
 
         Queries the database for an existent package.
@@ -103,33 +215,68 @@ class PackageManager(models.Manager):
         :param paragraph: contains information about a binary package.
         :param branch: codename of the Canaima's version that will be updated.
         :param comp: component to which the paragraph belongs.
+        :param session: an optional `RecordingSession` object.
         :return: a `Package` object.
         :rtype: ``Package``
 
         .. versionadded:: 0.1
 
         """
-        package, _ = self.get_or_create(Name=paragraph['Package'])
+        package = get_or_create(Package, session, Name=paragraph['Package'])
 
         if package.Maintainer:
             if not package.Details.filter(
                 Distribution=branch, Component=comp).filter(
                     Q(Architecture=paragraph['Architecture']) |
                     Q(Architecture='all')):
-                package.add_details(paragraph, branch, comp)
+                package.add_details(paragraph, branch, comp, session)
 
         else:
             for field, db_field in PACKAGE_FIELDS.items():
                 setattr(package, db_field, paragraph.get(field))
 
             package.Maintainer = Maintainer.objects.create_auto(
-                paragraph['Maintainer'])
+                paragraph['Maintainer'], session)
             package.save()
-            package.add_labels(paragraph)
-            package.add_details(paragraph, branch, comp)
+            package.add_labels(paragraph, session)
+            package.add_details(paragraph, branch, comp, session)
 
         return package
 
+    def ids_for_names(self, names, session=None):
+        """
+
+        Resolves the primary keys of a set of packages by name, creating the
+        missing ones with only their name (as `Details.add_relation` does
+        for related packages).
+
+        :param names: an iterable of package names.
+        :param session: an optional `RecordingSession` object. If given,
+                        packages are looked up through its identity map.
+        :return: a dictionary mapping names to primary keys.
+
+        .. versionadded:: 0.2
+
+        """
+        names = set(names)
+        if session:
+            return dict((name, session.get_or_create(Package, Name=name).pk)
+                        for name in names)
+        ids = {}
+
+        def lookup(pending):
+            for chunk in _chunks(pending):
+                for name, pk in self.filter(Name__in=chunk
+                                            ).values_list('Name', 'id'):
+                    ids.setdefault(name, pk)
+
+        lookup(names)
+        missing = names - set(ids)
+        if missing:
+            self.bulk_create([Package(Name=name) for name in missing])
+            lookup(missing)
+        return ids
+
 
 class Package(models.Model):
     """
@@ -150,7 +297,7 @@ class Package(models.Model):
     objects = PackageManager()
 
     Name = models.CharField(
-        'nombre del paquete', max_length=150)
+        'nombre del paquete', max_length=150, unique=True)
     Maintainer = models.ForeignKey(
         Maintainer, verbose_name='nombre del mantenedor', null=True)
     Section = models.CharField(
@@ -178,7 +325,7 @@ class Package(models.Model):
     def __unicode__(self):
         return self.Name
 
-    def update(self, paragraph, branch, comp):
+    def update(self, paragraph, branch, comp, session=None):
         """
 
         Update the basic data of a package in the database.
@@ -186,6 +333,7 @@ class Package(models.Model):
         :param paragraph: contains information about a binary package.
         :param branch: codename of the Canaima's version that will be updated.
         :param comp: component to which the paragraph belongs.
+        :param session: an optional `RecordingSession` object.
         :return: a `Package` object.
         :rtype: ``Package``
 
@@ -196,8 +344,8 @@ class Package(models.Model):
             setattr(self, db_field, paragraph.get(field))
 
         if not self.Maintainer:
-            self.Maintainer = Maintainer.objects.create_maintainer(
-                paragraph['Maintainer'])
+            self.Maintainer = Maintainer.objects.create_auto(
+                paragraph['Maintainer'], session)
 
         self.save()
 
@@ -206,22 +354,25 @@ class Package(models.Model):
             exists = Package.objects.filter(Labels=label)
 
             if not exists:
+                if session:
+                    session.forget(Label, Name=label.Name, Tags=label.Tags_id)
                 label.delete()
 
-        self.add_labels(paragraph)
+        self.add_labels(paragraph, session)
         # Que pasa si no se encuentra el detalle?
         details = Details.objects.get(
             package=self, Architecture=paragraph.get('Architecture'),
             Distribution=branch, Component=comp)
-        details.update(paragraph)
+        details.update(paragraph, session)
 
-    def add_labels(self, paragraph):
+    def add_labels(self, paragraph, session=None):
         """
 
         Processes the contents of the 'Tag' field in the provided paragraph,
         records the labels into the database and relates them to a package.
 
         :param paragraph: contains information about a binary package.
+        :param session: an optional `RecordingSession` object.
 
         .. versionadded:: 0.2
 
@@ -230,12 +381,12 @@ class Package(models.Model):
             tag_list = paragraph['Tag'].replace('\n', '').split(', ')
             for tag in tag_list:
                 tag_name, tag_value = tag.split('::')
-                value, _ = Tag.objects.get_or_create(Value=tag_value)
-                label, _ = Label.objects.get_or_create(
-                    Name=tag_name, Tags=value)
+                value = get_or_create(Tag, session, Value=tag_value)
+                label = get_or_create(Label, session, Name=tag_name,
+                                      Tags=value)
                 self.Labels.add(label)
 
-    def add_details(self, paragraph, branch, comp):
+    def add_details(self, paragraph, branch, comp, session=None):
         """
         Creates a new Details objects and relates it to the package.
         
@@ -245,6 +396,8 @@ class Package(models.Model):
         
         :param comp: component to which the paragraph belongs.
         
+        :param session: an optional `RecordingSession` object.
+        
         .. versionadded:: 0.2
         """
         
@@ -252,8 +405,12 @@ class Package(models.Model):
         for field, db_field in DETAIL_FIELDS.items():
             setattr(details, db_field, paragraph.get(field))
         details.save()
-        details.add_relations(paragraph.relations.items())
+        details.add_relations(paragraph.relations.items(), session)
         self.Details.add(details)
+        ReverseRelation.objects.index_details([details.pk])
+        VersionMatrix.objects.refresh([self.pk])
+        invalidate_profiles([self.pk])
+        updated(Package, [self.pk])
         logger.info('Adding new details to \'%s\' package in %s:%s ' %
                     (paragraph['package'], branch, paragraph['architecture']))
         return details
@@ -309,8 +466,106 @@ class Label(models.Model):
     
     class Meta:
         ordering = ["Name"]
+        index_together = [['Name', 'Tags']]
     
     
+class RelationManager(models.Manager):
+
+    def bulk_get_or_create(self, keys):
+        """
+
+        Resolves the primary keys of a set of relations by their content
+        hash, inserting the missing ones with a single ``bulk_create``. If
+        another process inserts some of them at the same time, the missing
+        ones are created one by one instead.
+
+        :param keys: an iterable of ``(related_package_id, relation_type,
+                     order, version, alt_id)`` tuples.
+        :return: a dictionary mapping keys to primary keys.
+
+        .. versionadded:: 0.2
+
+        """
+        hashes = dict((relation_hash(key), key) for key in set(keys))
+        ids = {}
+
+        def lookup(pending):
+            for chunk in _chunks(pending):
+                ids.update(self.filter(hash__in=chunk
+                                       ).values_list('hash', 'id'))
+
+        def make(digest):
+            package_id, relation_type, order, version, alt_id = hashes[digest]
+            return Relation(hash=digest, related_package_id=package_id,
+                            relation_type=relation_type, order=order,
+                            version=version, alt_id=alt_id,
+                            version_key=version_key(version))
+
+        lookup(hashes)
+        missing = [digest for digest in hashes if digest not in ids]
+        if missing:
+            try:
+                with transaction.atomic():
+                    self.bulk_create([make(digest) for digest in missing])
+            except IntegrityError:
+                for digest in missing:
+                    relation = make(digest)
+                    self.get_or_create(hash=digest, defaults=dict(
+                        (f, getattr(relation, f)) for f in (
+                            'related_package_id', 'relation_type', 'order',
+                            'version', 'alt_id')))
+            lookup(missing)
+        return dict((hashes[digest], pk) for digest, pk in ids.items())
+
+    def satisfied_by(self, package, version):
+        """
+
+        Queries the relations to a package that are satisfied by one of its
+        versions, comparing the version keys in the database.
+
+        :param package: a `Package` object or primary key.
+        :param version: a version of `package`.
+        :return: a queryset of `Relation` objects.
+
+        .. versionadded:: 0.2
+
+        """
+        key = version_key(version)
+        constraints = Q(order__isnull=True) | Q(version_key__isnull=True)
+        for order, lookup in VERSION_LOOKUPS.items():
+            # The constraint "order version_key" holds for `key` when
+            # `version_key` is on the other side of `key`.
+            inverse = {'lt': 'gt', 'lte': 'gte', 'exact': 'exact',
+                       'gte': 'lte', 'gt': 'lt'}[lookup]
+            constraints |= Q(order=order,
+                             **{'version_key__%s' % inverse: key})
+        return self.filter(constraints, related_package=package)
+
+    def delete_orphans(self, ids=None):
+        """
+
+        Deletes the relations that are not linked to any `Details` object.
+
+        :param ids: if given, only these relations are considered.
+                    Otherwise every orphan relation is deleted with a single
+                    ``DELETE`` statement.
+
+        .. versionadded:: 0.2
+
+        """
+        if ids is not None:
+            for chunk in _chunks(ids):
+                self.filter(pk__in=chunk, details__isnull=True).delete()
+            return
+        qn = connection.ops.quote_name
+        through = Details.Relations.through._meta
+        connection.cursor().execute(
+            'DELETE FROM %s WHERE %s NOT IN (SELECT %s FROM %s)' % (
+                qn(self.model._meta.db_table), qn('id'),
+                qn(through.get_field('relation').column),
+                qn(through.db_table)))
+
+
 class Relation(models.Model):
     """
     Representa los distintos lazos que relacionan un paquete
@@ -338,11 +593,21 @@ class Relation(models.Model):
     
     Para conocer mas sobre el siginificado de estas relaciones consulte:
     https://www.debian.org/doc/debian-policy/ch-relationships.html.
+    
+    Cada relación se identifica por un hash de su contenido (ver
+    `relation_hash`), de modo que una misma relación se almacena una
+    sola vez y se comparte entre todos los detalles que la usan.
     """
     
+    objects = RelationManager()
+    
+    hash = models.CharField("hash del contenido de la relacion",
+        max_length=40, unique=True, null=True)
     related_package = models.ForeignKey(Package, null=True, blank=True)
     version = models.CharField("numero de la version del paquete 'hijo'", 
         max_length=50, null=True, blank=True)
+    version_key = models.CharField("clave de orden de la version",
+        max_length=200, null=True, blank=True, db_index=True)
     order = models.CharField("orden de la version del paquete 'hijo'",
         max_length=75, null=True, blank=True)
     relation_type = models.CharField("orden de la version del paquete 'hijo'",
@@ -358,8 +623,80 @@ class Relation(models.Model):
             return self.related_package.Name
     
     
+    class Meta:
+        index_together = [['related_package', 'relation_type']]
+    
+    
+    def key(self):
+        return (self.related_package_id, self.relation_type, self.order,
+                self.version, self.alt_id)
+    
+    
+    def save(self, *args, **kwargs):
+        self.hash = relation_hash(self.key())
+        self.version_key = version_key(self.version)
+        super(Relation, self).save(*args, **kwargs)
+    
+    
+    def version_lookup(self, field='VersionKey'):
+        """
+        Traduce la restricción de versión de la relación a un filtro de
+        rango sobre la clave de orden de una versión.
+        
+        :param field: nombre del campo con la clave de orden.
+        
+        :return: un diccionario con el filtro, vacio si la relación no
+                 restringe la versión.
+        
+        .. versionadded:: 0.2
+        """
+        
+        if not self.order or not self.version_key:
+            return {}
+        return {'%s__%s' % (field, VERSION_LOOKUPS[self.order]):
+                self.version_key}
+    
+    
+    def satisfied_by(self, version):
+        """
+        Indica si una versión del paquete relacionado cumple la restricción
+        de versión de la relación.
+        
+        :param version: una versión, por ejemplo ``2.63a-1``.
+        
+        .. versionadded:: 0.2
+        """
+        
+        return check_relation(version, self.order, self.version)
+    
+    
 class DetailsManager(models.Manager):
-    def create_auto(self, paragraph, package, branch, comp):
+    def satisfying(self, relation, distribution, architecture=None):
+        """
+        Queries the details that satisfy a relation in a distribution,
+        comparing the version keys in the database.
+    
+        :param relation: a `Relation` object.
+    
+        :param distribution: codename of the distribution.
+    
+        :param architecture: if given, only the details of this
+                             architecture and of ``all`` are returned.
+    
+        :return: a queryset of `Details` objects.
+    
+        .. versionadded:: 0.2
+        """
+        
+        details = self.filter(package=relation.related_package_id,
+                              Distribution=distribution,
+                              **relation.version_lookup())
+        if architecture:
+            details = details.filter(Architecture__in=[architecture, 'all'])
+        return details
+    
+    
+    def create_auto(self, paragraph, package, branch, comp, session=None):
         """
         Queries the database for the details of a given package.
         If there are no details then they are recorded.
@@ -372,6 +709,8 @@ class DetailsManager(models.Manager):
         
         :param comp: component to which the paragraph belongs.
     
+        :param session: an optional `RecordingSession` object.
+    
         :return: a `Details` object.
     
         :rtype: ``Details``
@@ -389,8 +728,12 @@ class DetailsManager(models.Manager):
             for field, db_field in DETAIL_FIELDS.items():
                 setattr(details, db_field, paragraph.get(field))
             details.save()
-            details.add_relations(paragraph.relations.items())
+            details.add_relations(paragraph.relations.items(), session)
             package.Details.add(details)
+            ReverseRelation.objects.index_details([details.pk])
+            VersionMatrix.objects.refresh([package.pk])
+            invalidate_profiles([package.pk])
+            updated(Package, [package.pk])
             return details
 
 
@@ -405,6 +748,8 @@ class Details(models.Model):
     """
     
     Version = models.CharField("version del paquete", max_length=50, null=True)
+    VersionKey = models.CharField("clave de orden de la version",
+        max_length=200, null=True, db_index=True)
     Architecture = models.CharField("arquitectura", max_length=75, null=True)
     Component = models.CharField("componente", max_length=75, null=True)
     Distribution = models.CharField("distribucion", max_length=75)
@@ -422,17 +767,28 @@ class Details(models.Model):
     objects = DetailsManager()
     
     
+    class Meta:
+        index_together = [['Distribution', 'Component', 'Architecture']]
+    
+    
     def __unicode__(self):
         if self.Architecture:
             return "%s : %s" % (self.Architecture, self.Distribution)
+    
+    
+    def save(self, *args, **kwargs):
+        self.VersionKey = version_key(self.Version)
+        super(Details, self).save(*args, **kwargs)
         
         
-    def update(self, paragraph):
+    def update(self, paragraph, session=None):
         """
         Updates the details of a Package in the database.
     
         :param paragraph: contains information about a binary package.
     
+        :param session: an optional `RecordingSession` object.
+    
         :return: a `Details` object.
     
         :rtype: ``Details``
@@ -444,15 +800,18 @@ class Details(models.Model):
             setattr(self, db_field, paragraph.get(field))
         self.save()
         
-        for relation in self.Relations.all():
-            self.Relations.remove(relation)
-            exists = Details.objects.filter(Relations=relation)
-            if not exists:
-                relation.delete()
-        self.add_relations(paragraph.relations.items())
+        links = Details.Relations.through.objects.filter(details=self)
+        old_ids = list(links.values_list('relation', flat=True))
+        links.delete()
+        self.add_relations(paragraph.relations.items(), session)
+        ReverseRelation.objects.index_details([self.pk])
+        Relation.objects.delete_orphans(old_ids)
+        package_ids = list(self.package_set.values_list('id', flat=True))
+        VersionMatrix.objects.refresh(package_ids)
+        invalidate_profiles(package_ids)
         
     
-    def add_relation(self, relation_type, fields, alt_id=0):
+    def add_relation(self, relation_type, fields, alt_id=0, session=None):
         """
         Records a new relation in the database and then associates it to a `Details` object.
     
@@ -481,24 +840,44 @@ class Details(models.Model):
                         in the above table, the relations with id 2, 3 and 4 are alternatives between
                         themselves because they have the same value in the field `alt_id`.
     
+        :param session: an optional `RecordingSession` object.
+    
         .. versionadded:: 0.1
         """
         
-        version = fields.get('version', None) 
-        if version:
-            order_version, number_version = version
-        else:
-            order_version, number_version = (None, None)
-        related_package, _ = Package.objects.get_or_create(Name=fields['name'])
-        new_relation, _ = Relation.objects.get_or_create(**{"related_package": related_package,
-                                                            "relation_type": relation_type,
-                                                            "order": order_version,
-                                                            "version": number_version,
-                                                            "alt_id": alt_id})
-        self.Relations.add(new_relation)
+        self.add_relation_atoms([relation_atom(relation_type, fields, alt_id)],
+                                session)
+    
+    
+    def add_relation_atoms(self, atoms, session=None):
+        """
+        Records a set of relations with one bulk insert and links them to a
+        `Details` object with another one.
+    
+        :param atoms: a list of ``(relation_type, name, order, version,
+                      alt_id)`` tuples, as returned by `relation_atoms`.
+    
+        :param session: an optional `RecordingSession` object.
+    
+        .. versionadded:: 0.2
+        """
+        
+        if not atoms:
+            return
+        package_ids = Package.objects.ids_for_names(
+            [atom[1] for atom in atoms], session)
+        relation_ids = Relation.objects.bulk_get_or_create(
+            (package_ids[name], relation_type, order, version, alt_id)
+            for relation_type, name, order, version, alt_id in atoms)
+        through = Details.Relations.through
+        linked = set(through.objects.filter(details=self).values_list(
+            'relation', flat=True))
+        through.objects.bulk_create(
+            [through(details_id=self.pk, relation_id=pk)
+             for pk in set(relation_ids.values()) - linked])
     
     
-    def add_relations(self, relations_list):
+    def add_relations(self, relations_list, session=None):
         """
         Records a set of relations associated to a `Details` object.
     
@@ -509,17 +888,385 @@ class Details(models.Model):
                               {'arch': None, 'name': u'libgl1', 'version': None}]],
                               [{'arch': None, 'name': u'0ad-data', 'version': (u'>=', u'0~r11863')}]), ('suggests', [])]
     
+        :param session: an optional `RecordingSession` object.
+    
         .. versionadded:: 0.1
         """
         
-        for relation_type, relations in relations_list:
-            alt_id = 1
-            if relations:
-                for relation in relations:
-                    if len(relation) > 1:
-                        for relation_element in relation:
-                            self.add_relation(relation_type,
-                                                     relation_element, alt_id)
-                        alt_id += 1
-                    else:
-                        self.add_relation(relation_type, relation[0])
+        self.add_relation_atoms(relation_atoms(relations_list), session)
+
+
+class ReverseRelationManager(models.Manager):
+
+    def index_details(self, details_ids):
+        """
+
+        Rebuilds the reverse relations of a set of `Details` objects from
+        their current relations, and invalidates the cached profiles of
+        the packages they pointed to before and after.
+
+        It must be called after the relations of the details are recorded
+        or updated, once the details are linked to their package.
+
+        :param details_ids: an iterable of `Details` primary keys.
+
+        .. versionadded:: 0.2
+
+        """
+        through = Details.Relations.through
+        for chunk in _chunks(details_ids):
+            targets = set(self.unindex_details(chunk, invalidate=False))
+            rows = through.objects.filter(
+                details__in=chunk, details__package__isnull=False,
+                relation__related_package__isnull=False).values_list(
+                    'details', 'details__package',
+                    'relation__related_package', 'relation__relation_type',
+                    'details__Distribution', 'details__Architecture'
+                ).distinct()
+            reverse = [ReverseRelation(
+                details_id=details_id, source_id=source_id,
+                package_id=package_id, relation_type=relation_type,
+                distribution=distribution, architecture=architecture)
+                for details_id, source_id, package_id, relation_type,
+                distribution, architecture in rows]
+            self.bulk_create(reverse)
+            targets.update(r.package_id for r in reverse)
+            invalidate_profiles(targets)
+
+    def unindex_details(self, details_ids, invalidate=True):
+        """
+
+        Deletes the reverse relations of a set of `Details` objects. It
+        must be called before the details are deleted.
+
+        :param details_ids: an iterable of `Details` primary keys.
+        :param invalidate: if True, the cached profiles of the packages
+                           they pointed to are invalidated.
+        :return: the primary keys of the packages they pointed to.
+
+        .. versionadded:: 0.2
+
+        """
+        targets = set()
+        for chunk in _chunks(details_ids):
+            rows = self.filter(details__in=chunk)
+            targets.update(rows.values_list('package', flat=True))
+            rows.delete()
+        if invalidate:
+            invalidate_profiles(targets)
+        return targets
+
+    def rebuild(self):
+        """
+
+        Rebuilds the whole index from the recorded relations.
+
+        .. versionadded:: 0.2
+
+        """
+        self.all().delete()
+        self.index_details(Details.objects.filter(
+            package__isnull=False).values_list('id', flat=True))
+
+    def of_package(self, package, relation_type=None):
+        """
+
+        :param package: a `Package` object or primary key.
+        :param relation_type: if given, only relations of this type are
+                              returned.
+        :return: a queryset of the reverse relations of `package`, with
+                 the source packages already joined.
+
+        .. versionadded:: 0.2
+
+        """
+        rows = self.filter(package=package)
+        if relation_type:
+            rows = rows.filter(relation_type=relation_type)
+        return rows.select_related('source').order_by(
+            'relation_type', 'source__Name', 'distribution', 'architecture')
+
+
+class ReverseRelation(models.Model):
+    """
+    Indice desnormalizado de las relaciones vistas desde el paquete
+    apuntado: hay una fila por cada detalle cuyo paquete ('source') tiene
+    una relación de un tipo dado con otro paquete ('package').
+
+    Permite saber que paquetes dependen de, recomiendan, entran en
+    conflicto con o proveen un paquete con una sola consulta por indice,
+    sin recorrer `Relation` a traves de `Details`. El recorder lo mantiene
+    al agregar, actualizar y eliminar detalles (ver
+    `ReverseRelationManager.index_details`).
+    """
+    
+    objects = ReverseRelationManager()
+    
+    package = models.ForeignKey(Package, related_name='reverse_relations')
+    source = models.ForeignKey(Package, related_name='+')
+    details = models.ForeignKey(Details, related_name='+')
+    relation_type = models.CharField("tipo de relacion", max_length=75)
+    distribution = models.CharField("distribucion", max_length=75)
+    architecture = models.CharField("arquitectura", max_length=75, null=True)
+    
+    
+    class Meta:
+        index_together = [['package', 'relation_type']]
+    
+    
+    def __unicode__(self):
+        return "%s %s %s" % (self.source_id, self.relation_type,
+                             self.package_id)
+
+
+class Installability(models.Model):
+    """
+    Resultado de la verificacion de instalabilidad de un detalle en una
+    arquitectura: indica si todas sus dependencias ('depends' y
+    'pre-depends') se pueden satisfacer con los paquetes de su
+    distribución, y si no, cual es la primera que no se puede satisfacer.
+
+    Los detalles de arquitectura 'all' tienen un resultado por cada
+    arquitectura de la distribución. Ver `tribus.web.cloud.installability`.
+    """
+    
+    details = models.ForeignKey(Details, related_name='installability')
+    architecture = models.CharField("arquitectura", max_length=75)
+    installable = models.BooleanField("es instalable?", default=True)
+    missing = models.CharField("dependencia que no se puede satisfacer",
+        max_length=255, null=True, blank=True)
+    
+    
+    class Meta:
+        unique_together = [['details', 'architecture']]
+    
+    
+    def __unicode__(self):
+        return "%s : %s" % (self.details_id, self.architecture)
+
+
+def ordered_codenames():
+    """
+
+    :return: the codenames of ``tribus.config.pkgrecorder.codenames``,
+             from the oldest to the newest release.
+
+    .. versionadded:: 0.2
+
+    """
+    return sorted(codenames, key=lambda codename: [
+        int(n) for n in codenames[codename].split('.')])
+
+
+def version_change(old_key, new_key):
+    """
+
+    :param old_key: the version key of a package in a distribution, or
+                    None if it is not there.
+    :param new_key: the version key of the package in a newer one.
+    :return: ``added``, ``removed``, ``upgraded`` or ``downgraded``, or
+             None if the version did not change.
+
+    .. versionadded:: 0.2
+
+    """
+    if old_key == new_key:
+        return None
+    if old_key is None:
+        return 'added'
+    if new_key is None:
+        return 'removed'
+    return 'upgraded' if new_key > old_key else 'downgraded'
+
+
+class VersionMatrixManager(models.Manager):
+
+    def refresh(self, package_ids):
+        """
+
+        Rebuilds the rows of the version matrix and the distribution
+        changes of a set of packages from their current details. It must
+        be called after the details of the packages are recorded, updated
+        or deleted.
+
+        :param package_ids: an iterable of `Package` primary keys.
+
+        .. versionadded:: 0.2
+
+        """
+        ordered = ordered_codenames()
+        for chunk in _chunks(set(package_ids)):
+            versions = {}
+            for package_id, architecture, distribution, version, key in \
+                    Details.objects.filter(
+                        package__in=chunk,
+                        Distribution__in=ordered).values_list(
+                            'package', 'Architecture', 'Distribution',
+                            'Version', 'VersionKey'):
+                versions.setdefault((package_id, architecture), {})[
+                    distribution] = (version, key)
+
+            self.filter(package__in=chunk).delete()
+            DistributionChange.objects.filter(package__in=chunk).delete()
+            self.bulk_create(
+                [VersionMatrix(package_id=package_id, architecture=arch,
+                               **dict((codename, version)
+                                      for codename, (version, _)
+                                      in found.items()))
+                 for (package_id, arch), found in versions.items()])
+
+            changes = []
+            for (package_id, arch), found in versions.items():
+                for i, old in enumerate(ordered):
+                    old_version, old_key = found.get(old, (None, None))
+                    for new in ordered[i + 1:]:
+                        new_version, new_key = found.get(new, (None, None))
+                        change = version_change(old_key, new_key)
+                        if change:
+                            changes.append(DistributionChange(
+                                package_id=package_id, architecture=arch,
+                                old=old, new=new, change=change,
+                                old_version=old_version,
+                                new_version=new_version))
+            DistributionChange.objects.bulk_create(changes, batch_size=500)
+
+    def rebuild(self):
+        """
+
+        Rebuilds the whole version matrix.
+
+        .. versionadded:: 0.2
+
+        """
+        self.all().delete()
+        DistributionChange.objects.all().delete()
+        self.refresh(Package.objects.filter(
+            Details__isnull=False).values_list('id', flat=True))
+
+
+class VersionMatrix(models.Model):
+    """
+    Tabla materializada con la version de cada paquete en cada
+    distribución: una fila por paquete y arquitectura, y una columna por
+    cada codename de `tribus.config.pkgrecorder.codenames` (nulo si el
+    paquete no esta en esa distribución).
+
+    El recorder la actualiza para los paquetes que modifica (ver
+    `VersionMatrixManager.refresh`), junto con `DistributionChange`.
+    """
+    
+    objects = VersionMatrixManager()
+    
+    package = models.ForeignKey(Package, related_name='versions')
+    architecture = models.CharField("arquitectura", max_length=75)
+    aponwao = models.CharField("version en aponwao", max_length=50,
+        null=True)
+    roraima = models.CharField("version en roraima", max_length=50,
+        null=True)
+    auyantepui = models.CharField("version en auyantepui", max_length=50,
+        null=True)
+    kerepakupai = models.CharField("version en kerepakupai", max_length=50,
+        null=True)
+    kukenan = models.CharField("version en kukenan", max_length=50,
+        null=True)
+    
+    
+    class Meta:
+        unique_together = [['package', 'architecture']]
+    
+    
+    def __unicode__(self):
+        return "%s : %s" % (self.package_id, self.architecture)
+    
+    
+    def as_dict(self):
+        """
+        :return: un diccionario con la version del paquete en cada
+                 distribución, en orden de publicación.
+        """
+        return OrderedDict((codename, getattr(self, codename))
+                           for codename in ordered_codenames())
+
+
+# Cambio inverso, para consultar los cambios de la distribucion mas nueva
+# a la mas antigua.
+INVERSE_CHANGES = {'added': 'removed', 'removed': 'added',
+                   'upgraded': 'downgraded', 'downgraded': 'upgraded'}
+
+
+class DistributionChangeManager(models.Manager):
+
+    def between(self, old, new, architecture=None, change=None):
+        """
+
+        Queries the packages whose version differs between two
+        distributions, with a single indexed query.
+
+        :param old: the codename of a distribution.
+        :param new: the codename of another distribution. It may be older
+                    than `old`.
+        :param architecture: if given, only changes in this architecture.
+        :param change: if given, only changes of this type, as seen from
+                       `old` to `new`.
+        :return: a list of ``(package name, architecture, change, version in
+                 old, version in new)`` tuples, sorted by package name.
+        :raises ValueError: if a codename or the change is unknown.
+
+        .. versionadded:: 0.2
+
+        """
+        ordered = ordered_codenames()
+        if old not in ordered or new not in ordered:
+            raise ValueError('Unknown distribution: %s, %s' % (old, new))
+        if change and change not in INVERSE_CHANGES:
+            raise ValueError('Unknown change: %s' % change)
+        flip = ordered.index(old) > ordered.index(new)
+        rows = self.filter(old=new, new=old) if flip else self.filter(
+            old=old, new=new)
+        if change:
+            rows = rows.filter(
+                change=INVERSE_CHANGES[change] if flip else change)
+        if architecture:
+            rows = rows.filter(architecture=architecture)
+        result = []
+        for name, arch, kind, old_version, new_version in rows.values_list(
+                'package__Name', 'architecture', 'change', 'old_version',
+                'new_version').order_by('package__Name', 'architecture'):
+            if flip:
+                kind = INVERSE_CHANGES[kind]
+                old_version, new_version = new_version, old_version
+            result.append((name, arch, kind, old_version, new_version))
+        return result
+
+
+class DistributionChange(models.Model):
+    """
+    Cambio de version de un paquete entre dos distribuciones ('old' es
+    siempre la mas antigua). Hay una fila por cada par de distribuciones
+    en que la version del paquete es distinta, de modo que los cambios
+    entre dos distribuciones se obtienen con una consulta por indice.
+    """
+    
+    objects = DistributionChangeManager()
+    
+    CHANGES = (('added', 'added'), ('removed', 'removed'),
+               ('upgraded', 'upgraded'), ('downgraded', 'downgraded'))
+    
+    package = models.ForeignKey(Package, related_name='+')
+    architecture = models.CharField("arquitectura", max_length=75)
+    old = models.CharField("distribucion anterior", max_length=75)
+    new = models.CharField("distribucion posterior", max_length=75)
+    change = models.CharField("tipo de cambio", max_length=10,
+        choices=CHANGES)
+    old_version = models.CharField("version anterior", max_length=50,
+        null=True)
+    new_version = models.CharField("version posterior", max_length=50,
+        null=True)
+    
+    
+    class Meta:
+        index_together = [['old', 'new', 'change']]
+    
+    
+    def __unicode__(self):
+        return "%s : %s -> %s" % (self.package_id, self.old, self.new)
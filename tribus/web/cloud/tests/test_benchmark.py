@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+These are the tests for the tribus.web.cloud benchmark.
+
+"""
+
+import os
+from debian import deb822
+from django.db import connection
+from django.test.testcases import TestCase
+from tribus.web.cloud.models import Package
+from tribus.web.cloud.benchmark import run_benchmark, compare
+from tribus.__init__ import BASEDIR
+from tribus.common.utils import get_path
+
+SAMPLESDIR = get_path([BASEDIR, 'tribus', 'common', 'tests', 'samples'])
+test_dist = 'kukenan'
+
+
+class BenchmarkTests(TestCase):
+
+    def test_run_benchmark(self):
+        """
+        El objetivo de este test es verificar que las busquedas mas
+        frecuentes usan los indices de las tablas.
+        """
+
+        for paragraph in deb822.Packages.iter_paragraphs(
+                open(os.path.join(SAMPLESDIR, 'Oldamd'))):
+            Package.objects.create_auto(paragraph, test_dist, 'main')
+
+        results = run_benchmark(repeat=2)
+        self.assertEqual(sorted(results), [
+            'details_by_distribution', 'details_by_package_name',
+            'label_by_name_and_tag', 'package_by_name',
+            'relation_by_package_and_type'])
+        self.assertEqual([name for name, _, _, changed
+                          in compare(results, results) if changed], [])
+
+        if connection.vendor == 'sqlite':
+            for name in ('package_by_name', 'details_by_distribution',
+                         'relation_by_package_and_type',
+                         'label_by_name_and_tag'):
+                self.assertIn('INDEX', ' '.join(results[name]['plan']))
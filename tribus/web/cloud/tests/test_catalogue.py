@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+These are the tests for the tribus.web.cloud catalogue.
+
+"""
+
+import os
+import shutil
+import tempfile
+from django.core.paginator import Paginator, InvalidPage
+from django.test.testcases import TestCase
+from tribus.web.cloud.models import Package
+from tribus.web.cloud.catalogue import build_catalogue, get_catalogue
+
+
+class CatalogueTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'catalogue')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_build_catalogue(self):
+        """
+        El objetivo de este test es verificar que el catalogo contiene
+        todos los paquetes en orden alfabetico y que se recarga cuando el
+        recorder lo genera de nuevo.
+        """
+
+        for name in ('zsh', 'blender', 'libc6', 'bash'):
+            Package.objects.create(Name=name, Description=u'%s shell\n'
+                                   u' long description' % name)
+        Package.objects.create(Name=u'ñandú')
+
+        self.assertEqual(build_catalogue(self.path), 5)
+        catalogue = get_catalogue(self.path)
+        self.assertEqual(catalogue.names,
+                         ['bash', 'blender', 'libc6', 'zsh', u'ñandú'])
+        self.assertEqual(catalogue.entries[0].description, 'bash shell')
+        self.assertEqual(catalogue.entries[-1].description, '')
+        self.assertTrue(get_catalogue(self.path) is catalogue)
+
+        Package.objects.create(Name='apt')
+        build_catalogue(self.path)
+        self.assertEqual(get_catalogue(self.path).names[0], 'apt')
+
+    def test_catalogue_page(self):
+
+        for i in range(7):
+            Package.objects.create(Name='package%s' % i)
+        build_catalogue(self.path)
+        catalogue = get_catalogue(self.path)
+        paginator = Paginator(catalogue.entries, 3)
+
+        with self.assertNumQueries(0):
+            page = catalogue.page(paginator, 2)
+            self.assertEqual([e.name for e in page.object_list],
+                             ['package3', 'package4', 'package5'])
+            page = catalogue.page(paginator, after='package5')
+            self.assertEqual([e.name for e in page.object_list],
+                             ['package6'])
+            self.assertFalse(page.has_next())
+            self.assertRaises(InvalidPage, catalogue.page, paginator, 4)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+These are the tests for the tribus.web.cloud dependency graph.
+
+"""
+
+import os
+import shutil
+import tempfile
+from django.test.testcases import TestCase
+from tribus.web.cloud.models import Package, Details, Relation
+from tribus.web.cloud.graph import (DependencyGraph, valid_graph, graph_path,
+                                    get_graph)
+
+
+class DependencyGraphTests(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.packages = {}
+        for name in ('a', 'b', 'c', 'd', 'e', 'f'):
+            self.packages[name] = Package.objects.create(Name=name)
+        # a depends on b and on (c | x), b pre-depends on d,
+        # c depends on e, f only suggests a. x has no details.
+        self.details('a', ('depends', 'b', 0), ('depends', 'x', 1),
+                     ('depends', 'c', 1))
+        self.details('b', ('pre-depends', 'd', 0))
+        self.details('c', ('depends', 'e', 0))
+        self.details('d')
+        self.details('e', architecture='all')
+        self.details('f', ('suggests', 'a', 0))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def details(self, name, *relations, **kwargs):
+        details = Details.objects.create(
+            Distribution='kukenan', Component='main',
+            Architecture=kwargs.get('architecture', 'amd64'))
+        self.packages[name].Details.add(details)
+        for relation_type, target, alt_id in relations:
+            package, _ = Package.objects.get_or_create(Name=target)
+            details.Relations.add(Relation.objects.create(
+                related_package=package, relation_type=relation_type,
+                alt_id=alt_id))
+
+    def test_depends(self):
+        """
+        El objetivo de este test es verificar que la clausura de
+        dependencias sigue depends y pre-depends, incluye los paquetes de
+        arquitectura 'all' y elige la alternativa disponible.
+        """
+
+        graph = DependencyGraph.build('kukenan', 'amd64')
+        self.assertEqual(graph.depends('a'), ['b', 'c', 'd', 'e'])
+        self.assertEqual(graph.depends('a', alternatives=True),
+                         ['b', 'c', 'd', 'e', 'x'])
+        self.assertEqual(graph.depends('f'), [])
+        self.assertEqual(graph.depends('e'), [])
+        self.assertFalse('y' in graph)
+
+    def test_rdepends(self):
+
+        graph = DependencyGraph.build('kukenan', 'amd64')
+        self.assertEqual(graph.rdepends('d'), ['a', 'b'])
+        self.assertEqual(graph.rdepends('x'), ['a'])
+        self.assertEqual(graph.rdepends('e', transitive=False), ['c'])
+        self.assertEqual(graph.rdepends('a'), [])
+
+    def test_save_load(self):
+
+        path = os.path.join(self.tmp_dir, 'kukenan_amd64.graph')
+        graph = DependencyGraph.build('kukenan', 'amd64')
+        graph.save(path)
+        loaded = DependencyGraph.load(path)
+        self.assertEqual(loaded.names, graph.names)
+        with self.assertNumQueries(0):
+            self.assertEqual(loaded.depends('a'), graph.depends('a'))
+            self.assertEqual(loaded.rdepends('d'), graph.rdepends('d'))
+        self.assertEqual(DependencyGraph.load(path + '.missing'), None)
+
+    def test_graph_names(self):
+        """
+        El objetivo de este test es verificar que solo se construyen rutas
+        de grafos para codenames conocidos y arquitecturas validas, de
+        modo que los parametros de la API no pueden cargar otros archivos.
+        """
+
+        self.assertTrue(valid_graph('kukenan', 'amd64'))
+        self.assertTrue(valid_graph('kukenan', 'kfreebsd-i386'))
+        for distribution, architecture in (('kukenan', '../../tmp/x'),
+                                           ('../../tmp/x', 'amd64'),
+                                           ('sid', 'amd64'),
+                                           ('kukenan', 'AMD64'),
+                                           ('kukenan', None), (None, None)):
+            self.assertFalse(valid_graph(distribution, architecture))
+            self.assertEqual(get_graph(distribution, architecture), None)
+            self.assertRaises(ValueError, graph_path, distribution,
+                              architecture)
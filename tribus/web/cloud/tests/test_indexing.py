@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+These are the tests for the batched updates of the search index.
+
+"""
+
+import os
+from debian import deb822
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test.testcases import TestCase
+from haystack.query import SearchQuerySet
+from tribus.__init__ import BASEDIR
+from tribus.common.utils import get_path
+from tribus.common.recorder import bulk_record_paragraphs
+from tribus.web.cloud.models import Package
+from tribus.web.indexing import (deferred_indexing, current_batch,
+                                 index_generation, bump_index_generation)
+from tribus.web import search
+from tribus.web.search import (facet_filters, narrow_packages, cached_search,
+                               search_cache_key, load_results)
+
+SAMPLESDIR = get_path([BASEDIR, 'tribus', 'common', 'tests', 'samples'])
+test_dist = 'kukenan'
+
+
+class DeferredIndexingTests(TestCase):
+
+    def test_deferred_indexing(self):
+        """
+        El objetivo de este test es verificar que dentro de un bloque
+        `deferred_indexing` los paquetes registrados con bulk_create se
+        acumulan en un solo lote, compartido por los bloques anidados, que
+        se escribe al final del bloque.
+        """
+
+        paragraph = deb822.Packages(open(os.path.join(SAMPLESDIR, 'Blender')))
+        with deferred_indexing() as batch:
+            with deferred_indexing() as inner:
+                self.assertTrue(inner is batch)
+            self.assertTrue(current_batch() is batch)
+
+            bulk_record_paragraphs([paragraph], test_dist, 'main')
+            blender = Package.objects.get(Name='blender')
+            self.assertTrue(blender.pk in batch.updates[Package])
+
+            names = ['ghost%s' % i for i in range(3)]
+            bulk_record_paragraphs(
+                [deb822.Packages('Package: %s\nMaintainer: a <a@b.c>\n'
+                                 'Architecture: all\nVersion: 1\n'
+                                 'Filename: %s.deb\nMD5sum: %s\n'
+                                 % ((name,) * 3))
+                 for name in names], test_dist, 'main')
+            self.assertEqual(
+                batch.updates[Package],
+                set(Package.objects.values_list('id', flat=True)))
+
+            batch.delete(Package, blender)
+            self.assertFalse(blender.pk in batch.updates[Package])
+            self.assertEqual(batch.deletes[Package],
+                             set(['cloud.package.%s' % blender.pk]))
+
+        self.assertEqual(current_batch(), None)
+        self.assertEqual(len(batch), 0)
+
+
+class PackageFacetsTests(TestCase):
+
+    def test_narrow_packages(self):
+        """
+        El objetivo de este test es verificar que los filtros por facetas
+        de una peticion se convierten en consultas de acotamiento que
+        resuelve el motor de busqueda.
+        """
+
+        params = QueryDict('q=blender&section=graphics&label=use::viewing'
+                           '&label=role::program&distribution=&foo=bar')
+        self.assertEqual(facet_filters(params),
+                         [('section', 'graphics'), ('label', 'use::viewing'),
+                          ('label', 'role::program')])
+        self.assertEqual(facet_filters({'architecture': 'i386'}),
+                         [('architecture', 'i386')])
+
+        sqs = narrow_packages(SearchQuerySet(), params)
+        self.assertEqual(len(sqs.query.narrow_queries), 3)
+        self.assertTrue(any(query.startswith('section_exact:')
+                            for query in sqs.query.narrow_queries))
+        self.assertEqual(
+            len([query for query in sqs.query.narrow_queries
+                 if query.startswith('labels_exact:')]), 2)
+
+
+class SearchCacheTests(TestCase):
+
+    def test_cached_search(self):
+        """
+        El objetivo de este test es verificar que las paginas de resultados
+        se guardan por consulta normalizada y se descartan cuando cambia la
+        generacion del indice de busqueda.
+        """
+
+        filters = [('section', 'graphics')]
+        key = search_cache_key(u'  Blender\t3d ', 'package', filters, 1)
+        self.assertEqual(key, search_cache_key(u'blender 3d', 'package',
+                                               filters, 1))
+        self.assertNotEqual(key, search_cache_key(u'blender 3d', 'package',
+                                                  filters, 2))
+        self.assertNotEqual(key, search_cache_key(u'blender 3d', 'user',
+                                                  filters, 1))
+
+        blender = Package.objects.create(Name='blender')
+        bash = Package.objects.create(Name='bash', Description='shell')
+        cache.set(key, {'model': 'package', 'count': 2,
+                        'ids': [bash.pk, blender.pk], 'facets': {},
+                        'generation': index_generation()})
+        entry = cached_search(u'blender 3d', 'package', filters, 1)
+        self.assertEqual(entry['ids'], [bash.pk, blender.pk])
+        self.assertEqual([(r.autoname, r.description)
+                          for r in load_results('package', entry['ids'])],
+                         [('bash', 'shell'), ('blender', None)])
+
+        generation = index_generation()
+        bump_index_generation()
+        self.assertEqual(index_generation(), generation + 1)
+        self.assertNotEqual(cache.get(key)['generation'], index_generation())
+
+        searched = []
+
+        def fake_search(query, model_name, filters, number):
+            searched.append(query)
+            return {'model': model_name, 'count': 0, 'ids': [], 'facets': {}}
+
+        run_search = search.run_search
+        search.run_search = fake_search
+        try:
+            cached_search(u'  Blender\t3D ', 'package', filters, 1)
+        finally:
+            search.run_search = run_search
+        self.assertEqual(searched, [u'blender 3d'])
+        self.assertEqual(cache.get(key)['generation'], index_generation())
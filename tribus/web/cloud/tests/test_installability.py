@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+These are the tests for the tribus.web.cloud installability checker.
+
+"""
+
+from django.test.testcases import TestCase
+from tribus.web.cloud.models import (Package, Details, Relation,
+                                     Installability)
+from tribus.web.cloud.installability import (InstallabilityChecker,
+                                             check_distribution)
+
+
+class InstallabilityTests(TestCase):
+
+    def setUp(self):
+        # a needs b (>= 2) and (c | v), where c does not exist and v is
+        # provided by p. d needs b (>= 3), which does not exist, and e
+        # needs d. f needs e or a. g and g2 depend on each other. h is
+        # architecture independent and needs k, only built for i386.
+        self.details('a', '1.0', 'amd64', ('depends', 'b', '>=', '2', 0),
+                     ('depends', 'c', None, None, 1),
+                     ('depends', 'v', None, None, 1))
+        self.details('b', '2.0', 'amd64')
+        self.details('p', '1.0', 'amd64', ('provides', 'v', None, None, 0))
+        self.details('d', '1.0', 'amd64',
+                     ('pre-depends', 'b', '>=', '3', 0))
+        self.details('e', '1.0', 'amd64', ('depends', 'd', None, None, 0))
+        self.details('f', '1.0', 'amd64', ('depends', 'e', None, None, 1),
+                     ('depends', 'a', None, None, 1))
+        self.details('g', '1.0', 'amd64', ('depends', 'g2', None, None, 0))
+        self.details('g2', '1.0', 'amd64', ('depends', 'g', None, None, 0))
+        self.details('h', '1.0', 'all', ('depends', 'k', None, None, 0))
+        self.details('k', '1.0', 'i386')
+
+    def details(self, name, version, architecture, *relations):
+        package, _ = Package.objects.get_or_create(Name=name)
+        details = Details.objects.create(
+            Distribution='kukenan', Component='main', Version=version,
+            Architecture=architecture)
+        package.Details.add(details)
+        for relation_type, target, order, required, alt_id in relations:
+            related, _ = Package.objects.get_or_create(Name=target)
+            details.Relations.add(Relation.objects.create(
+                related_package=related, relation_type=relation_type,
+                order=order, version=required, alt_id=alt_id))
+
+    def test_check(self):
+        """
+        El objetivo de este test es verificar que la propagacion marca como
+        no instalables los paquetes con dependencias insatisfechas, directa
+        o transitivamente, y respeta alternativas, versiones y provides.
+        """
+
+        checker = InstallabilityChecker('kukenan', 'amd64')
+        with self.assertNumQueries(2):
+            checker.load()
+        with self.assertNumQueries(0):
+            results = checker.check()
+        status = dict((Package.objects.get(Details=pk).Name,
+                       (installable, missing))
+                      for pk, _, installable, missing in results)
+
+        self.assertEqual(sorted(status), ['a', 'b', 'd', 'e', 'f', 'g', 'g2',
+                                          'h', 'p'])
+        for name in ('a', 'b', 'f', 'g', 'g2', 'p'):
+            self.assertEqual(status[name], (True, None))
+        self.assertEqual(status['d'], (False, 'b (>= 3)'))
+        self.assertEqual(status['e'], (False, 'd'))
+        self.assertEqual(status['h'], (False, 'k'))
+
+    def test_check_distribution(self):
+
+        self.assertEqual(check_distribution('kukenan'),
+                         {'amd64': (6, 9), 'i386': (2, 2)})
+        h = Details.objects.get(package__Name='h')
+        self.assertEqual(
+            sorted(h.installability.values_list('architecture',
+                                                'installable')),
+            [('amd64', False), ('i386', True)])
+
+        check_distribution('kukenan')
+        self.assertEqual(Installability.objects.count(), 11)
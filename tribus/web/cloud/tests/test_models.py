@@ -28,7 +28,9 @@ import os
 from debian import deb822
 from email.Utils import parseaddr
 from django.test.testcases import TestCase
-from tribus.web.cloud.models import (Maintainer, Package, Details, Relation)
+from tribus.web.cloud.models import (Maintainer, Package, Details, Relation,
+                                     ReverseRelation, VersionMatrix,
+                                     DistributionChange, relation_hash)
 from tribus.__init__ import BASEDIR
 from tribus.common.utils import get_path
 
@@ -166,6 +168,144 @@ class RegistrationModelTests(TestCase):
 
         self.assertEqual(len(reldata), details.Relations.all().count())
 
+    def test_details_shared_relations(self):
+        """
+        El objetivo de este test es verificar que una relacion se almacena
+        una sola vez aunque la usen varios detalles, y que las relaciones
+        huerfanas se eliminan.
+        """
+
+        paragraph = deb822.Packages(open(os.path.join(SAMPLESDIR, "Blender")))
+        i386 = Details.objects.create(Architecture='i386',
+                                      Distribution=test_dist)
+        amd64 = Details.objects.create(Architecture='amd64',
+                                       Distribution=test_dist)
+        i386.add_relations(paragraph.relations.items())
+        total_relations = Relation.objects.count()
+        amd64.add_relations(paragraph.relations.items())
+        amd64.add_relations(paragraph.relations.items())
+
+        self.assertEqual(Relation.objects.count(), total_relations)
+        self.assertEqual(amd64.Relations.count(), total_relations)
+        for relation in Relation.objects.all():
+            self.assertEqual(relation.hash, relation_hash(relation.key()))
+
+        i386.delete()
+        Relation.objects.delete_orphans()
+        self.assertEqual(Relation.objects.count(), total_relations)
+        amd64.delete()
+        Relation.objects.delete_orphans()
+        self.assertEqual(Relation.objects.count(), 0)
+
+    def test_reverse_relations(self):
+        """
+        El objetivo de este test es verificar que el indice de relaciones
+        inversas se mantiene al crear y actualizar los detalles de un
+        paquete.
+        """
+
+        paragraph = deb822.Packages(open(os.path.join(SAMPLESDIR, "Blender")))
+        blender = Package.objects.create_auto(paragraph, test_dist, 'main')
+        details = blender.Details.get()
+
+        reverse = ReverseRelation.objects.of_package(
+            Package.objects.get(Name='libc6'))
+        self.assertEqual([(r.source.Name, r.relation_type, r.distribution,
+                           r.architecture) for r in reverse],
+                         [('blender', 'depends', test_dist, 'i386')])
+        self.assertEqual(
+            ReverseRelation.objects.filter(source=blender).count(),
+            details.Relations.values('related_package', 'relation_type'
+                                     ).distinct().count())
+
+        blender.update(deb822.Packages(open(os.path.join(SAMPLESDIR,
+                                                         "BlenderNew"))),
+                       test_dist, 'main')
+        self.assertEqual(
+            set(ReverseRelation.objects.filter(source=blender).values_list(
+                'package', 'relation_type')),
+            set(details.Relations.values_list('related_package',
+                                              'relation_type')))
+
+    def test_relation_versions(self):
+        """
+        El objetivo de este test es verificar que las restricciones de
+        version de las relaciones se evaluan en la base de datos segun el
+        orden de dpkg.
+        """
+
+        package = Package.objects.create(Name='libavcodec53')
+        versions = ['5:0.8-2~bpo1', '5:0.8-2', '5:0.10-1', '0.8-3']
+        for version in versions:
+            details = Details.objects.create(Version=version,
+                                             Architecture='i386',
+                                             Distribution=test_dist)
+            package.Details.add(details)
+        relations = {}
+        for order in ('>=', '<<', '='):
+            relations[order] = Relation.objects.create(
+                related_package=package, relation_type='depends',
+                order=order, version='5:0.8-2', alt_id=0)
+
+        def satisfying(order):
+            return sorted(Details.objects.satisfying(
+                relations[order], test_dist, 'i386').values_list(
+                    'Version', flat=True))
+
+        self.assertEqual(satisfying('>='), ['5:0.10-1', '5:0.8-2'])
+        self.assertEqual(satisfying('<<'), ['0.8-3', '5:0.8-2~bpo1'])
+        self.assertEqual(satisfying('='), ['5:0.8-2'])
+        for order, relation in relations.items():
+            self.assertEqual(satisfying(order), sorted(
+                v for v in versions if relation.satisfied_by(v)))
+
+        self.assertEqual(
+            set(Relation.objects.satisfied_by(package, '5:0.10-1')),
+            set([relations['>=']]))
+        self.assertEqual(
+            set(Relation.objects.satisfied_by(package, '5:0.8-2')),
+            set([relations['>='], relations['=']]))
+
+    def test_version_matrix(self):
+        """
+        El objetivo de este test es verificar que la matriz de versiones y
+        los cambios entre distribuciones se actualizan con los detalles de
+        los paquetes.
+        """
+
+        paragraph = deb822.Packages(open(os.path.join(SAMPLESDIR, "Blender")))
+        blender = Package.objects.create_auto(paragraph, 'kerepakupai',
+                                              'main')
+        Package.objects.create_auto(paragraph, test_dist, 'main')
+
+        row = VersionMatrix.objects.get(package=blender)
+        self.assertEqual(row.architecture, 'i386')
+        self.assertEqual(row.as_dict().items()[-2:], [
+            ('kerepakupai', '2.63a-1'), ('kukenan', '2.63a-1')])
+        self.assertEqual(
+            DistributionChange.objects.between('kerepakupai', test_dist), [])
+        self.assertEqual(
+            DistributionChange.objects.between('auyantepui', test_dist),
+            [('blender', 'i386', 'added', None, '2.63a-1')])
+
+        blender.update(deb822.Packages(open(os.path.join(SAMPLESDIR,
+                                                         "BlenderNew"))),
+                       test_dist, 'main')
+        with self.assertNumQueries(1):
+            changes = DistributionChange.objects.between('kerepakupai',
+                                                         test_dist)
+        self.assertEqual(changes, [('blender', 'i386', 'upgraded', '2.63a-1',
+                                    '2.69-3')])
+        self.assertEqual(
+            DistributionChange.objects.between(test_dist, 'kerepakupai'),
+            [('blender', 'i386', 'downgraded', '2.69-3', '2.63a-1')])
+        self.assertEqual(DistributionChange.objects.between(
+            'kerepakupai', test_dist, change='added'), [])
+        self.assertRaises(ValueError, DistributionChange.objects.between,
+                          'kerepakupai', test_dist, change='renamed')
+        self.assertRaises(ValueError, DistributionChange.objects.between,
+                          'sid', test_dist)
+
     def test_details_add_relations(self):
         paragraph = deb822.Packages(open(os.path.join(SAMPLESDIR, "Blender")))
         details, _ = Details.objects.get_or_create(Version='2.63a-1',
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+These are the tests for the data steps of the tribus.web.cloud migrations.
+
+"""
+
+from django.test.testcases import TestCase
+from tribus.common.version import version_key
+from tribus.web.cloud.models import Package, Details, Relation, relation_hash
+from tribus.web.cloud.upgrade import (backfill_relation_hashes,
+                                      backfill_version_keys)
+
+
+class UpgradeTests(TestCase):
+
+    def setUp(self):
+        self.package = Package.objects.create(Name='libc6')
+        self.details = []
+        for version in ('1.0', '2.0', '3.0'):
+            details = Details.objects.create(
+                Distribution='kukenan', Component='main', Version=version,
+                Architecture='amd64')
+            self.details.append(details)
+
+    def legacy_relation(self, details, version):
+        # Las filas grabadas antes del hash no tienen hash ni clave de
+        # version; bulk_create no pasa por Relation.save.
+        Relation.objects.bulk_create([Relation(
+            related_package=self.package, relation_type='depends',
+            order='>=', version=version, alt_id=0)])
+        relation = Relation.objects.filter(hash__isnull=True).latest('id')
+        details.Relations.add(relation)
+        return relation
+
+    def test_merge_legacy_relations(self):
+        """
+        El objetivo de este test es verificar que la migracion calcula
+        el hash y la clave de version de las relaciones grabadas sin ellos
+        y une las copias en una sola relacion, incluida la que el
+        recolector ya grabo con hash.
+        """
+
+        first = self.legacy_relation(self.details[0], '2.17')
+        self.legacy_relation(self.details[1], '2.17')
+        current = Relation.objects.create(
+            related_package=self.package, relation_type='depends',
+            order='>=', version='2.19', alt_id=0)
+        self.details[0].Relations.add(current)
+        self.legacy_relation(self.details[2], '2.19')
+        self.details[2].Relations.add(current)
+
+        self.assertEqual(backfill_relation_hashes(Relation, Details), (2, 2))
+        self.assertEqual(backfill_version_keys(Details, Relation),
+                         {Details: 0, Relation: 1})
+        self.assertEqual(Relation.objects.count(), 2)
+        self.assertFalse(Relation.objects.filter(hash__isnull=True).exists())
+        self.assertFalse(Relation.objects.filter(
+            version_key__isnull=True).exists())
+
+        first = Relation.objects.get(pk=first.pk)
+        self.assertEqual(first.hash, relation_hash(first.key()))
+        self.assertEqual(first.version_key, version_key('2.17'))
+        self.assertEqual(
+            sorted(first.details_set.values_list('Version', flat=True)),
+            ['1.0', '2.0'])
+        self.assertEqual(
+            sorted(current.details_set.values_list('Version', flat=True)),
+            ['1.0', '3.0'])
+        self.assertEqual(self.details[2].Relations.get(), current)
+
+        self.assertEqual(backfill_relation_hashes(Relation, Details), (0, 0))
@@ -24,6 +24,81 @@ These are the tests for the tribus.web.cloud views.
 
 """
 
+import os
+from debian import deb822
+from django.core.cache import cache
+from django.test.testcases import TestCase
+from tribus.__init__ import BASEDIR
+from tribus.common.utils import get_path
+from tribus.web.cloud.models import Package, ReverseRelation
+from tribus.web.cloud.views import (package_distributions,
+                                    package_reverse_relations)
+
+SAMPLESDIR = get_path([BASEDIR, 'tribus', 'common', 'tests', 'samples'])
+test_dist = 'kukenan'
+
+
+class ProfileDistributionsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_package_distributions(self):
+        """
+        El objetivo de este test es verificar que los datos del perfil de
+        un paquete se obtienen con un numero fijo de consultas, se guardan
+        en el cache y se invalidan cuando cambian los detalles del paquete.
+        """
+
+        paragraph = deb822.Packages(open(os.path.join(SAMPLESDIR, 'Blender')))
+        package = Package.objects.create_auto(paragraph, test_dist, 'main')
+
+        with self.assertNumQueries(4):
+            distributions = package_distributions(package)
+        with self.assertNumQueries(0):
+            self.assertEqual(package_distributions(package), distributions)
+            arch = distributions[0]['Architectures']['i386']
+            self.assertEqual(arch['data'].Version, '2.63a-1')
+            names = [r.related_package.Name
+                     for r in arch['relations']['depends']]
+
+        self.assertEqual(distributions[0]['codename'], test_dist)
+        self.assertTrue('libc6' in names)
+        self.assertEqual(
+            len(names), len(package.Details.get().Relations.filter(
+                relation_type='depends')))
+
+        package.update(deb822.Packages(open(os.path.join(SAMPLESDIR,
+                                                         'BlenderNew'))),
+                       test_dist, 'main')
+        distributions = package_distributions(package)
+        self.assertEqual(
+            distributions[0]['Architectures']['i386']['data'].Version,
+            '2.69-3')
+
+    def test_package_reverse_relations(self):
+        """
+        El objetivo de este test es verificar que las relaciones inversas
+        del perfil se leen con una consulta y se invalidan cuando cambian
+        los detalles de los paquetes que apuntan al paquete consultado.
+        """
+
+        paragraph = deb822.Packages(open(os.path.join(SAMPLESDIR, 'Blender')))
+        blender = Package.objects.create_auto(paragraph, test_dist, 'main')
+        libc6 = Package.objects.get(Name='libc6')
+
+        with self.assertNumQueries(1):
+            reverse = package_reverse_relations(libc6)
+        with self.assertNumQueries(0):
+            self.assertEqual(package_reverse_relations(libc6), reverse)
+        self.assertEqual(reverse, [('depends', ['blender'])])
+
+        ReverseRelation.objects.unindex_details([blender.Details.get().pk])
+        self.assertEqual(package_reverse_relations(libc6), [])
+        ReverseRelation.objects.index_details([blender.Details.get().pk])
+        self.assertEqual(package_reverse_relations(libc6), reverse)
+
+
 # from django.test.testcases import TestCase
 # from django.core.urlresolvers import reverse
 # from tribus.web.cloud.models import Package, Details, Relation
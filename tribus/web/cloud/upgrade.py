@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+tribus.web.cloud.upgrade
+========================
+
+This module contains the data steps of the migrations of the cloud app
+(see ``tribus/web/cloud/migrations``). They bring the rows recorded by an
+earlier version of Tribus in line with the current schema: duplicate
+package names are merged before the name becomes unique, and relations get
+the hash and version keys introduced later.
+
+Every function takes the models it works on, so that the migrations can
+pass the models of their frozen ORM.
+
+"""
+
+from django.db.models import Count, Min
+from tribus.common.version import version_key
+from tribus.web.cloud.models import relation_hash
+
+
+def merge_links(through, field, other, keep, duplicates):
+    """
+
+    Moves the many to many links of `duplicates` to `keep`, dropping the
+    links `keep` already has.
+
+    :param through: the intermediate model of the relationship.
+    :param field: the name of the foreign key to the merged model.
+    :param other: the name of the foreign key to the other side.
+    :param keep: the primary key of the object that stays.
+    :param duplicates: the primary keys of the objects merged into `keep`.
+
+    .. versionadded:: 0.2
+
+    """
+    for pk in duplicates:
+        existing = list(through.objects.filter(
+            **{field: keep}).values_list(other, flat=True))
+        through.objects.filter(**{field: pk, '%s__in' % other:
+                                  existing}).delete()
+        through.objects.filter(**{field: pk}).update(**{field: keep})
+
+
+def merge_duplicate_packages(Package, Relation):
+    """
+
+    Merges the packages recorded more than once with the same name into the
+    oldest of them, so that the name can be made unique. Their details and
+    labels move to the kept package and the relations to them are pointed
+    at it, with their hash cleared so that `backfill_relation_hashes`
+    computes it again and merges the relations that became equal.
+
+    :param Package: the package model.
+    :param Relation: the relation model.
+    :return: the number of packages removed.
+
+    .. versionadded:: 0.2
+
+    """
+    merged = 0
+    for row in Package.objects.values('Name').annotate(
+            copies=Count('id'), keep=Min('id')).filter(copies__gt=1):
+        duplicates = list(Package.objects.filter(Name=row['Name']).exclude(
+            pk=row['keep']).values_list('id', flat=True))
+        merge_links(Package.Details.through, 'package', 'details',
+                    row['keep'], duplicates)
+        merge_links(Package.Labels.through, 'package', 'label',
+                    row['keep'], duplicates)
+        Relation.objects.filter(related_package__in=duplicates).update(
+            related_package=row['keep'], hash=None)
+        Package.objects.filter(pk__in=duplicates).delete()
+        merged += len(duplicates)
+    return merged
+
+
+def backfill_relation_hashes(Relation, Details):
+    """
+
+    Computes the hash of the relations recorded before it existed. The
+    recorder only looks relations up by hash, so it inserted a new copy of
+    every such relation it met again; the copies are merged into the
+    relation that already has the hash, or into the oldest of them.
+
+    :param Relation: the relation model.
+    :param Details: the details model.
+    :return: a ``(hashed, merged)`` tuple with the number of relations whose
+             hash was computed and the number of duplicates removed.
+
+    .. versionadded:: 0.2
+
+    """
+    hashed = dict(Relation.objects.filter(
+        hash__isnull=False).values_list('hash', 'id'))
+    groups = {}
+    for row in Relation.objects.filter(hash__isnull=True).values_list(
+            'id', 'related_package', 'relation_type', 'order', 'version',
+            'alt_id').iterator():
+        groups.setdefault(relation_hash(row[1:]), []).append(row[0])
+    through = Details.Relations.through
+    merged = 0
+    for digest, ids in groups.iteritems():
+        keep = hashed.get(digest, min(ids))
+        duplicates = [pk for pk in ids if pk != keep]
+        if duplicates:
+            merge_links(through, 'relation', 'details', keep, duplicates)
+            Relation.objects.filter(pk__in=duplicates).delete()
+            merged += len(duplicates)
+        if digest not in hashed:
+            Relation.objects.filter(pk=keep).update(hash=digest)
+    return len(groups), merged
+
+
+def backfill_version_keys(Details, Relation):
+    """
+
+    Computes the version keys of the details and relations recorded before
+    they existed.
+
+    :param Details: the details model.
+    :param Relation: the relation model.
+    :return: a dictionary with the number of keys computed for each model.
+
+    .. versionadded:: 0.2
+
+    """
+    computed = {}
+    for model, field, key_field in ((Details, 'Version', 'VersionKey'),
+                                    (Relation, 'version', 'version_key')):
+        rows = model.objects.filter(**{
+            '%s__isnull' % field: False,
+            '%s__isnull' % key_field: True}).values_list('id', field)
+        total = 0
+        for pk, version in rows.iterator():
+            model.objects.filter(pk=pk).update(
+                **{key_field: version_key(version)})
+            total += 1
+        computed[model] = total
+    return computed
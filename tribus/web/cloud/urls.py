@@ -12,6 +12,10 @@ urlpatterns = patterns('',
                            'tribus.web.cloud.views.profile',
                            name='cloud_profile'),
 
+                       url(r'^cloud/r/(?P<name>(\w*\W*)*)',
+                           'tribus.web.cloud.views.reverse_relations',
+                           name='cloud_reverse'),
+
                        url(r'^cloud/l/index/$',
                            'tribus.web.cloud.views.package_list',
                            name='cloud_list'),
@@ -7,11 +7,13 @@
 #=========================================================================
 
 from django.shortcuts import render, get_object_or_404
-from tribus.web.cloud.models import Package, Details, Relation, Label
+from django.core.cache import cache
+from tribus.web.cloud.models import (Package, Details, Label,
+                                     ReverseRelation, profile_cache_key)
 from tribus.config.pkgrecorder import LOCAL_ROOT, relation_types, CANAIMA_ROOT, codenames
-from haystack.query import SearchQuerySet
 from django.core.paginator import Paginator, InvalidPage
-from tribus.config.web import DEBUG
+from tribus.config.web import DEBUG, PROFILE_CACHE_TIMEOUT
+from tribus.web.cloud.catalogue import get_catalogue
 from waffle.decorators import waffle_switch
 
 
@@ -41,6 +43,11 @@ def package_list(request):
     las aplicaciones disponibles en la plataforma de tribus.
     Solo se muestran 30 resultados por pagina. 
     
+    La lista se obtiene del catalogo que genera el recorder despues de
+    cada sincronización, sin consultar el indice de busqueda ni la base
+    de datos. La pagina se indica con el parametro ``page`` o, para
+    recorrer el catalogo por nombre, con ``after``.
+    
     **Contexto:**
     
     ``render_js``
@@ -66,12 +73,13 @@ def package_list(request):
     
     context["render_js"] = render_js
     
-    sqs = SearchQuerySet().models(Package).order_by('name')
-    paginator = Paginator(sqs, 30)
+    catalogue = get_catalogue()
+    paginator = Paginator(catalogue.entries, 30)
     
     try:
-        page = paginator.page(int(request.GET.get('page', 1)))
-    except InvalidPage:
+        page = catalogue.page(paginator, int(request.GET.get('page', 1)),
+                              request.GET.get('after'))
+    except (InvalidPage, ValueError):
         return render(request, 'cloud/package_list.html', {})
     
     context["page"] = page
@@ -108,56 +116,16 @@ def profile(request, name):
     ``detalles``
         Lista que contiene información detallada de la aplicación segun se arquitectura y distribución.
         
+    ``inversas``
+        Paquetes que se relacionan con la aplicación, agrupados por tipo de relación.
+        
     """
     
-    package_info = get_object_or_404(Package, Name=name)
-    details_list = Details.objects.filter(package=package_info)
-    distributions = []
-    tmp_dict = {}
-    for det in details_list:
-        if codenames[det.Distribution] not in tmp_dict:
-            tmp_dict[codenames[det.Distribution]] = {}
-
-        tmp_dict[codenames[det.Distribution]]['codename'] = det.Distribution
-        tmp_dict[codenames[det.Distribution]][
-            'version'] = codenames[det.Distribution]
-
-        if 'Architectures' not in tmp_dict[codenames[det.Distribution]]:
-            tmp_dict[codenames[det.Distribution]]['Architectures'] = {}
-
-        tmp_dict[codenames[det.Distribution]][
-            'Architectures'][det.Architecture] = {}
-        tmp_dict[
-            codenames[
-                det.Distribution]][
-            'Architectures'][
-            det.Architecture][
-            'data'] = det
-
-        tmp_dict[codenames[det.Distribution]][
-            'Architectures'][det.Architecture]['relations'] = {}
-
-        r = Relation.objects.filter(
-            details=det).order_by(
-            "alt_id",
-            "related_package",
-            "version")
-        for n in r:
-            if n.relation_type in relation_types:
-                if n.relation_type not in tmp_dict[codenames[det.Distribution]]['Architectures'][det.Architecture]['relations']:
-                    tmp_dict[
-                        codenames[
-                            det.Distribution]][
-                        'Architectures'][
-                        det.Architecture][
-                        'relations'][
-                        n.relation_type] = [
-                    ]
-                tmp_dict[codenames[det.Distribution]]['Architectures'][
-                    det.Architecture]['relations'][n.relation_type].append(n)
-
-    for dist in tmp_dict.values():
-        distributions.append(dist)
+    package_info = get_object_or_404(
+        Package.objects.select_related('Maintainer').prefetch_related(
+            'Labels__Tags'), Name=name)
+    distributions = package_distributions(package_info)
+    reverse = package_reverse_relations(package_info)
 
     if DEBUG:
         file_root = LOCAL_ROOT
@@ -168,12 +136,142 @@ def profile(request, name):
         'paquete': package_info,
         'raiz': file_root,
         'detalles': distributions,
+        'inversas': reverse,
         'render_js': ['angular', 'angular.sanitize', 'angular.resource', 'angular.bootstrap',
                       'angular.infinite-scroll', 'controllers.angular', 'services.angular',
                       'elements.angular', 'cloud.angular', 'navbar.angular', 'md5'],
     })
 
 
+def package_distributions(package):
+    """
+    Agrupa los detalles de un paquete por distribución y arquitectura,
+    junto con sus relaciones agrupadas por tipo.
+    
+    Los detalles, sus relaciones, los paquetes relacionados y el resultado
+    de la verificacion de instalabilidad se obtienen con una consulta cada
+    uno. El resultado se guarda en el cache hasta
+    que el recorder modifica los detalles del paquete.
+    
+    **Arguments**
+    
+    ``package``
+        Objeto `Package` consultado.
+    
+    **Retorna** una lista con un diccionario por distribución, con las
+    claves ``codename``, ``version`` y ``Architectures``.
+    """
+    
+    key = profile_cache_key(package.pk)
+    distributions = cache.get(key)
+    if distributions is not None:
+        return distributions
+    
+    details_list = Details.objects.filter(package=package).prefetch_related(
+        'Relations__related_package', 'installability')
+    tmp_dict = {}
+    for det in details_list:
+        version = codenames[det.Distribution]
+        dist = tmp_dict.setdefault(version, {'codename': det.Distribution,
+                                             'version': version,
+                                             'Architectures': {}})
+        relations = {}
+        for n in sorted(det.Relations.all(), key=relation_order):
+            if n.relation_type in relation_types:
+                relations.setdefault(n.relation_type, []).append(n)
+        dist['Architectures'][det.Architecture] = {
+            'data': det, 'relations': relations,
+            'status': sorted(det.installability.all(),
+                             key=lambda status: status.architecture)}
+    
+    distributions = tmp_dict.values()
+    cache.set(key, distributions, PROFILE_CACHE_TIMEOUT)
+    return distributions
+
+
+def package_reverse_relations(package):
+    """
+    Obtiene los paquetes que se relacionan con un paquete (los que
+    dependen de él, lo recomiendan, lo proveen, etc.), agrupados por tipo
+    de relación.
+    
+    Se lee del indice de relaciones inversas que mantiene el recorder, con
+    una sola consulta, y se guarda en el cache junto con el resto del
+    perfil.
+    
+    **Arguments**
+    
+    ``package``
+        Objeto `Package` consultado.
+    
+    **Retorna** una lista de tuplas ``(tipo, nombres)`` en el orden de
+    `relation_types`, solo con los tipos que tienen paquetes.
+    """
+    
+    key = profile_cache_key(package.pk, 'reverse')
+    reverse = cache.get(key)
+    if reverse is not None:
+        return reverse
+    
+    names = {}
+    for relation_type, name in ReverseRelation.objects.filter(
+            package=package).values_list('relation_type', 'source__Name'):
+        names.setdefault(relation_type, set()).add(name)
+    
+    reverse = [(relation_type, sorted(names[relation_type]))
+               for relation_type in relation_types if relation_type in names]
+    cache.set(key, reverse, PROFILE_CACHE_TIMEOUT)
+    return reverse
+
+
+@waffle_switch('cloud')
+def reverse_relations(request, name):
+    """
+    Muestra los paquetes que se relacionan con una aplicación, con la
+    distribución y arquitectura en que lo hacen. Se puede filtrar por tipo
+    de relación con el parametro ``type`` (por ejemplo ``depends`` o
+    ``provides``).
+    
+    **Arguments**
+    
+    ``name``
+        Nombre de la aplicación consultada.
+    
+    **Contexto:**
+    
+    ``paquete``
+        Aplicación consultada.
+        
+    ``tipo``
+        Tipo de relación consultado, o None.
+        
+    ``relaciones``
+        Lista de objetos `ReverseRelation` con su paquete de origen.
+        
+    """
+    
+    package = get_object_or_404(Package, Name=name)
+    relation_type = request.GET.get('type')
+    
+    return render(request, 'cloud/reverse_relations.html', {
+        'paquete': package,
+        'tipo': relation_type,
+        'relaciones': ReverseRelation.objects.of_package(package,
+                                                         relation_type),
+    })
+
+
+def relation_order(relation):
+    """
+    Orden en que se muestran las relaciones en el perfil: por grupo de
+    alternativas, nombre del paquete relacionado y versión.
+    """
+    
+    related = relation.related_package
+    return (relation.alt_id, related.Name if related else None,
+            relation.version)
+
+
 # def by_category(request, category):
 #     l = Label.objects.filter(Name=category)
 #     context = {"categories": l}
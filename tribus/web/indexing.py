@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.web.indexing
+===================
+
+This module batches the updates of the search index.
+
+Normally every saved or deleted object enqueues one Celery task that
+updates its search document. Inside `deferred_indexing`, the signal
+processor (see `tribus.web.signals`) only collects the touched objects
+instead, and they are written
+to the index when the block ends, with one ``update`` call (and therefore
+one commit) per model. The recorder uses it for each control file, and
+adds the rows it writes with ``bulk_create``, which send no signals.
+
+Every write to the index increases a generation counter kept in the
+cache, which versions the cached search results.
+
+"""
+
+import threading
+from contextlib import contextmanager
+from django.core.cache import cache
+from haystack import connections
+from haystack.exceptions import NotHandled
+from haystack.utils import get_identifier
+from tribus.common.logger import get_logger
+from tribus.config.pkgrecorder import BULK_QUERY_SIZE
+
+logger = get_logger()
+
+_state = threading.local()
+
+INDEX_GENERATION_KEY = 'search:generation'
+
+
+def index_generation():
+    """
+
+    :return: the current generation of the search index.
+
+    .. versionadded:: 0.2
+
+    """
+    return cache.get(INDEX_GENERATION_KEY, 0)
+
+
+def bump_index_generation():
+    """
+
+    Increases the generation of the search index. It must be called after
+    the documents of the index are written.
+
+    .. versionadded:: 0.2
+
+    """
+    try:
+        cache.incr(INDEX_GENERATION_KEY)
+    except ValueError:
+        cache.set(INDEX_GENERATION_KEY, 1, None)
+
+
+class IndexBatch(object):
+    """
+
+    The objects whose search documents must be updated or removed.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self):
+        self.updates = {}
+        self.deletes = {}
+
+    def __len__(self):
+        return (sum(len(pks) for pks in self.updates.values()) +
+                sum(len(ids) for ids in self.deletes.values()))
+
+    def update(self, model, pks):
+        """
+
+        :param model: a model class.
+        :param pks: the primary keys of the objects to index again.
+
+        .. versionadded:: 0.2
+
+        """
+        self.updates.setdefault(model, set()).update(pks)
+
+    def delete(self, model, instance):
+        """
+
+        :param model: a model class.
+        :param instance: a deleted instance of `model`.
+
+        .. versionadded:: 0.2
+
+        """
+        self.updates.get(model, set()).discard(instance.pk)
+        self.deletes.setdefault(model, set()).add(get_identifier(instance))
+
+    def flush(self):
+        """
+
+        Writes the collected changes to every search backend and empties
+        the batch. Models without a search index are ignored.
+
+        .. versionadded:: 0.2
+
+        """
+        for using in connections.connections_info:
+            backend = connections[using].get_backend()
+            unified_index = connections[using].get_unified_index()
+            for model, pks in self.updates.items():
+                try:
+                    index = unified_index.get_index(model)
+                except NotHandled:
+                    continue
+                pks = sorted(pks)
+                objects = []
+                for i in xrange(0, len(pks), BULK_QUERY_SIZE):
+                    objects.extend(index.index_queryset(using=using).filter(
+                        pk__in=pks[i:i + BULK_QUERY_SIZE]))
+                if objects:
+                    backend.update(index, objects)
+                logger.info('%s %s search documents updated' %
+                            (len(objects), model.__name__))
+            for model, identifiers in self.deletes.items():
+                for identifier in identifiers:
+                    backend.remove(identifier)
+        if len(self):
+            bump_index_generation()
+        self.updates = {}
+        self.deletes = {}
+
+
+def current_batch():
+    """
+
+    :return: the `IndexBatch` of the enclosing `deferred_indexing` block
+             in this thread, or None.
+
+    .. versionadded:: 0.2
+
+    """
+    return getattr(_state, 'batch', None)
+
+
+@contextmanager
+def deferred_indexing(flush=True):
+    """
+
+    Collects the search index changes of the enclosed block and writes
+    them when it ends. Nested blocks share the batch of the outermost one.
+
+    :param flush: if False, the outermost block does not write the batch,
+                  and the caller is expected to pass its changes to the
+                  process that writes the index (e.g. the recorder
+                  workers, see `tribus.common.recorder.record_shard`).
+
+    .. versionadded:: 0.2
+
+    """
+    batch = current_batch()
+    if batch is not None:
+        yield batch
+        return
+    batch = _state.batch = IndexBatch()
+    try:
+        yield batch
+    finally:
+        _state.batch = None
+        if flush:
+            batch.flush()
+
+
+def updated(model, pks):
+    """
+
+    Marks objects written without sending signals (e.g. with
+    ``bulk_create`` or ``update``) to be indexed again: at the end of the
+    enclosing `deferred_indexing` block, or right away if there is none.
+
+    :param model: a model class.
+    :param pks: the primary keys of the objects.
+
+    .. versionadded:: 0.2
+
+    """
+    with deferred_indexing() as batch:
+        batch.update(model, pks)
+
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from tribus.common.cache import STATS
+
+
+class Command(BaseCommand):
+    help = ('Shows the hit rates of the two-level cache, added up over '
+            'every process that published its counts.')
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'shared_stats'):
+            self.stdout.write('The default cache is not a TwoLevelCache.')
+            return
+        cache.publish_stats()
+        stats = cache.shared_stats()
+        for name in STATS:
+            self.stdout.write('%s: %s' % (name, stats[name]))
+        self.stdout.write('reads: %(reads)s, L1 hit rate: %(l1).1f%%, '
+                          'L2 hit rate: %(l2).1f%%, total hit rate: '
+                          '%(total).1f%%' % dict(
+                              stats, l1=stats['l1'] * 100,
+                              l2=stats['l2'] * 100,
+                              total=stats['total'] * 100))
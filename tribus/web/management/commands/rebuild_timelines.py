@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from tribus.web.models import TimelineEntry
+from tribus.web.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = ('Fills the materialized timeline of every user from the tribs '
+            'of the users they follow.')
+
+    def handle(self, *args, **options):
+        rebuild_timelines(User.objects.values_list('id', flat=True))
+        self.stdout.write('%s timeline entries.' %
+                          TimelineEntry.objects.count())
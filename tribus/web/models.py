@@ -20,7 +20,9 @@
 
 
 from django.db import models
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
+from tribus.web.scopes import invalidation_receiver
 
 
 class Trib(models.Model):
@@ -28,9 +30,44 @@ class Trib(models.Model):
     trib_pub_date = models.DateTimeField(blank=False)
     trib_content = models.CharField("", max_length=200, blank=False)
 
+    class Meta:
+        # Para paginar por (trib_pub_date, id), ver tribus.web.api.paginator
+        index_together = [['trib_pub_date', 'id'],
+                          ['user_id', 'trib_pub_date', 'id']]
+
 
 class Comment(models.Model):
     user_id = models.ForeignKey(User, verbose_name='')
     trib_id = models.ForeignKey("Trib", verbose_name='')
     comment_content = models.CharField("", max_length=200, blank=False)
-    comment_pub_date = models.DateTimeField("", blank=False)
\ No newline at end of file
+    comment_pub_date = models.DateTimeField("", blank=False)
+
+    class Meta:
+        # Para paginar por (comment_pub_date, id), ver tribus.web.api.paginator
+        index_together = [['comment_pub_date', 'id'],
+                          ['trib_id', 'comment_pub_date', 'id']]
+
+
+class TimelineEntry(models.Model):
+    """
+    Es un trib en el timeline materializado de un usuario. Se crea al
+    publicar el trib, para el autor y cada uno de sus seguidores (ver
+    `tribus.web.timeline`). La fecha se copia del trib para paginar el
+    timeline con el indice (owner, trib_pub_date, trib).
+
+    .. versionadded:: 0.2
+    """
+    owner = models.ForeignKey(User, related_name='timeline_entries')
+    trib = models.ForeignKey(Trib, related_name='timeline_entries')
+    trib_pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = [('owner', 'trib')]
+        index_together = [['owner', 'trib_pub_date', 'trib']]
+
+
+for model in (Trib, Comment):
+    post_save.connect(invalidation_receiver('tribs'), sender=model,
+                      weak=False)
+    post_delete.connect(invalidation_receiver('tribs'), sender=model,
+                        weak=False)
@@ -21,7 +21,9 @@
 from django.db.models import (OneToOneField, ManyToManyField, Model, CharField,
                               BooleanField)
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from tribus.web.autocomplete import users_changed
+from tribus.web.scopes import invalidation_receiver
 
 
 User.add_to_class('description', CharField(max_length=160, null=True,
@@ -54,3 +56,25 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
 
 post_save.connect(create_user_profile, sender=User)
+post_save.connect(users_changed, sender=User)
+post_delete.connect(users_changed, sender=User)
+# update_last_login guarda solo last_login en cada inicio de sesion.
+post_save.connect(
+    invalidation_receiver('users', ignored_fields=['last_login']),
+    sender=User, weak=False)
+post_delete.connect(invalidation_receiver('users'), sender=User, weak=False)
+
+
+def follows_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Los timelines materializados se rellenan de nuevo cuando un usuario
+    # sigue o deja de seguir a otro
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    from tribus.web.timeline import rebuild_timelines
+    if not reverse:
+        rebuild_timelines([instance.user_id])
+    elif pk_set:
+        rebuild_timelines(UserProfile.objects.filter(
+            pk__in=pk_set).values_list('user', flat=True))
+
+m2m_changed.connect(follows_changed, sender=UserProfile.follows.through)
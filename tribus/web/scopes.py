@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.web.scopes
+=================
+
+This module keeps the versions of the scopes of data that the cached API
+responses depend on (see `tribus.web.api.cache`). Each version is a
+generation counter in the cache. It has no dependencies on the API, so
+the models and the recorder can invalidate responses without importing
+the resources.
+
+"""
+
+from django.core.cache import cache
+
+RESPONSE_SCOPES = ('charms', 'packages', 'users', 'tribs')
+
+
+def scope_key(scope):
+    """
+
+    :param scope: one of `RESPONSE_SCOPES`.
+    :return: the cache key of the generation of the scope.
+
+    .. versionadded:: 0.2
+
+    """
+    return 'api:scope:%s' % scope
+
+
+def invalidate_responses(*scopes):
+    """
+
+    Discards the cached responses that depend on any of the given scopes.
+
+    :param scopes: names of `RESPONSE_SCOPES`.
+
+    .. versionadded:: 0.2
+
+    """
+    for scope in scopes:
+        try:
+            cache.incr(scope_key(scope))
+        except ValueError:
+            cache.set(scope_key(scope), 1, None)
+
+
+def invalidation_receiver(*scopes, **options):
+    """
+
+    :param scopes: names of `RESPONSE_SCOPES`.
+    :param ignored_fields: fields of the sender that no response shows.
+                           A ``post_save`` whose ``update_fields`` only has
+                           some of them does not invalidate anything.
+    :return: a signal receiver that calls `invalidate_responses` with
+             `scopes`. It must be connected with ``weak=False``.
+
+    .. versionadded:: 0.2
+
+    """
+    ignored_fields = frozenset(options.get('ignored_fields', ()))
+
+    def receiver(sender, update_fields=None, **kwargs):
+        if update_fields is not None and \
+                ignored_fields.issuperset(update_fields):
+            return
+        invalidate_responses(*scopes)
+    return receiver
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+tribus.web.search
+=================
+
+This module contains the helpers to narrow package searches by the faceted
+fields of ``PackageIndex``. The filters are sent to the search engine as
+narrow queries, so the results are never filtered in Python.
+
+It also caches the pages of search results. Only the ids of the results
+are stored, under a key built from the normalized query, the model, the
+facet filters and the page number. Each entry records the generation of
+the search index it was computed with, and is discarded when the index
+has been updated since.
+
+"""
+
+import re
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from haystack.query import SearchQuerySet
+from tribus.web.cloud.models import Package
+from tribus.web.indexing import INDEX_GENERATION_KEY
+
+SEARCH_CACHE_TIMEOUT = 60 * 60
+SEARCH_PAGE_SIZE = 15
+
+_spaces = re.compile(r'\s+', re.UNICODE)
+
+# Request parameters accepted as filters, and the index field they narrow.
+PACKAGE_FACETS = (
+    ('section', 'section'),
+    ('priority', 'priority'),
+    ('label', 'labels'),
+    ('label_name', 'label_names'),
+    ('distribution', 'distributions'),
+    ('architecture', 'architectures'),
+)
+
+
+def label_value(label):
+    """
+
+    :param label: a ``Label`` with a tag.
+    :return: the label in Debtags notation, e.g. ``implemented-in::python``.
+
+    .. versionadded:: 0.2
+
+    """
+    return '%s::%s' % (label.Name, label.Tags.Value)
+
+
+def facet_filters(params):
+    """
+
+    :param params: a dictionary-like object, such as ``request.GET``.
+    :return: a list of ``(parameter, value)`` tuples with the facet filters
+             present in `params`. Parameters with several values (e.g.
+             ``?label=a&label=b``) give a tuple per value.
+
+    .. versionadded:: 0.2
+
+    """
+    filters = []
+    for parameter, _ in PACKAGE_FACETS:
+        if hasattr(params, 'getlist'):
+            values = params.getlist(parameter)
+        else:
+            values = [params[parameter]] if parameter in params else []
+        filters.extend((parameter, value) for value in values if value)
+    return filters
+
+
+def narrow_packages(sqs, params):
+    """
+
+    Narrows a package search with the facet filters of `params`. Several
+    filters are combined with AND.
+
+    :param sqs: a ``SearchQuerySet``.
+    :param params: a dictionary-like object, such as ``request.GET``.
+    :return: the narrowed ``SearchQuerySet``.
+
+    .. versionadded:: 0.2
+
+    """
+    return narrow_by_filters(sqs, facet_filters(params))
+
+
+def narrow_by_filters(sqs, filters):
+    """
+
+    :param sqs: a ``SearchQuerySet``.
+    :param filters: the list returned by `facet_filters`.
+    :return: the ``SearchQuerySet`` narrowed by every filter.
+
+    .. versionadded:: 0.2
+
+    """
+    fields = dict(PACKAGE_FACETS)
+    for parameter, value in filters:
+        sqs = sqs.narrow(u'%s_exact:"%s"' % (fields[parameter],
+                                             sqs.query.clean(value)))
+    return sqs
+
+
+def package_facets(sqs):
+    """
+
+    :param sqs: a ``SearchQuerySet`` of packages.
+    :return: a dictionary mapping each request parameter of
+             `PACKAGE_FACETS` to a list of ``(value, count)`` tuples,
+             computed by the search engine. Backends without faceting
+             return empty lists.
+
+    .. versionadded:: 0.2
+
+    """
+    for _, field in PACKAGE_FACETS:
+        sqs = sqs.facet(field)
+    counts = sqs.facet_counts().get('fields', {})
+    return dict((parameter, counts.get(field, []))
+                for parameter, field in PACKAGE_FACETS)
+
+
+class SearchResult(object):
+    """
+
+    A search result loaded from the database, with the attributes used by
+    the search template.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, model_name, pk, **fields):
+        self.model_name = model_name
+        self.pk = pk
+        self.__dict__.update(fields)
+
+
+def normalize_query(query):
+    """
+
+    :param query: the text searched by the user.
+    :return: the query in lowercase, without repeated or surrounding
+             whitespace.
+
+    .. versionadded:: 0.2
+
+    """
+    return _spaces.sub(u' ', query).strip().lower()
+
+
+def search_cache_key(query, model_name, filters, number):
+    """
+
+    :param query: the text searched by the user.
+    :param model_name: the name of the model searched, or None.
+    :param filters: the list returned by `facet_filters`.
+    :param number: the page number.
+    :return: the cache key of the page.
+
+    .. versionadded:: 0.2
+
+    """
+    key = u'%s\n%s\n%s\n%s' % (normalize_query(query), model_name,
+                                 u'&'.join(u'%s=%s' % f for f in sorted(filters)),
+                                 number)
+    return 'search:page:%s' % hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+def run_search(query, model_name, filters, number):
+    """
+
+    Runs a search on the search engine.
+
+    :param query: the text searched by the user.
+    :param model_name: the name of the model searched. If None, the model of
+                       the first result is used.
+    :param filters: the list returned by `facet_filters`, applied to
+                    package searches.
+    :param number: the page number.
+    :return: a dictionary with the ``model`` searched, the ``count`` of
+             results, the ``ids`` of the results of the page and the
+             ``facets`` of a package search.
+    :raises InvalidPage: if the page does not exist.
+
+    .. versionadded:: 0.2
+
+    """
+    sqs = SearchQuerySet().autocomplete(autoname=query)
+    if model_name is None:
+        first = sqs[:1]
+        if not first:
+            return {'model': None, 'count': 0, 'ids': [], 'facets': {}}
+        model_name = first[0].model_name
+    sqs = sqs.models(ContentType.objects.get(model=model_name).model_class())
+    facets = {}
+    if model_name == 'package':
+        sqs = narrow_by_filters(sqs, filters)
+        facets = package_facets(sqs)
+    page = Paginator(sqs, SEARCH_PAGE_SIZE).page(number)
+    return {'model': model_name, 'count': page.paginator.count,
+            'ids': [int(result.pk) for result in page.object_list],
+            'facets': facets}
+
+
+def cached_search(query, model_name=None, filters=(), number=1):
+    """
+
+    Returns a page of search results from the cache, or runs the search
+    and caches it. A hit costs a single read from the cache.
+
+    :param query: the text searched by the user.
+    :param model_name: the name of the model searched, or None.
+    :param filters: the list returned by `facet_filters`.
+    :param number: the page number.
+    :return: the dictionary returned by `run_search`.
+    :raises InvalidPage: if the page does not exist.
+
+    .. versionadded:: 0.2
+
+    """
+    # The query of the search engine must be the one of the cache key, or
+    # the first spelling searched would be served for every other one.
+    query = normalize_query(query)
+    key = search_cache_key(query, model_name, filters, number)
+    values = cache.get_many([INDEX_GENERATION_KEY, key])
+    generation = values.get(INDEX_GENERATION_KEY, 0)
+    entry = values.get(key)
+    if entry is None or entry['generation'] != generation:
+        entry = run_search(query, model_name, filters, number)
+        entry['generation'] = generation
+        cache.set(key, entry, getattr(settings, 'SEARCH_CACHE_TIMEOUT',
+                                      SEARCH_CACHE_TIMEOUT))
+    return entry
+
+
+def load_results(model_name, ids):
+    """
+
+    :param model_name: ``package`` or ``user``.
+    :param ids: the ids of the results.
+    :return: a list of `SearchResult` objects in the order of `ids`, loaded
+             with a single query. Objects deleted since the search was
+             cached are skipped.
+
+    .. versionadded:: 0.2
+
+    """
+    if model_name == 'package':
+        rows = dict((pk, SearchResult(model_name, pk, autoname=name,
+                                      description=description))
+                    for pk, name, description in Package.objects.filter(
+                        pk__in=ids).values_list('id', 'Name', 'Description'))
+    elif model_name == 'user':
+        rows = dict((pk, SearchResult(
+            model_name, pk, username=username,
+            fullname=(u'%s %s' % (first, last)).strip(),
+            description=description))
+            for pk, username, first, last, description in User.objects.filter(
+                pk__in=ids).values_list('id', 'username', 'first_name',
+                                        'last_name', 'description'))
+    else:
+        rows = {}
+    return [rows[pk] for pk in ids if pk in rows]
@@ -21,21 +21,48 @@
 from haystack import indexes
 from celery_haystack.indexes import CelerySearchIndex
 from tribus.web.cloud.models import Package
+from tribus.web.search import label_value
 from django.contrib.auth.models import User
 
 
 class PackageIndex(CelerySearchIndex, indexes.Indexable):
-    text = indexes.CharField(document=True)
+    text = indexes.CharField(document=True, use_template=True)
     name = indexes.CharField(model_attr='Name')
     autoname = indexes.EdgeNgramField(model_attr='Name')
     description = indexes.CharField(model_attr='Description', null=True)
+    section = indexes.CharField(model_attr='Section', null=True, faceted=True)
+    priority = indexes.CharField(model_attr='Priority', null=True,
+                                 faceted=True)
+    labels = indexes.MultiValueField(faceted=True)
+    label_names = indexes.MultiValueField(faceted=True)
+    distributions = indexes.MultiValueField(faceted=True)
+    architectures = indexes.MultiValueField(faceted=True)
 
     def get_model(self):
         return Package
 
     def index_queryset(self, using=None):
         """Used when the entire index for model is updated."""
-        return self.get_model().objects.all()
+        return self.get_model().objects.select_related(
+            'Maintainer').prefetch_related('Labels__Tags', 'Details')
+
+    # The related objects are read with all() so that the lists loaded by
+    # index_queryset are used instead of running new queries.
+
+    def prepare_labels(self, obj):
+        return sorted(set(label_value(label) for label in obj.Labels.all()
+                          if label.Tags))
+
+    def prepare_label_names(self, obj):
+        return sorted(set(label.Name for label in obj.Labels.all()))
+
+    def prepare_distributions(self, obj):
+        return sorted(set(details.Distribution
+                          for details in obj.Details.all()))
+
+    def prepare_architectures(self, obj):
+        return sorted(set(details.Architecture
+                          for details in obj.Details.all()))
 
 
 class UserIndex(CelerySearchIndex, indexes.Indexable):
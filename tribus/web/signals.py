@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+tribus.web.signals
+==================
+
+This module contains the signal processor of the search index.
+
+"""
+
+from haystack.exceptions import NotHandled
+from celery_haystack.signals import CelerySignalProcessor
+from tribus.web.indexing import current_batch
+
+
+class BatchingSignalProcessor(CelerySignalProcessor):
+    """
+
+    Works as ``CelerySignalProcessor``, but inside a `deferred_indexing`
+    block the changes are added to the current batch instead of being
+    enqueued one by one.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def enqueue(self, action, instance, sender, **kwargs):
+        batch = current_batch()
+        if batch is None:
+            return super(BatchingSignalProcessor, self).enqueue(
+                action, instance, sender, **kwargs)
+        for using in self.connection_router.for_write(instance=instance):
+            try:
+                index = self.connections[using].get_unified_index(
+                    ).get_index(sender)
+            except NotHandled:
+                continue
+            if action == 'update':
+                if index.should_update(instance):
+                    batch.update(sender, [instance.pk])
+            else:
+                batch.delete(sender, instance)
+            return
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from celery import task
+from celery_haystack.tasks import CeleryHaystackSignalHandler
+from tribus.web.indexing import bump_index_generation
+from tribus.web.timeline import trim_timelines as trim
+
+
+class IndexingTask(CeleryHaystackSignalHandler):
+    """
+
+    Updates the search document of an object, and then the generation of
+    the search index, so that cached search results are not served again.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def run(self, action, identifier, **kwargs):
+        super(IndexingTask, self).run(action, identifier, **kwargs)
+        bump_index_generation()
+
+
+@task
+def trim_timelines(*args, **kwargs):
+    return trim()
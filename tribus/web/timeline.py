@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2013-2014 Tribus Developers
+#
+# This file is part of Tribus.
+#
+# Tribus is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tribus is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+
+tribus.web.timeline
+===================
+
+This module keeps the timeline of each user materialized in the
+``TimelineEntry`` table.
+
+When a trib is published, it is added to the timeline of its author and of
+every user who follows the author (fan-out on write), so that reading a
+timeline is a range scan on the ``(owner, trib_pub_date, trib)`` index
+instead of a query over the tribs of every followed user. Authors with more
+than ``TIMELINE_FANOUT_LIMIT`` followers are not fanned out; their tribs are
+merged into the timelines of their followers when they are read (fan-out
+on read). Each timeline keeps its newest ``TIMELINE_LENGTH`` tribs; older
+pages are read from the tribs of the followed users.
+
+Timelines are paginated by keyset: a page holds the tribs older than the
+``(trib_pub_date, id)`` of the last trib of the previous page.
+
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Count
+from tribus.common.logger import get_logger
+from tribus.web.models import Trib, TimelineEntry
+from tribus.web.profile.models import UserProfile
+
+logger = get_logger()
+
+TIMELINE_LENGTH = 800
+TIMELINE_FANOUT_LIMIT = 1000
+CELEBRITIES_KEY = 'timeline:celebrities'
+CELEBRITIES_TIMEOUT = 60 * 10
+
+
+def timeline_length():
+    """
+
+    :return: the ``TIMELINE_LENGTH`` setting.
+
+    .. versionadded:: 0.2
+
+    """
+    return getattr(settings, 'TIMELINE_LENGTH', TIMELINE_LENGTH)
+
+
+def fanout_limit():
+    """
+
+    :return: the ``TIMELINE_FANOUT_LIMIT`` setting.
+
+    .. versionadded:: 0.2
+
+    """
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', TIMELINE_FANOUT_LIMIT)
+
+
+def followers_of(user_id):
+    """
+
+    :param user_id: the primary key of a user.
+    :return: a list with the primary keys of the users who follow them.
+
+    .. versionadded:: 0.2
+
+    """
+    return list(UserProfile.objects.filter(follows=user_id).values_list(
+        'user', flat=True))
+
+
+def follows_of(user_id):
+    """
+
+    :param user_id: the primary key of a user.
+    :return: a list with the primary keys of the users they follow.
+
+    .. versionadded:: 0.2
+
+    """
+    return list(UserProfile.follows.through.objects.filter(
+        userprofile__user=user_id).values_list('user', flat=True))
+
+
+def celebrities():
+    """
+
+    :return: the set of users with more than ``TIMELINE_FANOUT_LIMIT``
+             followers, whose tribs are read on demand. It is cached for
+             ``CELEBRITIES_TIMEOUT`` seconds.
+
+    .. versionadded:: 0.2
+
+    """
+    found = cache.get(CELEBRITIES_KEY)
+    if found is None:
+        found = set(UserProfile.follows.through.objects.values(
+            'user').annotate(followers=Count('userprofile')).filter(
+                followers__gt=fanout_limit()).values_list('user', flat=True))
+        cache.set(CELEBRITIES_KEY, found, CELEBRITIES_TIMEOUT)
+    return found
+
+
+def before_filter(before, date_field='trib_pub_date', id_field='id'):
+    """
+
+    :param before: a ``(trib_pub_date, id)`` tuple, or None.
+    :return: a ``Q`` object selecting the rows older than `before`, in the
+             order of the timeline.
+
+    .. versionadded:: 0.2
+
+    """
+    if before is None:
+        return Q()
+    date, pk = before
+    return Q(**{'%s__lt' % date_field: date}) | Q(
+        **{date_field: date, '%s__lt' % id_field: pk})
+
+
+def fan_out(trib):
+    """
+
+    Adds a new trib to the timelines of its author and, unless the author
+    has more than ``TIMELINE_FANOUT_LIMIT`` followers, of their followers.
+
+    :param trib: a ``Trib`` object.
+
+    .. versionadded:: 0.2
+
+    """
+    owners = [trib.user_id_id]
+    followers = followers_of(trib.user_id_id)
+    if len(followers) <= fanout_limit():
+        owners.extend(followers)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(owner_id=owner, trib=trib,
+                       trib_pub_date=trib.trib_pub_date)
+         for owner in set(owners)])
+
+
+def rebuild_timelines(user_ids):
+    """
+
+    Fills again the timelines of some users from the tribs of the users
+    they follow, e.g. after they follow or stop following someone.
+
+    :param user_ids: the primary keys of the users.
+
+    .. versionadded:: 0.2
+
+    """
+    for user_id in set(user_ids):
+        TimelineEntry.objects.filter(owner=user_id).delete()
+        authors = [a for a in follows_of(user_id)
+                   if a not in celebrities()] + [user_id]
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(owner_id=user_id, trib_id=pk, trib_pub_date=date)
+             for pk, date in Trib.objects.filter(
+                 user_id__in=authors).order_by(
+                     '-trib_pub_date', '-id').values_list(
+                         'id', 'trib_pub_date')[:timeline_length()]])
+
+
+def trim_timelines():
+    """
+
+    Deletes the entries that exceed ``TIMELINE_LENGTH`` in every timeline.
+
+    :return: the number of timelines trimmed.
+
+    .. versionadded:: 0.2
+
+    """
+    length = timeline_length()
+    trimmed = 0
+    for owner in TimelineEntry.objects.values('owner').annotate(
+            entries=Count('id')).filter(entries__gt=length).values_list(
+                'owner', flat=True):
+        date, pk = TimelineEntry.objects.filter(owner=owner).order_by(
+            '-trib_pub_date', '-trib').values_list(
+                'trib_pub_date', 'trib')[length - 1]
+        TimelineEntry.objects.filter(owner=owner).filter(
+            before_filter((date, pk), id_field='trib')).delete()
+        trimmed += 1
+    logger.info('%s timelines trimmed to %s tribs' % (trimmed, length))
+    return trimmed
+
+
+def read_timeline(user_id, before=None, limit=10):
+    """
+
+    Reads a page of the timeline of a user, newest first.
+
+    :param user_id: the primary key of the user.
+    :param before: the ``(trib_pub_date, id)`` of the last trib of the
+                   previous page, or None for the first page.
+    :param limit: the number of tribs of the page.
+    :return: a list of ``Trib`` objects.
+
+    .. versionadded:: 0.2
+
+    """
+    ids = list(TimelineEntry.objects.filter(owner=user_id).filter(
+        before_filter(before, id_field='trib')).order_by(
+            '-trib_pub_date', '-trib').values_list(
+                'trib_pub_date', 'trib')[:limit])
+
+    # Celebrities are not fanned out, and the timeline only keeps the
+    # newest tribs: past its end, the page is completed from the tribs of
+    # every followed user.
+    if len(ids) < limit:
+        readers = set(follows_of(user_id) + [user_id])
+    else:
+        readers = celebrities()
+        if readers:
+            readers = readers.intersection(follows_of(user_id))
+    if readers:
+        ids.extend(Trib.objects.filter(user_id__in=readers).filter(
+            before_filter(before)).order_by(
+                '-trib_pub_date', '-id').values_list(
+                    'trib_pub_date', 'id')[:limit])
+    ids = sorted(set(ids), reverse=True)[:limit]
+
+    tribs = Trib.objects.select_related('user_id').in_bulk(
+        [pk for _, pk in ids])
+    return [tribs[pk] for _, pk in ids if pk in tribs]
+
+
+class Timeline(object):
+    """
+
+    The timeline of a user as a sequence, for the paginators that slice
+    their results. Each slice reads the timeline from the start or from the
+    keyset given with `before`.
+
+    .. versionadded:: 0.2
+
+    """
+
+    def __init__(self, user_id, before=None):
+        self.user_id = user_id
+        self.before = before
+
+    def count(self):
+        """
+
+        :return: the number of tribs kept in the timeline, which does not
+                 include the tribs of celebrities nor those older than
+                 ``TIMELINE_LENGTH``.
+
+        .. versionadded:: 0.2
+
+        """
+        return TimelineEntry.objects.filter(owner=self.user_id).count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        if index.stop is None:
+            stop = start + timeline_length()
+        else:
+            stop = index.stop
+        if stop <= start:
+            return []
+        return read_timeline(self.user_id, self.before, stop)[start:stop]
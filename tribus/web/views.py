@@ -4,9 +4,10 @@
 from tribus.config.brand import TRIBUS_SPONSORS
 from django.shortcuts import render
 from tribus.web.registration.forms import SignupForm
-from haystack.query import SearchQuerySet
-from django.core.paginator import Paginator, InvalidPage
-from django.contrib.contenttypes.models import ContentType
+from django.core.paginator import Paginator, Page, InvalidPage
+from django.utils.http import urlencode
+from tribus.web.search import (SEARCH_PAGE_SIZE, facet_filters, cached_search,
+                               load_results)
 
 
 def index(request):
@@ -58,26 +59,27 @@ def search(request):
         query = request.GET.get('q', '')
 
     if query:
-        objects = SearchQuerySet().autocomplete(autoname=query)
-
-        if objects:
-            # conducta extraña: dependiendo del modelo del primer elemento el resultado mostrado
-            # por defecto puede ser un usuario o un paquete
-            model_name = request.GET.get('filter', objects[0].model_name)
-            sqs = objects.models(
-                ContentType.objects.get(
-                    model=model_name).model_class(
-                    ))
-            paginator = Paginator(sqs, 15)
-
-            try:
-                page = paginator.page(int(request.GET.get('page', 1)))
-            except InvalidPage:
-                return render(request, 'search/search.html', {})
+        filters = facet_filters(request.GET)
+        try:
+            number = int(request.GET.get('page', 1))
+            result = cached_search(query, request.GET.get('filter'), filters,
+                                   number)
+        except (InvalidPage, ValueError):
+            return render(request, 'search/search.html', {})
+
+        if result['model']:
+            # Solo se guardan los ids de los resultados en cache, los
+            # objetos de la pagina se cargan con una consulta
+            paginator = Paginator(xrange(result['count']), SEARCH_PAGE_SIZE)
+            page = Page(load_results(result['model'], result['ids']),
+                        number, paginator)
 
             context["page"] = page
             context['query'] = query
-            context['filter'] = model_name
+            context['filter'] = result['model']
+            if result['model'] == 'package':
+                context['facets'] = result['facets']
+                context['facet_query'] = urlencode(filters)
         else:
             context["page"] = None
             context['query'] = query